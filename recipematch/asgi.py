@@ -0,0 +1,17 @@
+import gc
+import os
+from django.core.asgi import get_asgi_application
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipematch.settings')
+# Route the JSON APIs to their async views (see recipes/urls.py)
+os.environ.setdefault('ASYNC_API', 'True')
+# Async views hop between threads, which would leave persistent connections behind
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
+application = get_asgi_application()
+
+
+def warmup():
+    """Same as recipematch.wsgi.warmup(), for uvicorn workers."""
+    from recipes import warmup as recipes_warmup
+    recipes_warmup.run()
+    gc.collect()
+    gc.freeze()
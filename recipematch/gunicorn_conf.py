@@ -0,0 +1,35 @@
+"""
+Gunicorn settings — `gunicorn -c recipematch/gunicorn_conf.py`
+
+The app is preloaded and warmed in the master, so every worker forks with
+the catalog, facet metadata and compiled templates already in memory.
+
+GUNICORN_WORKER=uvicorn serves recipematch.asgi with uvicorn workers instead
+of the sync WSGI workers; the JSON APIs then run as async views.
+"""
+import multiprocessing
+import os
+from importlib import import_module
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True').lower() in ('true', '1', 'yes')
+
+if os.environ.get('GUNICORN_WORKER', 'sync') == 'uvicorn':
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    wsgi_app = 'recipematch.asgi:application'
+else:
+    wsgi_app = 'recipematch.wsgi:application'
+
+
+def when_ready(server):
+    # Runs in the master after the preloaded app is imported, before any fork
+    if preload_app:
+        import_module(wsgi_app.split(':')[0]).warmup()
+
+
+def post_worker_init(worker):
+    # Without preload each worker warms its own copy
+    if not preload_app:
+        import_module(wsgi_app.split(':')[0]).warmup()
@@ -26,6 +26,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'recipes.profiling.ProfilingMiddleware',
+    'recipes.budgets.QueryBudgetMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -55,11 +57,17 @@ TEMPLATES = [
     },
 ]
 
+# No 'loaders' override: since Django 4.1 the default filesystem/app_directories
+# loaders are wrapped in the cached loader whatever DEBUG is (in development it
+# is reset when a template file changes), so compiled templates are reused.
+
 WSGI_APPLICATION = 'recipematch.wsgi.application'
 
 # ── DATABASE ──────────────────────────────────────────────────────────────────
 # Switch to MySQL for production. SQLite works for local dev.
 DB_ENGINE = config('DB_ENGINE', default='sqlite')
+# Persistent connections, re-checked before reuse (recipematch/asgi.py sets 0)
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=int)
 
 if DB_ENGINE == 'mysql':
     DATABASES = {
@@ -71,6 +79,8 @@ if DB_ENGINE == 'mysql':
             'HOST': config('DB_HOST', default='localhost'),
             'PORT': config('DB_PORT', default='3306'),
             'OPTIONS': {'charset': 'utf8mb4'},
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
         }
     }
 else:
@@ -78,8 +88,42 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # Seconds a writer waits on a locked database before "database is locked"
+            'OPTIONS': {'timeout': config('SQLITE_TIMEOUT', default=20, cast=int)},
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
         }
     }
+# WAL journal + synchronous=NORMAL on the SQLite primary (recipes/routers.py)
+SQLITE_WAL = config('SQLITE_WAL', default=True, cast=bool)
+
+# Serve catalog reads (Recipe, Ingredient, RecipeIngredient) from a separate
+# read-only connection, routed by recipes.routers.CatalogRouter. SQLite: the
+# primary file (or CATALOG_DB_PATH) opened mode=ro with query_only; set
+# CATALOG_DB_IMMUTABLE only for a snapshot that never changes while serving.
+# MySQL: the replica at CATALOG_DB_HOST.
+CATALOG_READ_DB = config('CATALOG_READ_DB', default=False, cast=bool)
+
+if CATALOG_READ_DB:
+    if DB_ENGINE == 'mysql':
+        DATABASES['catalog'] = {
+            **DATABASES['default'],
+            'HOST': config('CATALOG_DB_HOST'),
+            'PORT': config('CATALOG_DB_PORT', default=DATABASES['default']['PORT']),
+            'USER': config('CATALOG_DB_USER', default=DATABASES['default']['USER']),
+            'PASSWORD': config('CATALOG_DB_PASSWORD', default=DATABASES['default']['PASSWORD']),
+            'OPTIONS': {'charset': 'utf8mb4', 'init_command': 'SET SESSION TRANSACTION READ ONLY'},
+            'TEST': {'MIRROR': 'default'},
+        }
+    else:
+        _catalog_path = Path(config('CATALOG_DB_PATH', default=str(DATABASES['default']['NAME']))).resolve()
+        _immutable = '&immutable=1' if config('CATALOG_DB_IMMUTABLE', default=False, cast=bool) else ''
+        DATABASES['catalog'] = {
+            **DATABASES['default'],
+            'NAME': f'file:{_catalog_path}?mode=ro{_immutable}',
+            'TEST': {'MIRROR': 'default'},
+        }
+    DATABASE_ROUTERS = ['recipes.routers.CatalogRouter']
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -96,7 +140,7 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [BASE_DIR / 'static']
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+STATICFILES_STORAGE = 'recipes.storage.MinifiedManifestStaticFilesStorage'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -110,6 +154,75 @@ CORS_ALLOW_ALL_ORIGINS = True
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 SESSION_COOKIE_AGE = 60 * 60 * 24 * 30  # 30 days
 
+# ── CACHE ─────────────────────────────────────────────────────────────────────
+# Per-process memory by default; point at memcached/redis/db to share across workers.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='recipematch'),
+    }
+}
+# Recipe card fragments are keyed by catalog version, so a long timeout is safe
+CARD_CACHE_TIMEOUT = config('CARD_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)
+
+# In-memory catalog: how often (seconds) workers re-check CatalogVersion
+CATALOG_VERSION_TTL = config('CATALOG_VERSION_TTL', default=5.0, cast=float)
+
+# ── PROFILING ────────────────────────────────────────────────────────────────
+# PROFILING_ENABLED adds Server-Timing headers and a JSON log line per request;
+# PROFILE_SAMPLE_RATE (0-1) dumps that fraction of requests to PROFILE_DUMP_DIR.
+PROFILING_ENABLED   = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILE_SAMPLE_RATE = config('PROFILE_SAMPLE_RATE', default=0.0, cast=float)
+PROFILE_DUMP_DIR    = config('PROFILE_DUMP_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILER            = config('PROFILER', default='cprofile')  # or 'pyinstrument'
+
+# ── MATCH ADMISSION CONTROL ──────────────────────────────────────────────────
+# Concurrent scoring jobs per worker process (0 = unlimited); identical
+# concurrent requests share one job. Requests that wait longer than
+# MATCH_ADMISSION_TIMEOUT seconds for a slot get 503 + Retry-After.
+MATCH_MAX_CONCURRENT    = config('MATCH_MAX_CONCURRENT', default=4, cast=int)
+MATCH_ADMISSION_TIMEOUT = config('MATCH_ADMISSION_TIMEOUT', default=0.5, cast=float)
+MATCH_RETRY_AFTER       = config('MATCH_RETRY_AFTER', default=1, cast=int)
+
+# ── ASYNC ────────────────────────────────────────────────────────────────────
+# Serve the JSON APIs with async views; recipematch/asgi.py turns this on.
+ASYNC_API = config('ASYNC_API', default=False, cast=bool)
+
+# ── QUERY BUDGETS ────────────────────────────────────────────────────────────
+# Raise on requests over their budget in recipes/budgets.py (development only)
+QUERY_BUDGET_ENFORCE = config('QUERY_BUDGET_ENFORCE', default=False, cast=bool)
+
+# ── RECOMMENDATIONS ──────────────────────────────────────────────────────────
+# build_recommendations: neighbors kept per recipe, co-saves needed to be one,
+# half-life of a co-save's weight, and users with more saves than this are
+# skipped (bulk savers add quadratic pairs and little signal). The saved page
+# recommends from the neighbors of a user's RECOMMENDATION_RECENT_SAVES latest saves.
+RECOMMENDATION_TOP_N          = config('RECOMMENDATION_TOP_N', default=12, cast=int)
+RECOMMENDATION_MIN_CO_SAVES   = config('RECOMMENDATION_MIN_CO_SAVES', default=2, cast=int)
+RECOMMENDATION_HALF_LIFE_DAYS = config('RECOMMENDATION_HALF_LIFE_DAYS', default=180.0, cast=float)
+RECOMMENDATION_MAX_USER_SAVES = config('RECOMMENDATION_MAX_USER_SAVES', default=500, cast=int)
+RECOMMENDATION_RECENT_SAVES   = config('RECOMMENDATION_RECENT_SAVES', default=50, cast=int)
+
+# ── BACKGROUND JOBS ──────────────────────────────────────────────────────────
+# run_jobs workers (recipes/jobs.py): idle poll interval, how often a running
+# job records progress/heartbeat, how stale a heartbeat gets before the job is
+# handed to another worker, and retries (delay doubles per attempt).
+JOB_POLL_INTERVAL      = config('JOB_POLL_INTERVAL', default=2.0, cast=float)
+JOB_HEARTBEAT_INTERVAL = config('JOB_HEARTBEAT_INTERVAL', default=2.0, cast=float)
+JOB_LEASE_SECONDS      = config('JOB_LEASE_SECONDS', default=300, cast=int)
+JOB_MAX_ATTEMPTS       = config('JOB_MAX_ATTEMPTS', default=3, cast=int)
+JOB_RETRY_DELAY        = config('JOB_RETRY_DELAY', default=30, cast=int)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'loggers': {
+        'recipes.profiling': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        'recipes.jobs': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 LOGIN_URL = '/auth/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
@@ -1,24 +1,235 @@
-from django.contrib import admin
-from .models import Ingredient, Recipe, RecipeIngredient, UserPantry, SavedRecipe
+"""
+Admin for the catalog tables, sized for 100k+ recipes and their links:
+
+- no <select> of every Recipe/Ingredient: foreign keys use autocomplete
+- changelist totals come from table statistics, not COUNT(*), when unfiltered
+- list filters take their choices from the in-memory catalog's facets
+  instead of a SELECT DISTINCT over the table
+- search is an indexed prefix lookup (catalog name index for recipes, the
+  name_lower index for ingredients) instead of icontains table scans; recipe
+  matches are capped at SEARCH_LIMIT, with a warning on the changelist when cut
+"""
+from django import forms
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from . import jobs
+from .catalog import get_catalog
+from .models import Ingredient, Job, Recipe, RecipeIngredient, UserPantry, SavedRecipe
+
+EXACT_COUNT_BELOW = 10000   # tables estimated smaller than this are counted exactly
+SEARCH_LIMIT = 500          # recipes matched per admin search (they go into one IN list)
+
+
+def estimated_count(model):
+    """
+    Approximate row count of `model`'s table from index/statistics lookups, or
+    None. On SQLite that is sqlite_stat1, written by ANALYZE (import_data runs
+    it); without statistics the table is counted exactly.
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute('SELECT table_rows FROM information_schema.tables '
+                           'WHERE table_schema = DATABASE() AND table_name = %s', [table])
+        elif connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table])
+        elif connection.vendor == 'sqlite':
+            return sqlite_stat_count(cursor, table)
+        else:
+            return None
+        row = cursor.fetchone()
+    return max(int(row[0]), 0) if row and row[0] is not None else None
+
+
+def sqlite_stat_count(cursor, table):
+    """Row count of `table` recorded by the last ANALYZE, or None without statistics."""
+    try:
+        with transaction.atomic():   # a savepoint: sqlite_stat1 doesn't exist until the first ANALYZE
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    # stat is "<rows> <rows per key prefix> ...", the first number being the table's row count
+    return int(row[0].split()[0]) if row else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Uses estimated_count() for unfiltered querysets of large tables."""
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimated_count(self.object_list.model)
+            if estimate is not None and estimate >= EXACT_COUNT_BELOW:
+                return estimate
+        return super().count
+
+
+def ingredient_prefix(term):
+    """Ingredients whose name starts with `term`, as a range on the indexed name_lower column."""
+    term = term.strip().lower()
+    return Q(name_lower__gte=term, name_lower__lt=term + '\U0010ffff')
+
+
+def recipe_prefix_ids(term):
+    """
+    Ids of the first SEARCH_LIMIT recipes whose name starts with `term`, from
+    the catalog's name index, and whether more recipes matched.
+    """
+    catalog = get_catalog()
+    positions = catalog.names_starting(term.strip(), SEARCH_LIMIT + 1)
+    return [catalog.ids[pos] for pos in positions[:SEARCH_LIMIT]], len(positions) > SEARCH_LIMIT
+
+
+class CatalogFacetFilter(admin.SimpleListFilter):
+    """List filter over one catalog facet; subclasses set title, parameter_name and facet."""
+    facet = None
+
+    def lookups(self, request, model_admin):
+        return [(label, label) for label in getattr(get_catalog(), self.facet) if label]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.parameter_name: self.value()})
+        return queryset
+
+
+class CuisineFilter(CatalogFacetFilter):
+    title, parameter_name, facet = 'cuisine type', 'cuisine_type', 'cuisines'
+
+
+class CategoryFilter(CatalogFacetFilter):
+    title, parameter_name, facet = 'category', 'category', 'categories'
+
+
+class DifficultyFilter(CatalogFacetFilter):
+    title, parameter_name = 'difficulty', 'difficulty'
+
+    def lookups(self, request, model_admin):
+        return [(d, d) for d in get_catalog().difficulty_codes.labels if d]
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False   # skip the second, unfiltered COUNT on filtered pages
+
+    def recipe_search_ids(self, request, term):
+        """recipe_prefix_ids(), warning on the changelist when the results were cut at SEARCH_LIMIT."""
+        ids, truncated = recipe_prefix_ids(term)
+        if truncated and request.resolver_match.url_name.endswith('_changelist'):
+            self.message_user(request, f'Only the first {SEARCH_LIMIT} recipes whose name starts with '
+                                       f'"{term.strip()}" were searched; type more of the name to see the rest.',
+                              messages.WARNING)
+        return ids
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(ScalableAdmin):
     list_display = ['name', 'category', 'cuisine_origin', 'is_vegetarian']
     list_filter  = ['category', 'cuisine_origin', 'is_vegetarian']
-    search_fields = ['name', 'name_lower']
+    search_fields = ['name_lower']   # enables autocomplete; the lookup itself is get_search_results()
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(ingredient_prefix(search_term)), False
+
+
+class RecipeIngredientInline(admin.TabularInline):
+    model = RecipeIngredient
+    autocomplete_fields = ['ingredient']
+    extra = 0
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(ScalableAdmin):
     list_display = ['name', 'cuisine_type', 'category', 'difficulty', 'total_time']
-    list_filter  = ['cuisine_type', 'category', 'difficulty', 'is_vegetarian']
-    search_fields = ['name', 'cuisine_type']
+    list_filter  = [CuisineFilter, CategoryFilter, DifficultyFilter, 'is_vegetarian']
+    search_fields = ['name']
+    search_help_text = 'Recipe name prefix, or an exact recipe ID'
+    inlines = [RecipeIngredientInline]
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(Q(pk__in=self.recipe_search_ids(request, search_term)) |
+                               Q(recipe_id=search_term.strip())), False
+
+
+@admin.register(RecipeIngredient)
+class RecipeIngredientAdmin(ScalableAdmin):
+    list_display = ['recipe', 'ingredient', 'quantity', 'unit']
+    autocomplete_fields = ['recipe', 'ingredient']
+    search_fields = ['ingredient__name_lower']
+    search_help_text = 'Recipe or ingredient name prefix'
+
+    def get_queryset(self, request):
+        return (super().get_queryset(request).select_related('recipe', 'ingredient')
+                .only('quantity', 'unit', 'recipe', 'recipe__name', 'ingredient', 'ingredient__name'))
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        ingredients = Ingredient.objects.filter(ingredient_prefix(search_term)).values('pk')
+        return queryset.filter(Q(recipe_id__in=self.recipe_search_ids(request, search_term)) |
+                               Q(ingredient_id__in=ingredients)), False
 
 
 @admin.register(UserPantry)
 class PantryAdmin(admin.ModelAdmin):
     list_display = ['user', 'session_key', 'updated_at']
 
-admin.site.register(RecipeIngredient)
-admin.site.register(SavedRecipe)
+
+class JobForm(forms.ModelForm):
+    kind = forms.ChoiceField(choices=lambda: [(k, k) for k in sorted(jobs.TASKS)])
+
+    class Meta:
+        model = Job
+        fields = ['kind', 'args', 'run_after', 'max_attempts']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Queue jobs by adding them here; a `run_jobs` worker picks them up."""
+    form = JobForm
+    list_display = ['id', 'kind', 'status', 'progress', 'rate', 'attempts', 'worker', 'created_at', 'duration']
+    list_filter  = ['status', 'kind']
+    actions      = ['cancel_jobs', 'retry_jobs']
+    readonly_fields = ['status', 'attempts', 'cancel_requested', 'worker', 'heartbeat_at', 'done', 'total', 'rate',
+                       'message', 'result', 'error', 'created_at', 'started_at', 'finished_at']
+
+    def get_fields(self, request, obj=None):
+        return JobForm.Meta.fields if obj is None else JobForm.Meta.fields + self.readonly_fields
+
+    def get_readonly_fields(self, request, obj=None):
+        # Only a job that hasn't been picked up yet can be edited
+        if obj is not None and obj.status != Job.QUEUED:
+            return JobForm.Meta.fields + self.readonly_fields
+        return self.readonly_fields
+
+    @admin.display(description='Progress')
+    def progress(self, job):
+        done = f'{job.done}/{job.total}' if job.total else str(job.done)
+        return f'{done} ({job.percent}%)' if job.percent is not None else done
+
+    @admin.action(description='Cancel selected jobs')
+    def cancel_jobs(self, request, queryset):
+        cancelled = sum(jobs.cancel(pk) for pk in queryset.values_list('pk', flat=True))
+        self.message_user(request, f'{cancelled} job(s) cancelled or asked to stop.')
+
+    @admin.action(description='Retry selected failed/cancelled jobs')
+    def retry_jobs(self, request, queryset):
+        retried = sum(jobs.retry(pk) for pk in queryset.values_list('pk', flat=True))
+        self.message_user(request, f'{retried} job(s) queued again.')
+
+
+@admin.register(SavedRecipe)
+class SavedRecipeAdmin(ScalableAdmin):
+    list_display = ['user', 'recipe', 'saved_at']
+    list_select_related = ['user', 'recipe']
+    autocomplete_fields = ['user', 'recipe']
@@ -0,0 +1,181 @@
+"""
+Benchmark scenarios for the hot views, run in-process through the Django test
+client against whatever catalog is in the database (see generate_catalog).
+Used by `python manage.py benchmark`.
+"""
+import csv
+import io
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from contextlib import ExitStack
+
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.db.models import Count
+
+from .models import Ingredient, Recipe
+from .profiling import RequestProfile
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    """Register fn(client, ctx) -> response as a benchmark scenario."""
+    def register(fn):
+        SCENARIOS[name] = fn
+        return fn
+    return register
+
+
+class BenchContext:
+    """Catalog sample shared by all scenarios of one run."""
+
+    def __init__(self, seed=0, pantry_size=8):
+        self.rng = random.Random(seed)
+        # Pantry from the most-used ingredients, like a real starter pantry
+        self.pantry_ids = list(
+            Ingredient.objects.annotate(uses=Count('recipeingredient'))
+            .order_by('-uses', 'id').values_list('id', flat=True)[:pantry_size]
+        )
+        self.recipe_ids = list(Recipe.objects.order_by('?').values_list('id', flat=True)[:500])
+        self.search_terms = [
+            name[:self.rng.randint(2, 5)]
+            for name in Ingredient.objects.order_by('?').values_list('name_lower', flat=True)[:200]
+        ] or ['on']
+        self.pages = max(1, Recipe.objects.count() // 24)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SCENARIOS
+# ─────────────────────────────────────────────────────────────────────────────
+@scenario('api_match')
+def api_match(client, ctx):
+    return client.get('/api/match/', {'min_match': 10})
+
+
+@scenario('meal_plan')
+def meal_plan(client, ctx):
+    return client.get('/api/plan/', {'size': 5})
+
+
+@scenario('match_recipes')
+def match_recipes(client, ctx):
+    return client.get('/match/', {'page': ctx.rng.randint(1, 5)})
+
+
+@scenario('recipe_list')
+def recipe_list(client, ctx):
+    return client.get('/recipes/', {'page': ctx.rng.randint(1, ctx.pages)})
+
+
+@scenario('recipe_list_search')
+def recipe_list_search(client, ctx):
+    return client.get('/recipes/', {'q': ctx.rng.choice(ctx.search_terms)})
+
+
+@scenario('ingredient_search')
+def ingredient_search(client, ctx):
+    return client.get('/api/ingredients/search/', {'q': ctx.rng.choice(ctx.search_terms)})
+
+
+@scenario('recipe_detail')
+def recipe_detail(client, ctx):
+    return client.get(f'/recipes/{ctx.rng.choice(ctx.recipe_ids)}/')
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# RUNNER
+# ─────────────────────────────────────────────────────────────────────────────
+def percentile(values, pct):
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[pct - 1]
+
+
+def measure(fn, iterations, warmup=2, memory_samples=5):
+    """
+    Call fn() `iterations` times. Returns latency percentiles, queries and
+    DB time per call, and the tracemalloc peak over a separate short pass
+    (tracing distorts latency, so it never overlaps the timed pass).
+    """
+    for _ in range(warmup):
+        fn()
+    latencies, queries, db_ms = [], [], []
+    for _ in range(iterations):
+        profile = RequestProfile()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(profile.db_wrapper))
+            started = time.perf_counter()
+            fn()
+            latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(profile.queries)
+        db_ms.append(profile.db_ms)
+
+    tracemalloc.start()
+    try:
+        for _ in range(min(iterations, memory_samples)):
+            fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'queries_per_request': round(statistics.fmean(queries), 2),
+        'db_ms_per_request': round(statistics.fmean(db_ms), 3),
+        'peak_mem_kb': round(peak / 1024, 1),
+    }
+
+
+def run_view_scenario(name, client, ctx, iterations, warmup=2):
+    fn = SCENARIOS[name]
+
+    def call():
+        response = fn(client, ctx)
+        if response.status_code != 200:
+            raise RuntimeError(f'{name}: HTTP {response.status_code}')
+        return response
+
+    return measure(call, iterations, warmup)
+
+
+IMPORT_HEADER = [
+    'Recipe_ID', 'Recipe_Name', 'Country', 'Category', 'Ingredients', 'Total_Time_Minutes',
+    'Instructions', 'Calories_Per_Serving', 'Difficulty', 'Is_Vegetarian', 'Cuisine_Type',
+]
+
+
+def run_import_scenario(rows):
+    """
+    Time import_data on a synthetic CSV of `rows` recipes, linked against the
+    current ingredients. Runs in a transaction that is rolled back.
+    """
+    from .synthetic import recipe_rows
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, 'Global_Food_Recipes_Complete.csv'), 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(IMPORT_HEADER)
+            for row in recipe_rows(rows, seed=1):
+                writer.writerow([
+                    row['recipe_id'], row['name'], row['country'], row['category'], row['ingredients_raw'],
+                    row['total_time'], row['instructions'], row['calories'], row['difficulty'],
+                    'Yes' if row['is_vegetarian'] else 'No', row['cuisine_type'],
+                ])
+
+        def call():
+            with transaction.atomic():
+                call_command('import_data', data_dir=tmp, skip_ingredients=True, stdout=io.StringIO())
+                transaction.set_rollback(True)
+
+        result = measure(call, iterations=1, warmup=0, memory_samples=1)
+    result['rows'] = rows
+    return result
@@ -0,0 +1,145 @@
+"""
+Per-endpoint query budgets.
+
+BUDGETS declares, for every URL name in recipes.urls, the most queries a
+request may run and the most rows it may fetch (across all queries, session
+and auth lookups included). The tests replay each endpoint against them, and
+QueryBudgetMiddleware (QUERY_BUDGET_ENFORCE=True, for development) raises
+QueryBudgetExceeded on any live request that goes over, so an N+1 or a
+duplicated lookup fails loudly instead of surfacing as production latency.
+
+Row limits assume a pantry of up to PANTRY_ROWS ingredients.
+"""
+from collections import namedtuple
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+Budget = namedtuple('Budget', 'queries rows')
+
+PANTRY_ROWS = 50
+PAGE_ROWS = 2 * 24 + PANTRY_ROWS + 10   # page of ids + card rows on a cache miss
+
+# Query counts include the session/user lookups and, on catalog-backed views,
+# the periodic CatalogVersion re-check. They exclude the one-off catalog build.
+BUDGETS = {
+    'home':               Budget(queries=5, rows=PANTRY_ROWS + 5),
+    'match':              Budget(queries=6, rows=PAGE_ROWS),
+    'recipe_list':        Budget(queries=8, rows=PAGE_ROWS),
+    'recipe_detail':      Budget(queries=8, rows=PANTRY_ROWS + 21),
+    'saved_recipes':      Budget(queries=8, rows=PAGE_ROWS + settings.RECOMMENDATION_RECENT_SAVES + 12),
+    'register':           Budget(queries=22, rows=PANTRY_ROWS + 10),
+    'pantry_list':        Budget(queries=4, rows=PANTRY_ROWS + 5),
+    'pantry_toggle':      Budget(queries=6, rows=10),
+    'pantry_clear':       Budget(queries=4, rows=10),
+    'ingredient_search':  Budget(queries=5, rows=40 + PANTRY_ROWS + 5),
+    'ingredients_by_cat': Budget(queries=5, rows=500 + PANTRY_ROWS + 5),
+    'api_match':          Budget(queries=5, rows=PANTRY_ROWS + 5),
+    'nutrition_histograms': Budget(queries=1, rows=1),
+    'meal_plan':          Budget(queries=4, rows=PANTRY_ROWS + 5),
+    'catalog_index':      Budget(queries=1, rows=1),
+    # Exports: the queries made before the body starts streaming
+    'export_recipes':     Budget(queries=2, rows=2),
+    'export_matches':     Budget(queries=5, rows=PANTRY_ROWS + 5),
+    'save_recipe':        Budget(queries=7, rows=10),
+    'readiness':          Budget(queries=2, rows=2),
+}
+
+# Added on a visitor's first request, which creates their session and pantry
+NEW_SESSION = Budget(queries=8, rows=2)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class _CountingCursor:
+    """Proxy around a DB-API cursor that counts the rows fetched through it."""
+
+    def __init__(self, cursor, usage):
+        self._cursor = cursor
+        self._usage = usage
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._usage.rows += 1
+            yield row
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._usage.rows += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._usage.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._usage.rows += len(rows)
+        return rows
+
+
+class Usage:
+    __slots__ = ('queries', 'rows')
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        wrapper = context['cursor']
+        if not isinstance(wrapper.cursor, _CountingCursor):
+            wrapper.cursor = _CountingCursor(wrapper.cursor, self)
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def __repr__(self):
+        return f'<Usage queries={self.queries} rows={self.rows}>'
+
+
+@contextmanager
+def track():
+    """Count queries and fetched rows on every connection inside the block."""
+    usage = Usage()
+    with ExitStack() as stack:
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(usage.db_wrapper))
+        yield usage
+
+
+def check(url_name, usage, new_session=False):
+    """Raise QueryBudgetExceeded if `usage` is over the budget for `url_name`."""
+    budget = BUDGETS[url_name]
+    if new_session:
+        budget = Budget(budget.queries + NEW_SESSION.queries, budget.rows + NEW_SESSION.rows)
+    over = []
+    if usage.queries > budget.queries:
+        over.append(f'{usage.queries} queries (budget {budget.queries})')
+    if usage.rows > budget.rows:
+        over.append(f'{usage.rows} rows (budget {budget.rows})')
+    if over:
+        raise QueryBudgetExceeded(f'{url_name}: ' + ', '.join(over))
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ENFORCE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        new_session = settings.SESSION_COOKIE_NAME not in request.COOKIES
+        with track() as usage:
+            response = self.get_response(request)
+        match = request.resolver_match
+        if match and match.url_name in BUDGETS and match.namespace == '':
+            check(match.url_name, usage, new_session)
+        return response
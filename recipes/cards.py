@@ -0,0 +1,48 @@
+"""
+Per-recipe card fragment cache for the list and match grids.
+
+A card's markup depends only on the recipe row and the catalog version, so it
+is rendered once and cached under card:<variant>:v<version>:<pk>. Templates
+with per-request parts (the match badge) mark them with SLOT; the cached value
+is the list of static segments around those slots.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+SLOT = mark_safe('<!--card-slot-->')
+
+# Columns the card templates read; views load only these on a cache miss
+CARD_FIELDS = (
+    'id', 'name', 'category', 'cuisine_type', 'difficulty', 'total_time', 'calories',
+    'meal_time', 'is_vegetarian', 'image_url',
+    'visual_hue', 'visual_sat', 'visual_delay', 'visual_duration',
+)
+
+
+def card_key(variant, version, pk):
+    return f'card:{variant}:v{version}:{pk}'
+
+
+def card_fragments(variant, ids, version, load):
+    """
+    Return {pk: [segment, ...]} for `ids`, rendering recipes/_card_<variant>.html
+    only for cache misses. `load(missing_ids)` must return Recipe instances
+    with CARD_FIELDS loaded.
+    """
+    keys = {pk: card_key(variant, version, pk) for pk in ids}
+    cached = cache.get_many(keys.values())
+    missing = [pk for pk, key in keys.items() if key not in cached]
+    if missing:
+        template = f'recipes/_card_{variant}.html'
+        fresh = {
+            keys[recipe.pk]: render_to_string(template, {'recipe': recipe, 'slot': SLOT}).split(SLOT)
+            for recipe in load(missing)
+        }
+        cache.set_many(fresh, settings.CARD_CACHE_TIMEOUT)
+        cached.update(fresh)
+    return {
+        pk: [mark_safe(segment) for segment in cached[key]]
+        for pk, key in keys.items() if key in cached
+    }
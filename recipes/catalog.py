@@ -0,0 +1,530 @@
+"""
+In-memory recipe catalog shared by the matching views.
+
+The catalog is built once per process (or once in the gunicorn master before
+fork, see recipematch/wsgi.py) and rebuilt only when CatalogVersion changes.
+"""
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import profiling
+from .models import CatalogVersion, Ingredient, Recipe, RecipeIngredient, parse_ingredient_names
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# VERSIONING
+# ─────────────────────────────────────────────────────────────────────────────
+_state = threading.local()
+
+
+def current_version():
+    """Return the committed catalog version (0 before the first bump), as seen by the catalog connection."""
+    return CatalogVersion.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+
+def bump_version():
+    """Mark the catalog as changed so every worker rebuilds on its next check."""
+    if getattr(_state, 'paused', False):
+        _state.dirty = True
+        return
+    updated = CatalogVersion.objects.filter(pk=1).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+    if not updated:
+        CatalogVersion.objects.get_or_create(pk=1)
+    transaction.on_commit(invalidate)
+
+
+@contextmanager
+def batch_update():
+    """Suppress per-row version bumps during bulk writes; bump once at the end."""
+    _state.paused, _state.dirty = True, False
+    try:
+        yield
+    finally:
+        dirty = _state.dirty
+        _state.paused = _state.dirty = False
+        if dirty:
+            bump_version()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# CATALOG
+# ─────────────────────────────────────────────────────────────────────────────
+VEGETARIAN, VEGAN, GLUTEN_FREE = 1, 2, 4
+DIET_FLAGS = {'vegetarian': VEGETARIAN, 'vegan': VEGAN, 'gluten_free': GLUTEN_FREE}
+
+# Range-filterable nutrition columns and their display units
+NUTRIENTS = {
+    'calories': 'kcal', 'protein': 'g', 'carbohydrates': 'g', 'fat': 'g',
+    'fiber': 'g', 'sodium': 'mg', 'iron': 'mg', 'vitamin_c': 'mg',
+}
+HISTOGRAM_BINS = 20
+
+# Cached per-ingredient / per-filter position bitsets (n/8 bytes each) per catalog
+BITS_CACHE_SIZE = 256
+
+# Column order of the rows Catalog.from_rows() consumes
+ROW_FIELDS = ('id', 'name', 'ingredients_raw', 'category', 'cuisine_type', 'country',
+              'difficulty', 'is_vegetarian', 'is_vegan', 'is_gluten_free', 'total_time', *NUTRIENTS)
+
+
+def positions_to_bits(positions, n):
+    """Pack catalog positions into an int bitset over n recipes."""
+    buf = bytearray((n + 7) >> 3)
+    for pos in positions:
+        buf[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(buf, 'little')
+
+
+class Codes:
+    """Interned label <-> small integer code table for a low-cardinality column."""
+    __slots__ = ('labels', 'index')
+
+    def __init__(self):
+        self.labels = []
+        self.index = {}
+
+    def code(self, label):
+        c = self.index.get(label)
+        if c is None:
+            c = self.index[label] = len(self.labels)
+            self.labels.append(sys.intern(label))
+        return c
+
+    def __len__(self):
+        return len(self.labels)
+
+
+class CatalogRecipe:
+    """Read-only view of one catalog row, only materialized for returned results."""
+    __slots__ = ('id', 'name', 'category', 'cuisine_type', 'country', 'difficulty',
+                 'is_vegetarian', 'is_vegan', 'is_gluten_free', 'total_time', 'calories')
+
+    def __init__(self, catalog, pos):
+        flags = catalog.flags[pos]
+        self.id             = catalog.ids[pos]
+        self.name           = catalog.names[pos]
+        self.category       = catalog.category_codes.labels[catalog.category[pos]]
+        self.cuisine_type   = catalog.cuisine_codes.labels[catalog.cuisine[pos]]
+        self.country        = catalog.country_codes.labels[catalog.country[pos]]
+        self.difficulty     = catalog.difficulty_codes.labels[catalog.difficulty[pos]]
+        self.is_vegetarian  = bool(flags & VEGETARIAN)
+        self.is_vegan       = bool(flags & VEGAN)
+        self.is_gluten_free = bool(flags & GLUTEN_FREE)
+        self.total_time     = catalog.total_time[pos]
+        self.calories       = catalog.calories[pos]
+
+
+class Matches(list):
+    """Catalog.match() result: scored tuples, plus facet counts when requested."""
+    facets = None
+
+
+class Catalog:
+    """
+    Columnar catalog: one array per numeric field, interned integer codes for
+    category/cuisine/country/difficulty, and each recipe's cleaned ingredient
+    names stored as integer term ids (CSR layout) with an inverted index from
+    term to recipe positions. Positions follow Recipe's default name ordering.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.built_at = timezone.now()
+        self.ids        = array('q')
+        self.names      = []
+        self.category   = array('H')
+        self.cuisine    = array('H')
+        self.country    = array('H')
+        self.difficulty = array('H')
+        self.flags      = array('B')
+        self.total_time = array('i')
+        self.nutrition  = {name: array('d') for name in NUTRIENTS}
+        self.calories   = self.nutrition['calories']
+        self.term_offsets = array('I', [0])
+        self.term_ids     = array('I')
+        self.category_codes   = Codes()
+        self.cuisine_codes    = Codes()
+        self.country_codes    = Codes()
+        self.difficulty_codes = Codes()
+        self.terms            = Codes()
+        self._term_cache = {}
+        self._bits_cache = {}
+        self._name_order = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, version):
+        rows = Recipe.objects.values_list(*ROW_FIELDS).iterator(chunk_size=2000)
+        ingredient_counts = Counter(Ingredient.objects.order_by().values_list('category', flat=True))
+        links = RecipeIngredient.objects.order_by().values_list('recipe_id', 'ingredient_id').iterator(chunk_size=5000)
+        return cls.from_rows(version, rows, ingredient_counts, links)
+
+    @classmethod
+    def from_rows(cls, version, rows, ingredient_counts, links=()):
+        """`links` are the (recipe id, ingredient id) pairs of RecipeIngredient."""
+        catalog = cls(version)
+        for row in rows:
+            catalog._append(*row)
+        catalog._finalize(ingredient_counts, links)
+        return catalog
+
+    def _append(self, id, name, ingredients_raw, category, cuisine_type, country, difficulty,
+                is_vegetarian, is_vegan, is_gluten_free, total_time, *nutrition):
+        self.ids.append(id)
+        self.names.append(name)
+        self.category.append(self.category_codes.code(category))
+        self.cuisine.append(self.cuisine_codes.code(cuisine_type))
+        self.country.append(self.country_codes.code(country))
+        self.difficulty.append(self.difficulty_codes.code(difficulty))
+        self.flags.append((is_vegetarian and VEGETARIAN) | (is_vegan and VEGAN) | (is_gluten_free and GLUTEN_FREE))
+        self.total_time.append(total_time)
+        for column, value in zip(self.nutrition.values(), nutrition):
+            column.append(value or 0)
+        terms = {self.terms.code(n.lower().strip("[]'\" \t")) for n in parse_ingredient_names(ingredients_raw)}
+        self.term_ids.extend(sorted(terms))
+        self.term_offsets.append(len(self.term_ids))
+
+    def _finalize(self, ingredient_counts, links=()):
+        n = len(self.ids)
+
+        # Inverted index: term id -> recipe positions
+        postings = [array('I') for _ in range(len(self.terms))]
+        offsets, term_ids = self.term_offsets, self.term_ids
+        for pos in range(n):
+            for t in term_ids[offsets[pos]:offsets[pos + 1]]:
+                postings[t].append(pos)
+        self.postings = postings
+
+        # Sorted id column for id -> position lookups without a 100k-entry dict
+        order = sorted(range(n), key=self.ids.__getitem__)
+        self._id_order = array('I', order)
+        self._sorted_ids = array('q', (self.ids[i] for i in order))
+
+        # Ingredient id -> positions of the recipes linked to it through RecipeIngredient
+        # (joined through a throwaway id -> position dict, dropped after the build)
+        positions = {recipe_id: pos for pos, recipe_id in enumerate(self.ids)}
+        ingredient_postings = {}
+        for recipe_id, ingredient_id in links:
+            pos = positions.get(recipe_id)
+            if pos is not None:
+                ingredient_postings.setdefault(ingredient_id, array('I')).append(pos)
+        self.ingredient_postings = ingredient_postings
+
+        # Sorted nutrition columns: a range filter is two bisects on the values,
+        # and the matching positions are the slice of the order between them
+        self._nutrient_order, self._nutrient_values = {}, {}
+        for name, column in self.nutrition.items():
+            order = sorted(range(n), key=column.__getitem__)
+            self._nutrient_order[name] = array('I', order)
+            self._nutrient_values[name] = array('d', (column[i] for i in order))
+        self.histograms = {name: self._histogram(name) for name in NUTRIENTS}
+
+        # Facet metadata for the filter dropdowns, home page and stats
+        self.categories = sorted(self.category_codes.labels)
+        self.cuisines   = sorted(self.cuisine_codes.labels)
+        cuisine_counts  = Counter(self.cuisine)
+        self.top_cuisines = sorted(
+            ((self.cuisine_codes.labels[c], count) for c, count in cuisine_counts.items()
+             if self.cuisine_codes.labels[c]),
+            key=lambda c: (-c[1], c[0]),
+        )[:10]
+        self.ingredient_categories = sorted(ingredient_counts.items(), key=lambda c: (-c[1], c[0]))
+        self.stats = {
+            'recipes': n,
+            'ingredients': sum(ingredient_counts.values()),
+            'cuisines': len(self.cuisine_codes),
+            'countries': len(self.country_codes),
+        }
+
+    def _histogram(self, name):
+        """
+        HISTOGRAM_BINS equal-width bins from the minimum to the 99th percentile;
+        the last bin also counts the outliers above it, so one 10,000 mg sodium
+        row doesn't squash the rest of the distribution into the first bin.
+        """
+        values = self._nutrient_values[name]
+        if not values:
+            return {'unit': NUTRIENTS[name], 'min': 0, 'max': 0, 'bins': []}
+        low, high = values[0], values[min(len(values) - 1, int(len(values) * 0.99))]
+        width = (high - low) / HISTOGRAM_BINS or 1
+        edges = [low + width * i for i in range(HISTOGRAM_BINS)] + [float('inf')]
+        bins = [{'lo': round(lo, 1), 'hi': round(hi, 1) if hi != float('inf') else None,
+                 'count': bisect_left(values, hi) - bisect_left(values, lo)}
+                for lo, hi in zip(edges, edges[1:])]
+        return {'unit': NUTRIENTS[name], 'min': round(low, 1), 'max': round(values[-1], 1), 'bins': bins}
+
+    # ── Lookups ──────────────────────────────────────────────────────────────
+    def recipe(self, pos):
+        return CatalogRecipe(self, pos)
+
+    def position(self, recipe_id):
+        """Return the catalog position of a recipe id, or None."""
+        i = bisect_left(self._sorted_ids, recipe_id)
+        if i < len(self._sorted_ids) and self._sorted_ids[i] == recipe_id:
+            return self._id_order[i]
+        return None
+
+    def names_starting(self, prefix, limit=None):
+        """
+        Positions of the recipes whose name starts with `prefix` (ignoring
+        case), alphabetically: two bisects on a position array sorted by
+        lowercased name, built on first use (the admin search is its only
+        caller, so web workers never pay for it).
+        """
+        if self._name_order is None:
+            self._name_order = array('I', sorted(range(len(self)), key=lambda pos: self.names[pos].lower()))
+        prefix = prefix.lower()
+        key = lambda pos: self.names[pos].lower()
+        start = bisect_left(self._name_order, prefix, key=key)
+        stop = bisect_left(self._name_order, prefix + '\U0010ffff', key=key)
+        return self._name_order[start:stop if limit is None else min(stop, start + limit)]
+
+    def terms_matching(self, pantry_name):
+        """Term ids matching a pantry item (substring either way, as in Recipe.match_score)."""
+        hit = self._term_cache.get(pantry_name)
+        if hit is None:
+            hit = tuple(t for t, term in enumerate(self.terms.labels)
+                        if pantry_name in term or term in pantry_name)
+            if len(self._term_cache) > 4096:
+                self._term_cache.clear()
+            self._term_cache[pantry_name] = hit
+        return hit
+
+    def ingredient_bits(self, ingredient_id):
+        """
+        Bitset (int) of the positions linked to an ingredient: bit p is set
+        when recipe p uses it. Built on first use and cached per catalog.
+        """
+        bits = self._bits_cache.get(ingredient_id)
+        if bits is None:
+            bits = positions_to_bits(self.ingredient_postings.get(ingredient_id, ()), len(self))
+            if len(self._bits_cache) > BITS_CACHE_SIZE:
+                self._bits_cache.clear()
+            self._bits_cache[ingredient_id] = bits
+        return bits
+
+    def filter_bits(self, **filters):
+        """Bitset of the positions passing `filters`, cached per filter combination."""
+        key = tuple(sorted(filters.items()))
+        bits = self._bits_cache.get(key)
+        if bits is None:
+            predicate = self._predicate(**filters)
+            bits = ((1 << len(self)) - 1 if predicate is None
+                    else positions_to_bits(filter(predicate, range(len(self))), len(self)))
+            if len(self._bits_cache) > BITS_CACHE_SIZE:
+                self._bits_cache.clear()
+            self._bits_cache[key] = bits
+        return bits
+
+    # ── Filtering & scoring ─────────────────────────────────────────────────
+    def in_range(self, name, lo=None, hi=None):
+        """Positions whose `name` nutrient lies in [lo, hi] (None = unbounded), via the sorted column."""
+        values = self._nutrient_values[name]
+        start = 0 if lo is None else bisect_left(values, lo)
+        stop = len(values) if hi is None else bisect_right(values, hi)
+        return self._nutrient_order[name][start:stop]
+
+    def _predicate(self, category='', cuisine='', difficulty='', diet='', nutrition=(), max_time=None):
+        """
+        Build a position -> bool check for the view filters, or None when no
+        filter is set. Unknown labels match nothing. `nutrition` holds
+        (nutrient, lo, hi) ranges, see in_range().
+        """
+        checks = []
+        if max_time:
+            total_time = self.total_time
+            checks.append(lambda pos: total_time[pos] <= max_time)
+        if nutrition:
+            # Start from the narrowest range and intersect the others into it
+            ranges = sorted((self.in_range(*r) for r in nutrition), key=len)
+            allowed = set(ranges[0]).intersection(*ranges[1:])
+            checks.append(allowed.__contains__)
+        checks.extend(check for _, check in self._facet_checks(category, cuisine, difficulty, diet))
+        if not checks:
+            return None
+        return lambda pos: all(check(pos) for check in checks)
+
+    def _facet_checks(self, category='', cuisine='', difficulty='', diet=''):
+        """(facet, position -> bool) for each facet filter that is set."""
+        checks = []
+        for facet, label, codes, column in (('category', category, self.category_codes, self.category),
+                                            ('cuisine', cuisine, self.cuisine_codes, self.cuisine),
+                                            ('difficulty', difficulty, self.difficulty_codes, self.difficulty)):
+            if label:
+                code = codes.index.get(label, -1)
+                checks.append((facet, lambda pos, column=column, code=code: column[pos] == code))
+        flag = DIET_FLAGS.get(diet)
+        if flag:
+            flags = self.flags
+            checks.append(('diet', lambda pos: flags[pos] & flag))
+        return checks
+
+    def filter(self, **filters):
+        """Yield positions passing the same filters the views apply to querysets."""
+        predicate = self._predicate(**filters)
+        return range(len(self)) if predicate is None else (p for p in range(len(self)) if predicate(p))
+
+    def match(self, pantry_names, min_match=0, facets=False, **filters):
+        """
+        Score recipes passing `filters` against the pantry, with the same
+        semantics as Recipe.match_score. Returns Matches: (position, matched,
+        total, pct) tuples with pct >= min_match, best match first. With
+        `facets`, Matches.facets is filled in the same pass, see _facet_counts().
+        """
+        pantry_lower = [p.lower().strip() for p in pantry_names]
+        total = len(pantry_lower)
+        if not total:
+            return Matches()
+
+        with profiling.timer('score'):
+            # Walk the inverted index: each pantry item counts once per recipe
+            counts = Counter()
+            postings = self.postings
+            for p in pantry_lower:
+                hits = set()
+                for t in self.terms_matching(p):
+                    hits.update(postings[t])
+                counts.update(hits)
+
+            candidates = range(len(self)) if min_match <= 0 else counts.keys()
+            if facets:
+                scored, facet_counts = self._match_with_facets(candidates, counts, total, min_match, **filters)
+            else:
+                predicate = self._predicate(**filters)
+                scored, facet_counts = Matches(), None
+                for pos in candidates:
+                    if predicate is not None and not predicate(pos):
+                        continue
+                    matched = counts.get(pos, 0)
+                    pct = round(matched / total * 100)
+                    if pct >= min_match:
+                        scored.append((pos, matched, total, pct))
+            scored.sort(key=lambda s: (-s[3], -s[1], s[0]))
+            scored.facets = facet_counts
+        profiling.count('rows_scored', len(candidates))
+        return scored
+
+    def _match_with_facets(self, candidates, counts, total, min_match, category='', cuisine='',
+                           difficulty='', diet='', **filters):
+        """
+        The scoring loop of match() plus facet counts, computed like a
+        multi-select facet: a matching recipe counts toward a facet's values
+        when it passes every *other* filter, so each dropdown shows what picking
+        a different value would return. A recipe failing exactly one facet
+        filter is counted for that facet only; failing two, for none.
+        """
+        predicate = self._predicate(**filters)   # non-facet filters (nutrition, max_time) always apply
+        checks = self._facet_checks(category, cuisine, difficulty, diet)
+        near = {facet: [] for facet, _ in checks}   # positions failing only that facet's filter
+        scored = Matches()
+        for pos in candidates:
+            if predicate is not None and not predicate(pos):
+                continue
+            matched = counts.get(pos, 0)
+            pct = round(matched / total * 100)
+            if pct < min_match:
+                continue
+            failed = None
+            for facet, check in checks:
+                if not check(pos):
+                    if failed is not None:
+                        break
+                    failed = facet
+            else:
+                if failed is None:
+                    scored.append((pos, matched, total, pct))
+                else:
+                    near[failed].append(pos)
+        passed = [s[0] for s in scored]
+        columns = {facet: Counter(map(column.__getitem__, passed + near.get(facet, [])))
+                   for facet, column in (('category', self.category), ('cuisine', self.cuisine),
+                                         ('difficulty', self.difficulty), ('diet', self.flags))}
+        return scored, self._facet_counts(columns)
+
+    def _facet_counts(self, columns):
+        """{facet: {label: count}} from the code/flag counters, biggest first."""
+        diet = Counter()
+        for value, n in columns['diet'].items():
+            for name, flag in DIET_FLAGS.items():
+                if value & flag:
+                    diet[name] += n
+        labelled = {
+            'category': {self.category_codes.labels[c]: n for c, n in columns['category'].items()},
+            'cuisine': {self.cuisine_codes.labels[c]: n for c, n in columns['cuisine'].items()},
+            'difficulty': {self.difficulty_codes.labels[c]: n for c, n in columns['difficulty'].items()},
+            'diet': diet,
+        }
+        return {facet: dict(sorted(((label, n) for label, n in counts.items() if label),
+                                   key=lambda c: (-c[1], c[0])))
+                for facet, counts in labelled.items()}
+
+    def score(self, pantry_names, positions):
+        """
+        {position: (matched, total, pct)} for just `positions`, with match()'s
+        semantics. Walks each recipe's own term ids instead of the pantry's
+        postings, so the cost follows len(positions), not the catalog size.
+        """
+        pantry_lower = [p.lower().strip() for p in pantry_names]
+        total = len(pantry_lower)
+        items_by_term = {}
+        for i, p in enumerate(pantry_lower):
+            for t in self.terms_matching(p):
+                items_by_term.setdefault(t, set()).add(i)
+        scores = {}
+        offsets, term_ids = self.term_offsets, self.term_ids
+        for pos in positions:
+            items = set()
+            for t in term_ids[offsets[pos]:offsets[pos + 1]]:
+                items.update(items_by_term.get(t, ()))
+            matched = len(items)
+            scores[pos] = (matched, total, round(matched / total * 100) if total else 0)
+        return scores
+
+
+_lock = threading.Lock()
+_catalog = None
+_checked_at = 0.0
+
+
+def get_catalog():
+    """
+    Return the process-wide catalog, rebuilding it when CatalogVersion moved.
+    The version is re-read at most every CATALOG_VERSION_TTL seconds. While
+    one thread re-checks or rebuilds, the others keep getting the previous
+    catalog instead of queueing behind the build; only the very first build
+    makes callers wait.
+    """
+    global _catalog, _checked_at
+    catalog = _catalog
+    if catalog is not None and time.monotonic() - _checked_at < settings.CATALOG_VERSION_TTL:
+        return catalog
+    if not _lock.acquire(blocking=catalog is None):
+        return catalog
+    try:
+        version = current_version()
+        if _catalog is None or _catalog.version != version:
+            _catalog = Catalog.build(version)
+        _checked_at = time.monotonic()
+        return _catalog
+    finally:
+        _lock.release()
+
+
+def invalidate():
+    """Drop this process's catalog; the next get_catalog() rebuilds it."""
+    global _catalog
+    _catalog = None
@@ -0,0 +1,86 @@
+"""
+Compact catalog index for scoring pantry matches in the browser.
+
+static/js/main.js downloads it once per catalog version and recomputes the
+pantry drawer's "N recipes match" count and top-10 preview locally on every
+toggle, so no scoring request reaches the server until the user opens /match/
+(which stays the authority). The index carries exactly what Catalog.match()
+scores with: every recipe's term ids (the cleaned ingredient names the inverted
+index is built on), the term vocabulary, and the filter code columns.
+
+Numeric columns are packed as little-endian typed arrays, each in the
+narrowest of Uint8/16/32 its values fit, base64-encoded into one JSON
+document that is gzipped once per catalog version:
+
+    {"version": 7, "count": n, "terms": [...], "names": [...],
+     "labels": {"category": [...], "cuisine": [...], "difficulty": [...]},
+     "flags": {"vegetarian": 1, ...},
+     "arrays": {"ids": ["Uint32", "<base64>"], "term_counts": [...], "term_ids": [...],
+                "category": [...], "cuisine": [...], "difficulty": [...], "flags": [...]}}
+
+Arrays are in catalog position order; a recipe's term ids are term_ids[start:
+start + term_counts[pos]], start being the sum of the counts before it.
+"""
+import base64
+import gzip
+import json
+import sys
+import threading
+import weakref
+from array import array
+
+from .catalog import DIET_FLAGS
+
+_TYPES = (('B', 'Uint8', 0xFF), ('H', 'Uint16', 0xFFFF), ('I', 'Uint32', 0xFFFFFFFF))
+
+_lock = threading.Lock()
+_indexes = weakref.WeakKeyDictionary()   # catalog -> gzipped index, dropped with the catalog
+
+
+def pack(values):
+    """[JS typed array name, base64 of the little-endian values] in the narrowest type that fits."""
+    values = list(values)
+    top = max(values, default=0)
+    typecode, name = next((t, n) for t, n, limit in _TYPES if top <= limit)
+    packed = array(typecode, values)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return [name, base64.b64encode(packed.tobytes()).decode('ascii')]
+
+
+def build(catalog):
+    """Encode `catalog` as the JSON index (bytes) described above."""
+    offsets = catalog.term_offsets
+    document = {
+        'version': catalog.version,
+        'count': len(catalog),
+        'terms': catalog.terms.labels,
+        'names': catalog.names,
+        'labels': {
+            'category': catalog.category_codes.labels,
+            'cuisine': catalog.cuisine_codes.labels,
+            'difficulty': catalog.difficulty_codes.labels,
+        },
+        'flags': DIET_FLAGS,
+        'arrays': {
+            'ids': pack(catalog.ids),
+            'term_counts': pack(offsets[pos + 1] - offsets[pos] for pos in range(len(catalog))),
+            'term_ids': pack(catalog.term_ids),
+            'category': pack(catalog.category),
+            'cuisine': pack(catalog.cuisine),
+            'difficulty': pack(catalog.difficulty),
+            'flags': pack(catalog.flags),
+        },
+    }
+    return json.dumps(document, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def get_index(catalog):
+    """The gzipped index of `catalog`, built once per catalog (only the compressed copy is kept)."""
+    gzipped = _indexes.get(catalog)
+    if gzipped is None:
+        with _lock:
+            gzipped = _indexes.get(catalog)
+            if gzipped is None:
+                gzipped = _indexes[catalog] = gzip.compress(build(catalog), compresslevel=9, mtime=0)
+    return gzipped
@@ -0,0 +1,90 @@
+"""
+Streaming NDJSON/CSV exports of the catalog and of pantry match results.
+
+Rows come from generators (a chunked queryset iterator or the shared scored
+list) and are encoded into ~64 KB chunks as the client reads them, so memory
+stays flat however many rows are exported. With gzip on, the chunks go
+through one incremental zlib stream and the download is a .gz file.
+"""
+import csv
+import io
+import json
+import zlib
+
+from django.http import StreamingHttpResponse
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv':    'text/csv; charset=utf-8',
+}
+CHUNK_BYTES = 64 * 1024
+QUERY_CHUNK_SIZE = 2000
+
+RECIPE_FIELDS = (
+    'id', 'recipe_id', 'name', 'category', 'sub_category', 'cuisine_type', 'country', 'region',
+    'difficulty', 'is_vegetarian', 'is_vegan', 'is_gluten_free', 'prep_time', 'cook_time',
+    'total_time', 'servings', 'calories', 'protein', 'carbohydrates', 'fat', 'fiber', 'sodium',
+    'ingredients_raw',
+)
+MATCH_FIELDS = (
+    'id', 'name', 'pct', 'matched', 'total', 'category', 'cuisine', 'difficulty', 'time', 'calories',
+)
+
+
+def match_rows(catalog, scored):
+    """Yield one tuple per scored recipe in MATCH_FIELDS order, built from catalog columns."""
+    for pos, matched, total, pct in scored:
+        r = catalog.recipe(pos)
+        yield (r.id, r.name, pct, matched, total, r.category, r.cuisine_type,
+               r.difficulty, r.total_time, r.calories)
+
+
+def ndjson_chunks(rows, fields):
+    buf, size = [], 0
+    for row in rows:
+        line = json.dumps(dict(zip(fields, row)), ensure_ascii=False) + '\n'
+        buf.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield ''.join(buf).encode()
+            buf, size = [], 0
+    if buf:
+        yield ''.join(buf).encode()
+
+
+def csv_chunks(rows, fields):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(fields)
+    for row in rows:
+        writer.writerow(row)
+        if buf.tell() >= CHUNK_BYTES:
+            yield buf.getvalue().encode()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+
+def gzip_chunks(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream(rows, fields, fmt, filename, compress=False):
+    """StreamingHttpResponse writing `rows` as `fmt`; `fmt` must be a key of FORMATS."""
+    chunks = (ndjson_chunks if fmt == 'ndjson' else csv_chunks)(rows, fields)
+    filename = f'{filename}.{fmt}'
+    content_type = FORMATS[fmt]
+    if compress:
+        chunks = gzip_chunks(chunks)
+        filename += '.gz'
+        content_type = 'application/gzip'
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Cache-Control'] = 'no-store'
+    return response
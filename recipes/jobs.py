@@ -0,0 +1,318 @@
+"""
+Background jobs queued in the database, run by `python manage.py run_jobs`.
+
+Tasks are functions registered with @task(kind) that take a Progress as
+their first argument plus the Job's JSON args, and return a JSON-able
+result. enqueue() (or the admin) adds a Job row; workers poll for ready
+rows and run one at a time.
+
+Locking uses no broker and no SELECT ... FOR UPDATE SKIP LOCKED: a worker
+claims a job with a compare-and-swap UPDATE (WHERE id = ? AND status =
+'queued'). Exactly one worker's UPDATE matches, whichever way SQLite (one
+writer at a time) or MySQL (row locks) serializes them. Every later write
+of the worker also filters on worker = <its name>, so a job whose lease was
+taken over cannot be overwritten by the worker that lost it.
+
+The task runs in its own thread, with its own DB connection, so progress
+writes never join a transaction the task has open (import_data imports
+inside one). The worker thread records the task's progress, throughput and
+a heartbeat every JOB_HEARTBEAT_INTERVAL seconds. A running job whose
+heartbeat is older than JOB_LEASE_SECONDS belongs to a dead worker, and the
+next claim() requeues it.
+
+On SQLite nothing else can write while a task holds a write transaction, so
+those heartbeats are skipped. Progress then also writes the heartbeat through
+the task's own transaction: it commits together with the task's work, and the
+job is never visible to other workers with a lease that expired mid-import.
+The stretch between a task's last progress() call inside a transaction and
+its commit must still fit inside one JOB_LEASE_SECONDS lease. Claims and
+outcome writes that hit a locked database are retried instead of stopping
+the worker.
+
+A failed task is retried after JOB_RETRY_DELAY * 2 ** (attempts - 1)
+seconds until max_attempts. Cancelling a queued job is immediate. A running
+job is flagged instead, and the task stops with Cancelled at its next
+progress() call.
+"""
+import io
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DatabaseError, connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import catalog, recommendations
+from .models import Job, Recipe
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+def task(kind):
+    """Register `fn(progress, **args)` as the task run for Jobs of `kind`."""
+    def register(fn):
+        TASKS[kind] = fn
+        return fn
+    return register
+
+
+class Cancelled(BaseException):
+    """
+    Raised by Progress when the job was cancelled or its lease was lost. A
+    BaseException (like asyncio.CancelledError) so the per-row `except
+    Exception` handlers in tasks such as import_data don't swallow it.
+    """
+
+
+class Progress:
+    """
+    Handed to each task: report how far it got, and stop when asked to.
+    `renew(progress)`, if given, is called from the task's thread at most
+    every JOB_HEARTBEAT_INTERVAL seconds (see Worker.renew_in_task()).
+    """
+
+    def __init__(self, renew=None):
+        self.done = 0
+        self.total = None
+        self.message = ''
+        self.cancelled = threading.Event()
+        self.renew = renew
+        self._renewed_at = time.monotonic()
+
+    def __call__(self, done, total=None, message=None):
+        self.done = done
+        if total is not None:
+            self.total = total
+        if message is not None:
+            self.message = message[:200]
+        if self.renew is not None and time.monotonic() - self._renewed_at >= settings.JOB_HEARTBEAT_INTERVAL:
+            self._renewed_at = time.monotonic()
+            self.renew(self)
+        if self.cancelled.is_set():
+            raise Cancelled
+
+
+def enqueue(kind, run_after=None, max_attempts=None, **args):
+    """Queue a `kind` task with `args`; returns the Job."""
+    if kind not in TASKS:
+        raise ValueError(f'Unknown job kind {kind!r}')
+    return Job.objects.create(kind=kind, args=args, run_after=run_after or timezone.now(),
+                              max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS)
+
+
+def cancel(job_id):
+    """Cancel a queued job now, or ask a running one to stop; returns whether either applied."""
+    now = timezone.now()
+    if Job.objects.filter(pk=job_id, status=Job.QUEUED).update(status=Job.CANCELLED, finished_at=now):
+        return True
+    return bool(Job.objects.filter(pk=job_id, status=Job.RUNNING).update(cancel_requested=True))
+
+
+def retry(job_id):
+    """Queue a failed or cancelled job again with a fresh set of attempts."""
+    return bool(Job.objects.filter(pk=job_id, status__in=[Job.FAILED, Job.CANCELLED]).update(
+        status=Job.QUEUED, run_after=timezone.now(), attempts=0, cancel_requested=False,
+        worker='', error='', finished_at=None,
+    ))
+
+
+def reap(now=None):
+    """Requeue (or fail, when out of attempts) running jobs whose lease expired; returns how many."""
+    now = now or timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING,
+                               heartbeat_at__lt=now - timedelta(seconds=settings.JOB_LEASE_SECONDS))
+    reaped = 0
+    for job in stale.only('pk', 'attempts', 'max_attempts', 'heartbeat_at', 'worker'):
+        lost = f'Lease expired (worker {job.worker} stopped heartbeating)'
+        if job.attempts >= job.max_attempts:
+            changes = {'status': Job.FAILED, 'finished_at': now, 'error': lost}
+        else:
+            changes = {'status': Job.QUEUED, 'run_after': now, 'error': lost}
+        # CAS on the heartbeat seen: a worker that comes back meanwhile keeps its job
+        reaped += Job.objects.filter(pk=job.pk, status=Job.RUNNING, heartbeat_at=job.heartbeat_at).update(
+            worker='', **changes)
+    return reaped
+
+
+class Worker:
+    def __init__(self, name=None):
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+
+    def claim(self):
+        """Take the next ready job (oldest run_after first), or None."""
+        now = timezone.now()
+        reap(now)
+        ready = (Job.objects.filter(status=Job.QUEUED, run_after__lte=now)
+                 .order_by('run_after', 'pk').values_list('pk', flat=True)[:10])
+        for pk in ready:
+            claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+                status=Job.RUNNING, worker=self.name, attempts=F('attempts') + 1, cancel_requested=False,
+                started_at=now, heartbeat_at=now, done=0, total=None, rate=None, message='')
+            if claimed:
+                return Job.objects.get(pk=pk)
+        return None
+
+    def run(self, job):
+        """Run a claimed job to completion and record its outcome; returns the final status."""
+        fn = TASKS.get(job.kind)
+        started = time.monotonic()
+        progress, outcome = Progress(renew=lambda p: self.renew_in_task(job, p, started)), {}
+
+        def target():
+            try:
+                if fn is None:
+                    raise LookupError(f'Unknown job kind {job.kind!r}')
+                outcome['result'] = fn(progress, **job.args)
+            except BaseException as e:
+                outcome['error'] = e
+                outcome['traceback'] = traceback.format_exc()
+            finally:
+                connections.close_all()   # this thread's own connections
+
+        thread = threading.Thread(target=target, name=f'job-{job.pk}', daemon=True)
+        thread.start()
+        while thread.is_alive():
+            thread.join(settings.JOB_HEARTBEAT_INTERVAL)
+            if thread.is_alive() and not self.heartbeat(job, progress, started):
+                progress.cancelled.set()
+        return self.finish(job, progress, started, outcome)
+
+    def heartbeat(self, job, progress, started):
+        """
+        Record progress and extend the lease; False once the job was cancelled
+        or taken over. A write the database refuses (SQLite is locked while
+        the task holds a write transaction) is skipped until the next beat.
+        """
+        try:
+            return bool(Job.objects.filter(pk=job.pk, worker=self.name, status=Job.RUNNING,
+                                           cancel_requested=False).update(
+                heartbeat_at=timezone.now(), **self._progress_fields(progress, started)))
+        except DatabaseError:
+            logger.warning('job %s: heartbeat skipped', job.pk, exc_info=True)
+            return True
+
+    def renew_in_task(self, job, progress, started):
+        """
+        Heartbeat from the task's thread while it is inside a SQLite write
+        transaction, where heartbeat() can't write: the row update joins the
+        task's transaction and lands with its commit.
+        """
+        alias = router.db_for_write(Job)
+        connection = connections[alias]
+        if connection.vendor != 'sqlite' or not connection.in_atomic_block:
+            return
+        try:
+            with transaction.atomic(using=alias):   # a savepoint: a failed write leaves the task's work intact
+                Job.objects.filter(pk=job.pk, worker=self.name, status=Job.RUNNING).update(
+                    heartbeat_at=timezone.now(), **self._progress_fields(progress, started))
+        except DatabaseError:
+            logger.warning('job %s: in-transaction heartbeat skipped', job.pk, exc_info=True)
+
+    def finish(self, job, progress, started, outcome):
+        now = timezone.now()
+        fields = {'finished_at': now, **self._progress_fields(progress, started)}
+        error = outcome.get('error')
+        if error is None:
+            fields.update(status=Job.SUCCEEDED, result=outcome.get('result'), error='')
+        elif isinstance(error, Cancelled):
+            fields.update(status=Job.CANCELLED)
+        elif job.attempts < job.max_attempts:
+            delay = settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            fields.update(status=Job.QUEUED, run_after=now + timedelta(seconds=delay),
+                          finished_at=None, worker='', error=outcome['traceback'])
+        else:
+            fields.update(status=Job.FAILED, error=outcome['traceback'])
+        if not self._write_outcome(job, fields):
+            logger.warning('job %s: lease lost before it finished, outcome dropped', job.pk)
+            return None
+        logger.info('job %s (%s) %s in %.1fs', job.pk, job.kind, fields['status'], time.monotonic() - started)
+        return fields['status']
+
+    def _write_outcome(self, job, fields):
+        """
+        Record the outcome; a locked database is retried for up to one lease
+        rather than losing a finished job to reap() and running it again.
+        """
+        deadline = time.monotonic() + settings.JOB_LEASE_SECONDS
+        while True:
+            try:
+                return Job.objects.filter(pk=job.pk, worker=self.name, status=Job.RUNNING).update(**fields)
+            except DatabaseError:
+                if time.monotonic() >= deadline:
+                    raise
+                logger.warning('job %s: outcome write failed, retrying', job.pk, exc_info=True)
+                time.sleep(settings.JOB_HEARTBEAT_INTERVAL)
+
+    @staticmethod
+    def _progress_fields(progress, started):
+        elapsed = time.monotonic() - started
+        return {'done': progress.done, 'total': progress.total, 'message': progress.message,
+                'rate': round(progress.done / elapsed, 2) if elapsed > 0 else None}
+
+    def work(self, once=False, poll=None, stop=None):
+        """
+        Claim and run jobs until `stop` (a threading.Event) is set, sleeping
+        `poll` seconds when the queue is empty. With `once`, return as soon
+        as no job is ready. Returns the number of jobs run.
+        """
+        poll = settings.JOB_POLL_INTERVAL if poll is None else poll
+        stop = stop or threading.Event()
+        ran = 0
+        while not stop.is_set():
+            try:
+                job = self.claim()
+            except DatabaseError:
+                # e.g. "database is locked" while another worker's task writes to SQLite
+                logger.warning('claim failed, retrying in %ss', poll, exc_info=True)
+                stop.wait(poll)
+                continue
+            if job is None:
+                if once:
+                    break
+                stop.wait(poll)
+                continue
+            self.run(job)
+            ran += 1
+        return ran
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# TASKS
+# ─────────────────────────────────────────────────────────────────────────────
+@task('import_data')
+def import_data(progress, data_dir='data', skip_recipes=False, skip_ingredients=False):
+    """The import_data command; its single catalog version bump lands when it commits."""
+    call_command('import_data', data_dir=data_dir, skip_recipes=skip_recipes,
+                 skip_ingredients=skip_ingredients, progress=progress, stdout=io.StringIO())
+    return {'recipes': Recipe.objects.count()}
+
+
+@task('build_recommendations')
+def build_recommendations(progress, full=False):
+    recipes, rows = recommendations.build(full=full, progress=progress)
+    return {'recipes': recipes, 'neighbors': rows}
+
+
+@task('rebuild_catalog')
+def rebuild_catalog(progress):
+    """
+    Build the catalog here first, so a row that breaks the build fails this
+    job instead of every web worker, then bump CatalogVersion. Each web
+    process then rebuilds on one thread while its others keep serving the
+    previous catalog (see catalog.get_catalog()).
+    """
+    progress(0, 2, 'building')
+    snapshot = catalog.Catalog.build(catalog.current_version())
+    progress(1, 2, 'publishing')
+    catalog.bump_version()
+    progress(2, 2, 'done')
+    return {'recipes': len(snapshot), 'version': catalog.current_version()}
@@ -0,0 +1,239 @@
+"""
+Traffic replay for `python manage.py loadtest`.
+
+Each VirtualUser is a thread with its own cookie jar (session + CSRF token)
+talking HTTP to a running server. It either follows a synthetic flow from
+FLOWS (the pantry flow: home → category browse → pantry toggles → match →
+detail → save, or a mixed JSON API flow) or replays recorded sessions from a JSONL file with one request per line:
+
+    {"session": "a1", "at": 0.42, "method": "POST",
+     "path": "/api/pantry/toggle/", "json": {"ingredient_id": 17}}
+
+Requests are grouped by URL name and timed; errors are classified so SQLite
+lock contention ("database is locked") and timeouts stand out.
+"""
+import json
+import re
+import socket
+import threading
+import time
+from collections import defaultdict
+from http.cookiejar import CookieJar
+from itertools import groupby
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote, urlencode, urlsplit
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+from .benchmarks import percentile
+
+RECIPE_LINK = re.compile(r'href="/recipes/(\d+)/"')
+
+
+class _NoRedirect(HTTPRedirectHandler):
+    """Surface 3xx responses instead of following them, so each hop is timed once."""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def endpoint(path):
+    try:
+        return resolve(urlsplit(path).path).url_name or path
+    except Resolver404:
+        return path
+
+
+def classify(status, body):
+    if status >= 500:
+        if b'database is locked' in body or b'database table is locked' in body:
+            return 'locked'
+        return 'unavailable' if status == 503 else 'server_error'
+    if status >= 400:
+        return f'http_{status}'
+    return None
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# STATS
+# ─────────────────────────────────────────────────────────────────────────────
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, name, ms, error=None):
+        with self._lock:
+            self.latencies[name].append(ms)
+            if error:
+                self.errors[name][error] += 1
+
+    def summary(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        endpoints = {}
+        for name, values in sorted(self.latencies.items()):
+            ordered = sorted(values)
+            endpoints[name] = {
+                'requests': len(values),
+                'rps': round(len(values) / elapsed, 2),
+                'p50_ms': round(percentile(ordered, 50), 2),
+                'p95_ms': round(percentile(ordered, 95), 2),
+                'p99_ms': round(percentile(ordered, 99), 2),
+                'max_ms': round(ordered[-1], 2),
+                'errors': dict(self.errors[name]),
+            }
+        total = sum(e['requests'] for e in endpoints.values())
+        return {
+            'elapsed_s': round(elapsed, 2),
+            'requests': total,
+            'rps': round(total / elapsed, 2) if elapsed else 0,
+            'errors': sum(sum(e['errors'].values()) for e in endpoints.values()),
+            'endpoints': endpoints,
+        }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# VIRTUAL USERS
+# ─────────────────────────────────────────────────────────────────────────────
+class VirtualUser:
+    def __init__(self, base_url, stats, timeout=10.0, recorder=None, name=''):
+        self.base_url = base_url.rstrip('/')
+        self.stats = stats
+        self.timeout = timeout
+        self.recorder = recorder
+        self.name = name
+        self.jar = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.jar), _NoRedirect)
+        self.logged_in = False
+        self.pantry_ready = False
+        self.started = time.perf_counter()
+
+    def csrf_token(self):
+        return next((c.value for c in self.jar if c.name == settings.CSRF_COOKIE_NAME), '')
+
+    def request(self, method, path, json_body=None, form=None):
+        """Send one request; returns (status, body), or (None, b'') on a network error."""
+        if self.recorder:
+            self.recorder.write(self.name, time.perf_counter() - self.started, method, path, json_body, form)
+        headers = {'Referer': self.base_url + '/'}
+        data = None
+        if method == 'POST':
+            headers['X-CSRFToken'] = self.csrf_token()
+            if form is not None:
+                data = urlencode({**form, 'csrfmiddlewaretoken': self.csrf_token()}).encode()
+                headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            else:
+                data = json.dumps(json_body or {}).encode()
+                headers['Content-Type'] = 'application/json'
+
+        name = endpoint(path)
+        started = time.perf_counter()
+        status, body, error = None, b'', None
+        try:
+            with self.opener.open(Request(self.base_url + path, data, headers, method=method),
+                                  timeout=self.timeout) as response:
+                status, body = response.status, response.read()
+        except HTTPError as e:
+            status, body = e.code, e.read()
+        except (socket.timeout, TimeoutError):
+            error = 'timeout'
+        except URLError as e:
+            error = 'timeout' if isinstance(e.reason, (socket.timeout, TimeoutError)) else 'connection'
+        except (ConnectionError, OSError):
+            error = 'connection'
+        if status is not None:
+            error = classify(status, body)
+        self.stats.record(name, (time.perf_counter() - started) * 1000, error)
+        return status, body
+
+    def get(self, path):
+        return self.request('GET', path)
+
+    def post(self, path, json_body=None, form=None):
+        return self.request('POST', path, json_body, form)
+
+
+class Recorder:
+    """Write the requests virtual users make in the replay format."""
+
+    def __init__(self, f):
+        self.f = f
+        self._lock = threading.Lock()
+
+    def write(self, session, at, method, path, json_body, form):
+        line = {'session': session, 'at': round(at, 3), 'method': method, 'path': path}
+        if json_body is not None:
+            line['json'] = json_body
+        if form is not None:
+            line['form'] = form
+        with self._lock:
+            self.f.write(json.dumps(line) + '\n')
+
+
+def pantry_flow(user, rng, categories, toggles, register_as=None):
+    """One pass of the pantry-and-match flow."""
+    user.get('/')
+    status, body = user.get(f'/api/ingredients/{quote(rng.choice(categories))}/')
+    ids = [i['id'] for i in json.loads(body)['ingredients']] if status == 200 else []
+    for ing_id in rng.sample(ids, min(toggles, len(ids))):
+        user.post('/api/pantry/toggle/', {'ingredient_id': ing_id})
+
+    status, body = user.get('/match/')
+    recipe_ids = RECIPE_LINK.findall(body.decode('utf-8', 'replace')) if status == 200 else []
+    if not recipe_ids:
+        return
+    pk = rng.choice(recipe_ids)
+    user.get(f'/recipes/{pk}/')
+
+    if register_as and not user.logged_in:
+        user.get('/register/')
+        status, _ = user.post('/register/', form={
+            'username': register_as, 'password1': 'loadtest-Pa55', 'password2': 'loadtest-Pa55',
+        })
+        user.logged_in = status == 302
+    if user.logged_in:
+        user.post(f'/api/recipes/{pk}/save/')
+
+
+def api_flow(user, rng, categories, toggles, register_as=None):
+    """
+    Mixed JSON API load: one slow api_match call per pass among cheap
+    pantry_list / ingredient_search calls, to show head-of-line blocking.
+    """
+    if not user.pantry_ready:
+        user.get('/')  # CSRF cookie
+        status, body = user.get(f'/api/ingredients/{quote(rng.choice(categories))}/')
+        ids = [i['id'] for i in json.loads(body)['ingredients']] if status == 200 else []
+        for ing_id in rng.sample(ids, min(toggles, len(ids))):
+            user.post('/api/pantry/toggle/', {'ingredient_id': ing_id})
+        user.pantry_ready = True
+    user.get(f'/api/match/?min_match={rng.randint(0, 30)}&limit=24')
+    for _ in range(4):
+        user.get('/api/pantry/')
+        user.get(f'/api/ingredients/search/?q={quote(rng.choice(categories)[:3].lower())}')
+
+
+FLOWS = {'pantry': pantry_flow, 'api': api_flow}
+
+
+def replay_session(user, requests, speed):
+    """Replay one recorded session; speed 0 sends requests back to back."""
+    started = time.perf_counter()
+    for req in requests:
+        if speed:
+            delay = req.get('at', 0) / speed - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+        user.request(req['method'], req['path'], req.get('json'), req.get('form'))
+
+
+def load_sessions(path):
+    with open(path) as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    lines.sort(key=lambda r: (r['session'], r.get('at', 0)))
+    return [list(reqs) for _, reqs in groupby(lines, key=lambda r: r['session'])]
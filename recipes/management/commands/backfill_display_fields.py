@@ -0,0 +1,40 @@
+"""
+python manage.py backfill_display_fields
+Recomputes the stored display fields (visual identity, instructions_list,
+ingredient_count) for recipes imported before they existed, then bumps the
+catalog version once: bulk_update() sends no signals, and the cached recipe
+cards (cards.py) are keyed by that version.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes import catalog
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Precompute Recipe display fields for existing rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        qs = Recipe.objects.only('id', 'name', 'instructions', 'ingredients_raw').order_by('id')
+        total = qs.count()
+        done = 0
+        last_id = 0
+        while True:
+            batch = list(qs.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            for recipe in batch:
+                recipe.compute_display_fields()
+            with transaction.atomic():
+                Recipe.objects.bulk_update(batch, Recipe.DISPLAY_FIELDS)
+            last_id = batch[-1].id
+            done += len(batch)
+            self.stdout.write(f'  {done}/{total} recipes...')
+        if done:
+            catalog.bump_version()
+        self.stdout.write(self.style.SUCCESS(f'  ✅ {done} recipes backfilled'))
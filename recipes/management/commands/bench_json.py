@@ -0,0 +1,83 @@
+"""
+python manage.py bench_json [--iterations 500] [--pantry 12]
+Times serializing each JSON API payload the way JsonResponse does (stdlib
+json with DjangoJSONEncoder) vs responses.dumps() (orjson when installed),
+vs the pre-serialized catalog payloads where an endpoint has one, and the
+gzip step json_response() adds for large bodies. Payloads are built once
+from the catalog in the database (see generate_catalog); only serialization
+is timed.
+"""
+import gzip
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count
+
+from recipes import responses
+from recipes.catalog import get_catalog
+from recipes.models import Ingredient
+from recipes.views import category_rows, match_payload
+
+
+class Command(BaseCommand):
+    help = 'Benchmark JSON serialization of the catalog API payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=500)
+        parser.add_argument('--pantry', type=int, default=12, help='Pantry size for pantry_list and api_match')
+
+    def handle(self, *args, **options):
+        catalog = get_catalog()
+        pantry = list(Ingredient.objects.annotate(uses=Count('recipeingredient'))
+                      .order_by('-uses', 'id')[:options['pantry']])
+        pantry_ids = {i.id for i in pantry}
+        category = (Ingredient.objects.values_list('category', flat=True).annotate(n=Count('id'))
+                    .order_by('-n').first())
+        if category is None:
+            self.stderr.write('No ingredients in the database; run import_data or generate_catalog first.')
+            return
+
+        rows = category_rows(Ingredient.objects.filter(category=category).order_by('name'), pantry_ids)
+        variants = responses.category_variants(rows)
+        items = [{'id': i.id, 'name': i.name, 'category': i.category, 'name_lower': i.name_lower} for i in pantry]
+        scored = catalog.match({i.name_lower for i in pantry}, min_match=10, facets=True)
+        nutrition = {'version': catalog.version, 'recipes': len(catalog), 'nutrients': catalog.histograms}
+        payloads = {
+            f'ingredients_by_category ({category}, {len(rows)} rows)': (
+                {'ingredients': rows}, lambda: responses.join_category(variants, pantry_ids)),
+            f'pantry_list ({len(items)} items)': (
+                {'ingredients': items, 'count': len(items), 'catalog_version': catalog.version}, None),
+            f'api_match ({len(scored)} matches, 12 shown)': (match_payload(catalog, scored, 12), None),
+            'nutrition_histograms': (
+                nutrition, lambda: responses.catalog_payload(catalog, 'nutrition', lambda c: nutrition)),
+        }
+
+        backend = 'orjson' if responses.orjson is not None else 'json (orjson not installed)'
+        self.stdout.write(f'{options["iterations"]} iterations, responses.dumps() backend: {backend}\n')
+        self.stdout.write(f'{"Endpoint / path":<48}{"p50 us":>10}{"p95 us":>10}{"bytes":>10}')
+        for endpoint, (data, precomputed) in payloads.items():
+            body = responses.dumps(data)
+            paths = [('JsonResponse encoder (before)', lambda: json.dumps(data, cls=DjangoJSONEncoder).encode()),
+                     ('responses.dumps()', lambda: responses.dumps(data))]
+            if precomputed is not None:
+                precomputed()
+                paths.append(('pre-serialized (after)', precomputed))
+            if len(body) >= responses.GZIP_MIN_LENGTH:
+                paths.append(('+ gzip', lambda: gzip.compress(body, compresslevel=responses.GZIP_LEVEL, mtime=0)))
+            self.stdout.write(endpoint)
+            for label, fn in paths:
+                p50, p95 = self.time(fn, options['iterations'])
+                size = len(gzip.compress(body, compresslevel=responses.GZIP_LEVEL)) if label == '+ gzip' else len(body)
+                self.stdout.write(f'  {label:<46}{p50:>10.1f}{p95:>10.1f}{size:>10}')
+
+    @staticmethod
+    def time(fn, iterations):
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1e6)
+        return statistics.median(timings), statistics.quantiles(timings, n=20)[18]
@@ -0,0 +1,75 @@
+"""
+python manage.py bench_render [--iterations 200]
+Times producing a 24-card recipe grid: every card rendered through the
+template (how list/match rendered before the fragment cache) vs cards
+served from the fragment cache. Uses unsaved synthetic recipes, no DB.
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+from django.test.utils import override_settings
+
+from recipes.cards import SLOT, card_fragments
+from recipes.models import Recipe
+from recipes.synthetic import recipe_rows
+
+CARDS_PER_PAGE = 24
+GRID_TEMPLATE = Template(
+    "{% for recipe in recipes %}{% include 'recipes/_card_list.html' %}{% endfor %}"
+)
+# A private in-process cache, so the benchmark never touches the shared one
+BENCH_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                            'LOCATION': 'bench-render'}}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark rendering a 24-card grid with and without the card fragment cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+
+    @override_settings(CACHES=BENCH_CACHES)
+    def handle(self, *args, **options):
+        recipes = []
+        for row in recipe_rows(CARDS_PER_PAGE):
+            recipe = Recipe(**row)
+            recipe.compute_display_fields()
+            recipes.append(recipe)
+        by_id = {r.id: r for r in recipes}
+        ids = list(by_id)
+
+        def load(missing):
+            return [by_id[pk] for pk in missing]
+
+        def template_loop():
+            GRID_TEMPLATE.render(Context({'recipes': recipes, 'slot': SLOT}))
+
+        version = iter(range(10**9))
+
+        def cache_cold():
+            # A fresh catalog version every call: all 24 cards miss
+            cards = card_fragments('list', ids, f'bench-{next(version)}', load)
+            ''.join(cards[pk][0] for pk in ids)
+
+        def cache_warm():
+            cards = card_fragments('list', ids, 'bench-warm', load)
+            ''.join(cards[pk][0] for pk in ids)
+
+        cache_warm()
+        rows = []
+        for label, fn in (('Template loop (before)', template_loop),
+                          ('Fragment cache, cold', cache_cold),
+                          ('Fragment cache, warm (after)', cache_warm)):
+            timings = []
+            for _ in range(options['iterations']):
+                started = time.perf_counter()
+                fn()
+                timings.append((time.perf_counter() - started) * 1000)
+            rows.append((label, statistics.median(timings), statistics.quantiles(timings, n=20)[18]))
+
+        self.stdout.write(f'{CARDS_PER_PAGE}-card grid, {options["iterations"]} iterations\n')
+        self.stdout.write(f'{"Path":<32}{"p50 ms":>10}{"p95 ms":>10}')
+        for label, p50, p95 in rows:
+            self.stdout.write(f'{label:<32}{p50:>10.2f}{p95:>10.2f}')
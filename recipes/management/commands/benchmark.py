@@ -0,0 +1,96 @@
+"""
+python manage.py benchmark [--iterations 50] [--only api_match recipe_detail]
+                           [--include-import] [--compare benchmarks/results/<run>.json]
+Runs the view scenarios in recipes/benchmarks.py against the current database
+and reports p50/p95 latency, queries per request and peak memory. Each run is
+saved as JSON under benchmarks/results/ so runs can be compared.
+"""
+import json
+import os
+import platform
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+
+from recipes.benchmarks import SCENARIOS, BenchContext, run_import_scenario, run_view_scenario
+from recipes.catalog import get_catalog
+from recipes.models import Ingredient, Recipe
+
+COLUMNS = ('p50_ms', 'p95_ms', 'queries_per_request', 'peak_mem_kb')
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the hot views and save/compare the results'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--only', nargs='+', choices=sorted(SCENARIOS), help='Scenarios to run')
+        parser.add_argument('--pantry-size', type=int, default=8)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--include-import', action='store_true',
+                            help='Also time import_data on a synthetic CSV (rolled back)')
+        parser.add_argument('--import-rows', type=int, default=2_000)
+        parser.add_argument('--output', default=os.path.join(settings.BASE_DIR, 'benchmarks', 'results'))
+        parser.add_argument('--compare', help='Earlier results JSON to diff against')
+
+    @override_settings(ALLOWED_HOSTS=['*'])
+    def handle(self, *args, **options):
+        if not Recipe.objects.exists():
+            raise CommandError('No recipes in the database; run import_data or generate_catalog first')
+
+        ctx = BenchContext(seed=options['seed'], pantry_size=options['pantry_size'])
+        client = Client()
+        for ing_id in ctx.pantry_ids:
+            client.post('/api/pantry/toggle/', {'ingredient_id': ing_id, 'action': 'add'},
+                        content_type='application/json')
+        get_catalog()
+
+        results = {}
+        for name in options['only'] or SCENARIOS:
+            self.stdout.write(f'  {name}...')
+            results[name] = run_view_scenario(name, client, ctx, options['iterations'])
+        if options['include_import']:
+            self.stdout.write('  import_data...')
+            results['import_data'] = run_import_scenario(options['import_rows'])
+
+        run = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'recipes': Recipe.objects.count(),
+                'ingredients': Ingredient.objects.count(),
+                'pantry_size': len(ctx.pantry_ids),
+                'iterations': options['iterations'],
+                'db_engine': settings.DATABASES['default']['ENGINE'],
+                'python': platform.python_version(),
+            },
+            'results': results,
+        }
+        os.makedirs(options['output'], exist_ok=True)
+        path = os.path.join(options['output'], f'{datetime.now():%Y%m%d-%H%M%S}.json')
+        with open(path, 'w') as f:
+            json.dump(run, f, indent=2)
+
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)['results']
+        self.report(run, baseline)
+        self.stdout.write(self.style.SUCCESS(f'\nSaved {path}'))
+
+    def report(self, run, baseline):
+        meta = run['meta']
+        self.stdout.write(f'\n{meta["recipes"]:,} recipes, {meta["ingredients"]:,} ingredients, '
+                          f'pantry of {meta["pantry_size"]}\n')
+        self.stdout.write(f'{"Scenario":<22}' + ''.join(f'{c:>22}' for c in COLUMNS))
+        for name, result in run['results'].items():
+            cells = []
+            for column in COLUMNS:
+                cell = f'{result[column]:,}'
+                before = (baseline or {}).get(name, {}).get(column)
+                if before:
+                    cell += f' ({(result[column] - before) / before:+.0%})'
+                cells.append(f'{cell:>22}')
+            self.stdout.write(f'{name:<22}' + ''.join(cells))
@@ -0,0 +1,63 @@
+"""
+python manage.py catalog_memory_report [--recipes 100000]
+Compares, with tracemalloc, the memory held per recipe by the ORM instances
+match_recipes used to load against the compact in-memory Catalog.
+"""
+import gc
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from recipes.catalog import ROW_FIELDS, Catalog
+from recipes.models import Recipe
+from recipes.synthetic import ingredient_vocabulary, recipe_rows
+
+# The .only() column set match_recipes scored over before the catalog existed
+ORM_FIELDS = ('id', 'name', 'category', 'cuisine_type', 'difficulty', 'total_time',
+              'is_vegetarian', 'spice_level', 'calories', 'ingredients_raw', 'image_url')
+
+
+def measure(build):
+    """Return (result, bytes still allocated once build() returns)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        result = build()
+        gc.collect()
+        return result, tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+
+
+class Command(BaseCommand):
+    help = 'tracemalloc report: bytes per recipe for ORM instances vs the compact catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100_000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        n = options['recipes']
+        vocabulary = ingredient_vocabulary()
+
+        def rows():
+            return recipe_rows(n, seed=options['seed'], vocabulary=vocabulary)
+
+        def build_orm():
+            return [Recipe.from_db('default', ORM_FIELDS, [row[f] for f in ORM_FIELDS]) for row in rows()]
+
+        def build_catalog():
+            return Catalog.from_rows(0, ([row[f] for f in ROW_FIELDS] for row in rows()), {})
+
+        self.stdout.write(f'Building {n:,} synthetic recipes twice ({len(vocabulary):,}-name vocabulary)…')
+        results = []
+        for label, build in (('ORM instances (.only)', build_orm), ('Compact catalog', build_catalog)):
+            obj, size = measure(build)
+            results.append((label, size))
+            del obj
+
+        orm_size = results[0][1]
+        self.stdout.write(f'\n{"Representation":<24}{"Total MiB":>12}{"Bytes/recipe":>15}{"vs ORM":>9}')
+        for label, size in results:
+            self.stdout.write(f'{label:<24}{size / 2**20:>12.1f}{size / n:>15,.0f}{size / orm_size:>8.0%}')
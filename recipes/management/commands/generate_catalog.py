@@ -0,0 +1,93 @@
+"""
+python manage.py generate_catalog --recipes 100000 --ingredients 5000
+Fills the database with a synthetic catalog (Zipf-distributed ingredient
+frequencies, names from data/Complete_Ingredients_Global.csv) for benchmarks
+and load tests. Replaces the existing catalog tables.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes import catalog
+from recipes.models import Ingredient, Recipe, RecipeIngredient, parse_ingredient_names
+from recipes.synthetic import ingredient_vocabulary, recipe_rows
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic recipe catalog (10k-1M recipes, 2k-100k ingredients)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=10_000)
+        parser.add_argument('--ingredients', type=int, default=2_036)
+        parser.add_argument('--zipf', type=float, default=1.1, help='Zipf exponent for ingredient frequency')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5_000)
+        parser.add_argument('--yes', action='store_true', help='Do not ask before replacing the catalog')
+
+    def handle(self, *args, **options):
+        if not 1 <= options['recipes'] <= 1_000_000:
+            raise CommandError('--recipes must be between 1 and 1,000,000')
+        if not 1 <= options['ingredients'] <= 100_000:
+            raise CommandError('--ingredients must be between 1 and 100,000')
+        if Recipe.objects.exists() and not options['yes']:
+            if input('This deletes the existing catalog. Continue? [y/N] ').lower() != 'y':
+                raise CommandError('Aborted')
+
+        with catalog.batch_update():
+            with transaction.atomic():
+                RecipeIngredient.objects.all().delete()
+                Recipe.objects.all().delete()
+                Ingredient.objects.all().delete()
+            vocabulary = ingredient_vocabulary(options['ingredients'], seed=options['seed'])
+            ing_ids = self.create_ingredients(vocabulary, options['batch_size'])
+            self.create_recipes(vocabulary, ing_ids, options)
+            catalog.bump_version()
+
+        self.stdout.write(self.style.SUCCESS('\n✅ Synthetic catalog ready'))
+
+    def create_ingredients(self, vocabulary, batch_size):
+        objs = [
+            Ingredient(ingredient_id=f'SYN_{i:06d}', name=name, name_lower=name.lower(), category=category)
+            for i, (name, category) in enumerate(vocabulary, 1)
+        ]
+        with transaction.atomic():
+            Ingredient.objects.bulk_create(objs, batch_size=batch_size)
+        ids = dict(Ingredient.objects.values_list('name_lower', 'id'))
+        self.stdout.write(f'  {len(ids)} ingredients')
+        return ids
+
+    def create_recipes(self, vocabulary, ing_ids, options):
+        batch_size = options['batch_size']
+        rows = recipe_rows(options['recipes'], seed=options['seed'], vocabulary=vocabulary, zipf_s=options['zipf'])
+        batch = []
+        done = 0
+        for row in rows:
+            row.pop('id')
+            recipe = Recipe(**row)
+            recipe.compute_display_fields()
+            batch.append(recipe)
+            if len(batch) >= batch_size:
+                done += self.flush(batch, ing_ids)
+                self.stdout.write(f'  {done} recipes...')
+        if batch:
+            done += self.flush(batch, ing_ids)
+        self.stdout.write(f'  {done} recipes')
+
+    @transaction.atomic
+    def flush(self, batch, ing_ids):
+        Recipe.objects.bulk_create(batch)
+        if batch[0].pk is None:
+            # Backends without RETURNING (MySQL) leave pks unset
+            pks = dict(Recipe.objects.filter(recipe_id__in=[r.recipe_id for r in batch])
+                       .values_list('recipe_id', 'id'))
+            for recipe in batch:
+                recipe.pk = pks[recipe.recipe_id]
+        links = [
+            RecipeIngredient(recipe_id=recipe.pk, ingredient_id=ing_ids[name.lower()])
+            for recipe in batch
+            for name in parse_ingredient_names(recipe.ingredients_raw)
+            if name.lower() in ing_ids
+        ]
+        RecipeIngredient.objects.bulk_create(links, ignore_conflicts=True)
+        count = len(batch)
+        batch.clear()
+        return count
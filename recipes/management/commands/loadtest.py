@@ -0,0 +1,102 @@
+"""
+python manage.py loadtest --url http://127.0.0.1:8000 --users 20 --duration 60
+python manage.py loadtest --replay flows.jsonl --users 50
+Drives N concurrent virtual users through the pantry-and-match flow (or
+recorded sessions) against a running server and reports throughput, latency
+percentiles and lock/timeout errors per endpoint. See recipes/loadtest.py.
+"""
+import json
+import random
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.loadtest import FLOWS, Recorder, Stats, VirtualUser, load_sessions, replay_session
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = 'Replay pantry-and-match user flows against a running server with concurrent virtual users'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--users', type=int, default=10, help='Concurrent virtual users')
+        parser.add_argument('--duration', type=float, default=30.0, help='Seconds to run')
+        parser.add_argument('--flows', type=int, default=0, help='Stop each user after this many flows (0 = no limit)')
+        parser.add_argument('--flow', choices=sorted(FLOWS), default='pantry',
+                            help='pantry: the page flow; api: mixed slow/cheap JSON API calls')
+        parser.add_argument('--toggles', type=int, default=8, help='Pantry toggles per synthetic flow')
+        parser.add_argument('--register', action='store_true',
+                            help='Register a loadtest_* account per user so the save step runs')
+        parser.add_argument('--timeout', type=float, default=10.0, help='Per-request timeout in seconds')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--replay', help='JSONL file of recorded sessions to replay instead')
+        parser.add_argument('--speed', type=float, default=0.0,
+                            help='Replay at this multiple of recorded timing (0 = back to back)')
+        parser.add_argument('--record', help='Write the synthetic requests to this JSONL file')
+        parser.add_argument('--output', help='Write the JSON report here')
+
+    def handle(self, *args, **options):
+        if options['replay']:
+            sessions = load_sessions(options['replay'])
+            if not sessions:
+                raise CommandError(f'No sessions in {options["replay"]}')
+        else:
+            categories = list(Ingredient.objects.values_list('category', flat=True).distinct())
+            if not categories:
+                raise CommandError('No ingredients in the database; run import_data or generate_catalog first')
+
+        stats = Stats()
+        stop = threading.Event()
+        record_file = open(options['record'], 'w') if options['record'] else None
+        recorder = Recorder(record_file) if record_file else None
+        run_id = uuid.uuid4().hex[:6]
+        flow = FLOWS[options['flow']]
+
+        def run_user(n):
+            rng = random.Random(options['seed'] * 1000 + n)
+            user = VirtualUser(options['url'], stats, options['timeout'], recorder, name=f'{run_id}-{n}')
+            register_as = f'loadtest_{run_id}_{n}' if options['register'] else None
+            flows = 0
+            while not stop.is_set() and (not options['flows'] or flows < options['flows']):
+                if options['replay']:
+                    replay_session(user, sessions[(n + flows * options['users']) % len(sessions)], options['speed'])
+                else:
+                    flow(user, rng, categories, options['toggles'], register_as)
+                flows += 1
+
+        threads = [threading.Thread(target=run_user, args=(n,), daemon=True) for n in range(options['users'])]
+        self.stdout.write(f'{options["users"]} virtual users → {options["url"]} '
+                          f'({"replay" if options["replay"] else options["flow"] + " flow"}, up to {options["duration"]:g}s)')
+        for t in threads:
+            t.start()
+        deadline = time.monotonic() + options['duration']
+        for t in threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+        stop.set()
+        for t in threads:
+            t.join()
+        stats.finished = time.perf_counter()
+        if record_file:
+            record_file.close()
+
+        report = stats.summary()
+        self.print_report(report)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'options': {k: options[k] for k in ('url', 'users', 'duration', 'flow', 'flows', 'toggles', 'replay')},
+                           **report}, f, indent=2)
+
+    def print_report(self, report):
+        self.stdout.write(f'\n{report["requests"]:,} requests in {report["elapsed_s"]}s '
+                          f'= {report["rps"]} req/s, {report["errors"]} errors\n')
+        self.stdout.write(f'{"Endpoint":<20}{"Reqs":>7}{"RPS":>8}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"max ms":>9}  Errors')
+        for name, e in report['endpoints'].items():
+            errors = ', '.join(f'{kind}={n}' for kind, n in sorted(e['errors'].items())) or '-'
+            self.stdout.write(f'{name:<20}{e["requests"]:>7}{e["rps"]:>8}{e["p50_ms"]:>9}{e["p95_ms"]:>9}'
+                              f'{e["p99_ms"]:>9}{e["max_ms"]:>9}  {errors}')
+        if report['errors']:
+            self.stdout.write(self.style.WARNING('\nlocked = SQLite "database is locked" (see the DEBUG error page); '
+                                                 'timeout = no response within --timeout'))
@@ -0,0 +1,31 @@
+"""
+python manage.py run_jobs [--once] [--name host:pid] [--poll 2]
+Runs background Jobs (imports, recommendation and catalog rebuilds) queued
+with recipes.jobs.enqueue() or from the admin, one at a time. Start as many
+as needed; they coordinate through the Job table. SIGTERM/SIGINT stop the
+worker after its current job. See recipes/jobs.py.
+"""
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from recipes import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once no job is ready instead of polling')
+        parser.add_argument('--name', help='Worker name recorded on claimed jobs (default host:pid)')
+        parser.add_argument('--poll', type=float, help='Seconds between polls of an empty queue (JOB_POLL_INTERVAL)')
+
+    def handle(self, *args, **options):
+        worker = jobs.Worker(options['name'])
+        stop = threading.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda *_: stop.set())
+        self.stdout.write(f'Worker {worker.name} waiting for jobs ({", ".join(sorted(jobs.TASKS))})')
+        ran = worker.work(once=options['once'], poll=options['poll'], stop=stop)
+        self.stdout.write(self.style.SUCCESS(f'  ✅ {ran} jobs run'))
@@ -0,0 +1,47 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RenameIndex(
+            model_name='ingredient',
+            new_name='recipes_ing_categor_b99d8e_idx',
+            old_name='recipes_ing_categor_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='ingredient',
+            new_name='recipes_ing_name_lo_77d527_idx',
+            old_name='recipes_ing_name_lo_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='recipe',
+            new_name='recipes_rec_categor_081389_idx',
+            old_name='recipes_rec_categor_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='recipe',
+            new_name='recipes_rec_cuisine_1a0186_idx',
+            old_name='recipes_rec_cuisine_idx',
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['difficulty'], name='recipes_rec_difficu_33131c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['is_vegetarian'], name='recipes_rec_is_vege_bd3a33_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_catalog_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='instructions_list',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='visual_delay',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='visual_duration',
+            field=models.FloatField(default=3.0),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='visual_hue',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='visual_lit',
+            field=models.PositiveSmallIntegerField(default=45),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='visual_sat',
+            field=models.PositiveSmallIntegerField(default=80),
+        ),
+    ]
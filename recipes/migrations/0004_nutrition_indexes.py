@@ -0,0 +1,51 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_recipe_display_fields'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='calories',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='carbohydrates',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='fat',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='fiber',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='iron',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='protein',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='sodium',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='vitamin_c',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_nutrition_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecommendationState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_saved_id', models.PositiveBigIntegerField(default=0)),
+                ('built_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecipeNeighbor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('co_saves', models.PositiveIntegerField()),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipes.recipe')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='recipes.recipe')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['recipe', '-score'], name='recipeneighbor_top')],
+                'unique_together': {('recipe', 'neighbor')},
+            },
+        ),
+    ]
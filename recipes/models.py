@@ -1,7 +1,24 @@
+import re
+import zlib
+
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 
+def parse_ingredient_names(ingredients_raw):
+    """Split a raw ingredients string into clean names, dropping '(qty)' parts."""
+    names = []
+    for part in ingredients_raw.split(','):
+        # Strip surrounding brackets and single/double quotes from the raw data
+        # (ingredients_raw may be stored as a Python list literal string)
+        clean = re.sub(r'\s*\(.*?\)', '', part).strip()
+        clean = clean.strip("[]'\"\\ \t")
+        if clean:
+            names.append(clean)
+    return names
+
+
 class Ingredient(models.Model):
     ingredient_id   = models.CharField(max_length=20, unique=True)
     name            = models.CharField(max_length=200, db_index=True)
@@ -54,14 +71,14 @@ class Recipe(models.Model):
     servings        = models.IntegerField(default=4)
     instructions    = models.TextField()
     detailed_instructions = models.TextField(blank=True)
-    calories        = models.FloatField(default=0)
-    protein         = models.FloatField(default=0)
-    carbohydrates   = models.FloatField(default=0)
-    fat             = models.FloatField(default=0)
-    fiber           = models.FloatField(default=0)
-    sodium          = models.FloatField(default=0)
-    iron            = models.FloatField(default=0)
-    vitamin_c       = models.FloatField(default=0)
+    calories        = models.FloatField(default=0, db_index=True)
+    protein         = models.FloatField(default=0, db_index=True)
+    carbohydrates   = models.FloatField(default=0, db_index=True)
+    fat             = models.FloatField(default=0, db_index=True)
+    fiber           = models.FloatField(default=0, db_index=True)
+    sodium          = models.FloatField(default=0, db_index=True)
+    iron            = models.FloatField(default=0, db_index=True)
+    vitamin_c       = models.FloatField(default=0, db_index=True)
     difficulty      = models.CharField(max_length=20, blank=True, db_index=True)
     is_vegetarian   = models.BooleanField(default=False, db_index=True)
     is_vegan        = models.BooleanField(default=False)
@@ -70,9 +87,22 @@ class Recipe(models.Model):
     cuisine_type    = models.CharField(max_length=100, blank=True, db_index=True)
     meal_time       = models.CharField(max_length=100, blank=True)
     spice_level     = models.CharField(max_length=50, blank=True)
+    # Display-only fields, derived in compute_display_fields() on every save
+    visual_hue      = models.PositiveSmallIntegerField(default=0)
+    visual_sat      = models.PositiveSmallIntegerField(default=80)
+    visual_lit      = models.PositiveSmallIntegerField(default=45)
+    visual_delay    = models.FloatField(default=0)
+    visual_duration = models.FloatField(default=3.0)
+    instructions_list = models.JSONField(default=list, blank=True)
+    ingredient_count  = models.PositiveSmallIntegerField(default=0)
     # M2M to ingredients
     ingredients     = models.ManyToManyField(Ingredient, through='RecipeIngredient', blank=True)
 
+    DISPLAY_FIELDS = (
+        'visual_hue', 'visual_sat', 'visual_lit', 'visual_delay', 'visual_duration',
+        'instructions_list', 'ingredient_count',
+    )
+
     class Meta:
         ordering = ['name']
         indexes = [
@@ -87,16 +117,7 @@ class Recipe(models.Model):
 
     @property
     def ingredient_names(self):
-        import re
-        names = []
-        for part in self.ingredients_raw.split(','):
-            # Strip surrounding brackets and single/double quotes from the raw data
-            # (ingredients_raw may be stored as a Python list literal string)
-            clean = re.sub(r'\s*\(.*?\)', '', part).strip()
-            clean = clean.strip("[]'\"\\ \t")
-            if clean:
-                names.append(clean)
-        return names
+        return parse_ingredient_names(self.ingredients_raw)
 
     def match_score(self, pantry_set):
         """
@@ -120,26 +141,40 @@ class Recipe(models.Model):
         total = len(pantry_lower)
         return matched, total, round(matched / total * 100)
 
-    @property
-    def visual_dna(self):
+    def compute_display_fields(self):
         """
-        Generates a deterministic visual identity for the recipe based on its name.
-        Returns a dict with hue, sat, lit, and animation timing.
+        Derive the card/detail display fields so templates never hash or split
+        per request. The visual identity is a deterministic function of the name.
         """
-        import zlib
         # Use adler32 for a fast, stable hash across restarts
         h = zlib.adler32(self.name.encode('utf-8')) & 0xffffffff
-        
+        self.visual_hue      = h % 360                  # 0-360 degrees
+        self.visual_sat      = 80 + (h % 20)            # 80-100% saturation
+        self.visual_lit      = 45 + (h % 15)            # 45-60% lightness
+        self.visual_delay    = (h % 50) / -10.0         # 0.0s to -5.0s delay (start mid-animation)
+        self.visual_duration = 3.0 + ((h % 30) / 10.0)  # 3.0s to 6.0s float duration
+        self.instructions_list = [s.strip() for s in self.instructions.split('.') if s.strip()]
+        self.ingredient_count = len(self.ingredient_names)
+
+    def save(self, *args, **kwargs):
+        self.compute_display_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | set(self.DISPLAY_FIELDS)
+        super().save(*args, **kwargs)
+
+    @property
+    def visual_dna(self):
+        """The stored visual identity as a dict: hue, sat, lit and animation timing."""
         return {
-            'hue': h % 360,                # 0-360 degrees
-            'sat': 80 + (h % 20),          # 80-100% saturation
-            'lit': 45 + (h % 15),          # 45-60% lightness
-            'delay': (h % 50) / -10.0,     # 0.0s to -5.0s delay (start mid-animation)
-            'duration': 3.0 + ((h % 30) / 10.0) # 3.0s to 6.0s float duration
+            'hue': self.visual_hue,
+            'sat': self.visual_sat,
+            'lit': self.visual_lit,
+            'delay': self.visual_delay,
+            'duration': self.visual_duration,
         }
 
 
-
 class RecipeIngredient(models.Model):
     recipe      = models.ForeignKey(Recipe, on_delete=models.CASCADE)
     ingredient  = models.ForeignKey(Ingredient, on_delete=models.CASCADE)
@@ -167,3 +202,93 @@ class SavedRecipe(models.Model):
 
     class Meta:
         unique_together = ('user', 'recipe')
+
+
+class CatalogVersion(models.Model):
+    """
+    Single-row counter bumped whenever the catalog tables (Recipe, Ingredient,
+    RecipeIngredient) change. Every worker compares it against the version of
+    its in-memory catalog to know when to rebuild.
+    """
+    version     = models.PositiveIntegerField(default=1)
+    updated_at  = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Catalog v{self.version}"
+
+
+class RecipeNeighbor(models.Model):
+    """
+    "People who saved this also saved…": the top co-saved recipes of `recipe`,
+    precomputed from SavedRecipe by `python manage.py build_recommendations`.
+    """
+    recipe      = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='neighbors')
+    neighbor    = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='+')
+    score       = models.FloatField()
+    co_saves    = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('recipe', 'neighbor')
+        indexes = [models.Index(fields=['recipe', '-score'], name='recipeneighbor_top')]
+
+
+class RecommendationState(models.Model):
+    """Single-row watermark: the last SavedRecipe id folded into RecipeNeighbor."""
+    last_saved_id = models.PositiveBigIntegerField(default=0)
+    built_at      = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Recommendations up to save #{self.last_saved_id}"
+
+
+class Job(models.Model):
+    """
+    A background task (import, recommendation or catalog rebuild) queued in
+    the database and run by `python manage.py run_jobs`; see recipes/jobs.py.
+    """
+    QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = 'queued', 'running', 'succeeded', 'failed', 'cancelled'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'), (RUNNING, 'Running'), (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'), (CANCELLED, 'Cancelled'),
+    ]
+
+    kind          = models.CharField(max_length=50)
+    args          = models.JSONField(default=dict, blank=True)
+    status        = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    run_after     = models.DateTimeField(default=timezone.now)
+    attempts      = models.PositiveSmallIntegerField(default=0)
+    max_attempts  = models.PositiveSmallIntegerField(default=3)
+    cancel_requested = models.BooleanField(default=False)
+
+    # Lease: the claiming worker and its last heartbeat
+    worker        = models.CharField(max_length=100, blank=True)
+    heartbeat_at  = models.DateTimeField(null=True, blank=True)
+
+    # Progress and throughput (items per second) as last reported by the task
+    done          = models.PositiveBigIntegerField(default=0)
+    total         = models.PositiveBigIntegerField(null=True, blank=True)
+    rate          = models.FloatField(null=True, blank=True)
+    message       = models.CharField(max_length=200, blank=True)
+
+    result        = models.JSONField(null=True, blank=True)
+    error         = models.TextField(blank=True)
+    created_at    = models.DateTimeField(auto_now_add=True)
+    started_at    = models.DateTimeField(null=True, blank=True)
+    finished_at   = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'run_after'], name='job_ready')]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    @property
+    def percent(self):
+        return round(self.done / self.total * 100) if self.total else None
+
+    @property
+    def duration(self):
+        if self.started_at is None:
+            return None
+        return (self.finished_at or timezone.now()) - self.started_at
@@ -0,0 +1,55 @@
+"""
+Pantry-coverage meal planner: pick the `size` recipes that together use up as
+many pantry ingredients as possible (maximum coverage, solved greedily, which
+is within 1 - 1/e of the best plan).
+
+Sets are bitsets over catalog positions: one int per pantry ingredient with
+bit p set when recipe p is linked to it through RecipeIngredient
+(Catalog.ingredient_bits), masked by the view filters (Catalog.filter_bits).
+A recipe's gain is how many still-uncovered ingredient bitsets contain it.
+Instead of re-scoring recipes one by one (lazy greedy), the uncovered bitsets
+are summed into a bit-sliced counter (slice k holds bit k of every recipe's
+gain), and the best recipe falls out of a few whole-catalog AND/XORs per pick.
+"""
+from collections import namedtuple
+
+from . import profiling
+
+Step = namedtuple('Step', 'pos uses new')   # uses/new: pantry ingredient ids
+
+
+def plan(catalog, pantry_ids, size=5, **filters):
+    """
+    Return up to `size` Steps in pick order. Each recipe adds at least one
+    pantry item not covered by the ones before it; ties go to catalog order.
+    """
+    with profiling.timer('plan'):
+        allowed = catalog.filter_bits(**filters)
+        columns = [(i, catalog.ingredient_bits(i) & allowed) for i in pantry_ids]
+        columns = [(i, bits) for i, bits in columns if bits]
+        uncovered, steps = columns, []
+        while uncovered and len(steps) < size:
+            pos = best_position([bits for _, bits in uncovered])
+            flag = 1 << pos
+            steps.append(Step(pos, [i for i, bits in columns if bits & flag],
+                              [i for i, bits in uncovered if bits & flag]))
+            uncovered = [(i, bits) for i, bits in uncovered if not bits & flag]
+    return steps
+
+
+def best_position(columns):
+    """Lowest position set in the most of `columns` (non-empty int bitsets)."""
+    slices = []
+    for carry in columns:
+        for k, bits in enumerate(slices):   # ripple-carry add of one bit per position
+            slices[k], carry = bits ^ carry, bits & carry
+            if not carry:
+                break
+        else:
+            slices.append(carry)
+    # The top slice is non-empty; narrow to the positions with the highest count
+    best = slices[-1]
+    for bits in reversed(slices[:-1]):
+        if best & bits:
+            best &= bits
+    return (best & -best).bit_length() - 1
@@ -0,0 +1,154 @@
+"""
+Opt-in per-request profiling.
+
+ProfilingMiddleware (enabled by PROFILING_ENABLED or a non-zero
+PROFILE_SAMPLE_RATE) counts queries and DB time, collects the timer() /
+count() hooks placed around pantry resolution, scoring and rendering, and
+reports them as a Server-Timing header plus one JSON log line per request.
+A PROFILE_SAMPLE_RATE fraction of requests is also run under cProfile (or
+pyinstrument when PROFILER=pyinstrument) and dumped to PROFILE_DUMP_DIR.
+
+The hooks are no-ops when no profile is active, so they cost one ContextVar
+lookup on unprofiled requests.
+"""
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.text import slugify
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('recipes_profile', default=None)
+
+
+class RequestProfile:
+    __slots__ = ('started', 'queries', 'db_ms', 'timings', 'counts')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.timings = {}
+        self.counts = {}
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_ms += (time.perf_counter() - started) * 1000
+
+    @property
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# HOOKS
+# ─────────────────────────────────────────────────────────────────────────────
+@contextmanager
+def timer(name):
+    """Add the wall time of the block to `<name>_ms` of the active profile."""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.timings[name] = profile.timings.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+
+def count(name, n):
+    """Add n to counter `name` of the active profile (e.g. rows_scored)."""
+    profile = _current.get()
+    if profile is not None:
+        profile.counts[name] = profile.counts.get(name, 0) + n
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# MIDDLEWARE
+# ─────────────────────────────────────────────────────────────────────────────
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not (settings.PROFILING_ENABLED or settings.PROFILE_SAMPLE_RATE > 0):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(profile.db_wrapper))
+                if random.random() < settings.PROFILE_SAMPLE_RATE:
+                    response = self.sampled(request)
+                else:
+                    response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        if settings.PROFILING_ENABLED:
+            self.report(request, response, profile)
+        return response
+
+    def report(self, request, response, profile):
+        view = request.resolver_match.view_name if request.resolver_match else ''
+        entry = {
+            'view': view,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': profile.queries,
+            'db_ms': round(profile.db_ms, 2),
+            **{f'{name}_ms': round(ms, 2) for name, ms in profile.timings.items()},
+            **profile.counts,
+            'total_ms': round(profile.total_ms, 2),
+        }
+        metrics = [f'db;dur={profile.db_ms:.2f};desc="{profile.queries} queries"']
+        metrics += [f'{name};dur={ms:.2f}' for name, ms in profile.timings.items()]
+        metrics.append(f'total;dur={entry["total_ms"]:.2f}')
+        response['Server-Timing'] = ', '.join(metrics)
+        logger.info(json.dumps(entry))
+
+    @staticmethod
+    def dump_name(path):
+        """A filesystem-safe name for the client-supplied `path`: a slug capped at 60 characters plus a hash."""
+        slug = slugify(path.replace('/', '-'))[:60].strip('-') or 'home'
+        return f'{slug}-{hashlib.md5(path.encode()).hexdigest()[:8]}'
+
+    def sampled(self, request):
+        """Run the request under a profiler and dump the result to PROFILE_DUMP_DIR."""
+        os.makedirs(settings.PROFILE_DUMP_DIR, exist_ok=True)
+        stem = os.path.join(
+            settings.PROFILE_DUMP_DIR,
+            f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{self.dump_name(request.path)}',
+        )
+        if settings.PROFILER == 'pyinstrument':
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+            try:
+                return self.get_response(request)
+            finally:
+                profiler.stop()
+                with open(f'{stem}.html', 'w', encoding='utf-8') as f:
+                    f.write(profiler.output_html())
+
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(self.get_response, request)
+        finally:
+            profiler.dump_stats(f'{stem}.prof')
@@ -0,0 +1,143 @@
+"""
+Item-to-item recommendations from SavedRecipe co-occurrence.
+
+Two recipes are co-saved when one user saved both. build() folds SavedRecipe
+into RecipeNeighbor, the top RECOMMENDATION_TOP_N co-saved recipes of each
+recipe, scored as
+
+    score(a, b) = Σ over co-savers of 0.5 ** (age of the later save / half-life)
+                  / sqrt(saves(a) * saves(b))
+
+i.e. cosine similarity of the recipes' saver sets with older co-saves decayed.
+Pairs with fewer than RECOMMENDATION_MIN_CO_SAVES co-saves are dropped, and
+users with more than RECOMMENDATION_MAX_USER_SAVES saves are ignored.
+
+Incremental runs recompute only the recipes whose lists can have changed:
+those in SavedRecipe rows past the RecommendationState watermark, plus every
+recipe co-saved with them by the same users. Unsaves and decay on untouched
+recipes are picked up by a full rebuild (build(full=True)).
+"""
+import heapq
+import math
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from .cards import CARD_FIELDS
+from .models import Recipe, RecipeNeighbor, RecommendationState, SavedRecipe
+
+CHUNK_SIZE = 500   # target recipes recomputed and rewritten per transaction
+
+
+def build(full=False, top_n=None, min_co_saves=None, half_life_days=None, max_user_saves=None, now=None,
+          progress=None):
+    """
+    Refresh RecipeNeighbor; returns (recipes recomputed, neighbor rows written).
+    `progress(done, total)` is called after each chunk (see jobs.Progress).
+    """
+    top_n = top_n or settings.RECOMMENDATION_TOP_N
+    min_co_saves = min_co_saves or settings.RECOMMENDATION_MIN_CO_SAVES
+    half_life = half_life_days or settings.RECOMMENDATION_HALF_LIFE_DAYS
+    max_user_saves = max_user_saves or settings.RECOMMENDATION_MAX_USER_SAVES
+    now = now or timezone.now()
+
+    state, _ = RecommendationState.objects.get_or_create(pk=1)
+    until = SavedRecipe.objects.aggregate(last=Max('id'))['last'] or 0
+    heavy = (SavedRecipe.objects.order_by().values('user_id').annotate(n=Count('id'))
+             .filter(n__gt=max_user_saves).values('user_id'))
+    saves = SavedRecipe.objects.filter(id__lte=until).exclude(user_id__in=heavy)
+
+    if full:
+        loaded = saves
+    else:
+        new_savers = saves.filter(id__gt=state.last_saved_id).values('user_id')
+        touched = saves.filter(user_id__in=new_savers).values('recipe_id')
+        # every save of anyone who saved a touched recipe: all co-saves of the touched recipes
+        loaded = saves.filter(user_id__in=saves.filter(recipe_id__in=touched).values('user_id'))
+    by_user, by_recipe = load(loaded, half_life, now)
+    if full:
+        targets = set(by_recipe)
+    else:
+        new_users = set(new_savers.values_list('user_id', flat=True))
+        targets = {recipe_id for user_id in new_users for recipe_id, _ in by_user.get(user_id, ())}
+    counts = dict(saves.order_by().values_list('recipe_id').annotate(n=Count('id')))
+
+    written = 0
+    ordered = sorted(targets)
+    for start in range(0, len(ordered), CHUNK_SIZE):
+        chunk = ordered[start:start + CHUNK_SIZE]
+        rows = [RecipeNeighbor(recipe_id=recipe_id, neighbor_id=neighbor_id, score=score, co_saves=co)
+                for recipe_id in chunk
+                for neighbor_id, score, co in neighbors(recipe_id, by_user, by_recipe, counts, top_n, min_co_saves)]
+        with transaction.atomic():
+            RecipeNeighbor.objects.filter(recipe_id__in=chunk).delete()
+            RecipeNeighbor.objects.bulk_create(rows)
+        written += len(rows)
+        if progress is not None:
+            progress(start + len(chunk), len(ordered))
+
+    with transaction.atomic():
+        if full:
+            RecipeNeighbor.objects.exclude(recipe_id__in=saves.values('recipe_id')).delete()
+        state.last_saved_id, state.built_at = until, now
+        state.save()
+    return len(targets), written
+
+
+def load(saves, half_life, now):
+    """
+    Read `saves` once into user -> [(recipe, weight)] and recipe -> [(user, weight)],
+    weight being the save's decay factor. Decay is monotonic in age, so a co-save
+    pair weighs min() of its two saves' weights: the later save's decay.
+    """
+    by_user, by_recipe = defaultdict(list), defaultdict(list)
+    for user_id, recipe_id, saved_at in saves.values_list('user_id', 'recipe_id', 'saved_at').iterator(
+            chunk_size=5000):
+        weight = 0.5 ** (max((now - saved_at).total_seconds(), 0) / 86400 / half_life)
+        by_user[user_id].append((recipe_id, weight))
+        by_recipe[recipe_id].append((user_id, weight))
+    return by_user, by_recipe
+
+
+def neighbors(recipe_id, by_user, by_recipe, counts, top_n, min_co_saves):
+    """Top (neighbor, score, co_saves) of one recipe, best first; ties go to the lower id."""
+    weights, co_saves = Counter(), Counter()
+    for user_id, weight in by_recipe[recipe_id]:
+        for other, other_weight in by_user[user_id]:
+            if other != recipe_id:
+                weights[other] += min(weight, other_weight)
+                co_saves[other] += 1
+    scored = ((weight / math.sqrt(counts[recipe_id] * counts[other]), -other)
+              for other, weight in weights.items() if co_saves[other] >= min_co_saves)
+    return [(-other, score, co_saves[-other]) for score, other in heapq.nlargest(top_n, scored)]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# LOOKUPS
+# ─────────────────────────────────────────────────────────────────────────────
+def also_saved(recipe_id, limit=6):
+    """Recipes most often co-saved with `recipe_id`, best first (one query)."""
+    rows = (RecipeNeighbor.objects.filter(recipe_id=recipe_id).select_related('neighbor')
+            .only('neighbor', *(f'neighbor__{f}' for f in CARD_FIELDS)).order_by('-score', 'neighbor_id')[:limit])
+    return [row.neighbor for row in rows]
+
+
+def for_user(user, limit=6):
+    """
+    Neighbors of `user`'s RECOMMENDATION_RECENT_SAVES latest saves that they
+    haven't saved yet, by summed score (two queries). Seeding from the latest
+    saves keeps the aggregate at most that many recipes' neighbor lists
+    however many saves the user has, and follows their current tastes.
+    """
+    recent = list(SavedRecipe.objects.filter(user=user).order_by('-saved_at', '-id')
+                  .values_list('recipe_id', flat=True)[:settings.RECOMMENDATION_RECENT_SAVES])
+    if not recent:
+        return []
+    top = list(RecipeNeighbor.objects.filter(recipe_id__in=recent)
+               .exclude(neighbor__savedrecipe__user=user)
+               .values('neighbor_id').annotate(total=Sum('score')).order_by('-total', 'neighbor_id')[:limit])
+    recipes = Recipe.objects.only(*CARD_FIELDS).in_bulk([row['neighbor_id'] for row in top])
+    return [recipes[row['neighbor_id']] for row in top if row['neighbor_id'] in recipes]
@@ -0,0 +1,61 @@
+"""
+Read/write split between the primary database and the catalog connection.
+
+With CATALOG_READ_DB on, settings add a 'catalog' alias: a read-only SQLite
+connection (query_only, optionally immutable) or a MySQL replica. Reads of
+the catalog tables go there, so building the in-memory catalog and browsing
+recipes don't contend with session and pantry writes on the primary.
+CatalogVersion is read there too: get_catalog() must see the version of the
+rows it builds from, or a lagging replica would have it build stale rows,
+label them with the primary's newer version and never rebuild them.
+Everything else, and every write, goes to 'default'.
+
+Reads stay on 'default' inside a transaction on the primary (read-your-writes
+for imports and admin edits) and when following relations from an object
+loaded there (e.g. pantry.ingredients).
+
+configure_connection() also sets the SQLite pragmas: WAL and synchronous=NORMAL
+on the primary, query_only on the catalog connection.
+"""
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+CATALOG_ALIAS = 'catalog'
+CATALOG_MODELS = {'recipe', 'ingredient', 'recipeingredient', 'catalogversion'}
+
+
+class CatalogRouter:
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if (model._meta.app_label == 'recipes' and model._meta.model_name in CATALOG_MODELS
+                and not connections['default'].in_atomic_block):
+            return CATALOG_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases serve the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != CATALOG_ALIAS
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        if connection.alias == CATALOG_ALIAS:
+            cursor.execute('PRAGMA query_only = ON')
+        elif settings.SQLITE_WAL:
+            # WAL lets readers proceed during a write; NORMAL skips an fsync per commit
+            # and stays consistent in WAL mode (a crash can lose only the last commits)
+            cursor.execute('PRAGMA journal_mode = WAL')
+            cursor.execute('PRAGMA synchronous = NORMAL')
@@ -0,0 +1,19 @@
+"""
+Keep CatalogVersion in step with the catalog tables so in-memory catalogs
+in every worker notice edits made through the admin or management commands.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import catalog
+from .models import Ingredient, Recipe, RecipeIngredient
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def catalog_changed(sender, **kwargs):
+    catalog.bump_version()
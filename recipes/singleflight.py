@@ -0,0 +1,185 @@
+"""
+Single-flight coalescing and admission control for catalog scoring.
+
+Concurrent requests with the same pantry, filters and catalog version share
+one Catalog.match() call: the first becomes the leader and computes, the rest
+wait for its result. Leaders must also take one of MATCH_MAX_CONCURRENT
+scoring slots per worker; when none frees up within MATCH_ADMISSION_TIMEOUT
+the request fails with Overloaded (the views answer 503 + Retry-After)
+instead of queueing without limit.
+
+amatch() is the same for async views: followers await the leader's future
+instead of holding a thread, and the leader scores on a bounded thread pool
+(MATCH_MAX_CONCURRENT threads) so the event loop keeps serving cheap requests.
+
+Callers share the returned list and must not mutate it.
+"""
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+
+from django.conf import settings
+
+from . import profiling
+
+
+class Overloaded(Exception):
+    """No scoring slot became free within MATCH_ADMISSION_TIMEOUT."""
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Group:
+    """Run fn once per key among concurrent callers (Go's singleflight.Group)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """Return (fn(), shared) where shared is True if another caller computed it."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+class AdmissionLimit:
+    """Per-process cap on concurrent scoring jobs, sized by MATCH_MAX_CONCURRENT."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._semaphore = None
+        self._size = None
+
+    def semaphore(self):
+        size = settings.MATCH_MAX_CONCURRENT
+        with self._lock:
+            if self._size != size:
+                self._semaphore, self._size = threading.BoundedSemaphore(size), size
+            return self._semaphore
+
+    @contextmanager
+    def slot(self):
+        if not settings.MATCH_MAX_CONCURRENT:
+            yield
+            return
+        semaphore = self.semaphore()
+        if not semaphore.acquire(timeout=settings.MATCH_ADMISSION_TIMEOUT):
+            profiling.count('match_rejected', 1)
+            raise Overloaded
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+_matches = Group()
+_admission = AdmissionLimit()
+
+
+def _key(catalog, pantry_names, min_match, filters):
+    return catalog.version, frozenset(pantry_names), min_match, tuple(sorted(filters.items()))
+
+
+def match(catalog, pantry_names, min_match=0, **filters):
+    """Coalesced, admission-controlled catalog.match(); raises Overloaded."""
+    key = _key(catalog, pantry_names, min_match, filters)
+
+    def compute():
+        with _admission.slot():
+            return catalog.match(pantry_names, min_match=min_match, **filters)
+
+    scored, shared = _matches.do(key, compute)
+    if shared:
+        profiling.count('match_coalesced', 1)
+    return scored
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# ASYNC
+# ─────────────────────────────────────────────────────────────────────────────
+_executor = None
+_executor_lock = threading.Lock()
+_loops = weakref.WeakKeyDictionary()   # event loop -> (admission semaphore, {key: future})
+
+
+def executor():
+    """Process-wide pool that runs CPU-bound scoring off the event loop."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.MATCH_MAX_CONCURRENT or None,
+                                           thread_name_prefix='scoring')
+        return _executor
+
+
+def _loop_state(loop):
+    state = _loops.get(loop)
+    if state is None:
+        state = _loops[loop] = (asyncio.Semaphore(settings.MATCH_MAX_CONCURRENT or 2 ** 31), {})
+    return state
+
+
+async def amatch(catalog, pantry_names, min_match=0, **filters):
+    """Async match(): coalesced per event loop, scored on executor(); raises Overloaded."""
+    loop = asyncio.get_running_loop()
+    semaphore, inflight = _loop_state(loop)
+    key = _key(catalog, pantry_names, min_match, filters)
+    future = inflight.get(key)
+    if future is not None:
+        profiling.count('match_coalesced', 1)
+        return await asyncio.shield(future)
+
+    future = inflight[key] = loop.create_future()
+    try:
+        try:
+            if semaphore.locked():
+                await asyncio.wait_for(semaphore.acquire(), settings.MATCH_ADMISSION_TIMEOUT)
+            else:
+                await semaphore.acquire()
+        except asyncio.TimeoutError:
+            profiling.count('match_rejected', 1)
+            raise Overloaded from None
+        try:
+            scored = await loop.run_in_executor(
+                executor(), partial(catalog.match, pantry_names, min_match=min_match, **filters))
+        finally:
+            semaphore.release()
+        future.set_result(scored)
+        return scored
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except BaseException as e:
+        future.set_exception(e)
+        future.exception()  # mark retrieved when no follower is waiting
+        raise
+    finally:
+        del inflight[key]
@@ -0,0 +1,44 @@
+"""
+Static files storage: WhiteNoise's CompressedManifestStaticFilesStorage with
+a minify step first.
+
+collectstatic copies static/ (main.css/main.js plus the per-page bundles
+extracted from the templates) into STATIC_ROOT; post_process() then minifies
+each copied CSS/JS file in place before the manifest step content-hashes it
+and WhiteNoise writes .gz and .br (Brotli) siblings. Hashed names are served
+with a far-future immutable Cache-Control, so a bundle is only downloaded
+again when its content changes.
+"""
+import os
+
+import rcssmin
+import rjsmin
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+MINIFIERS = {'.css': rcssmin.cssmin, '.js': rjsmin.jsmin}
+
+
+def minify(name, text):
+    """`text` minified by the MINIFIERS entry for `name`'s extension (unchanged if none)."""
+    base, ext = os.path.splitext(name)
+    if ext not in MINIFIERS or base.endswith('.min'):
+        return text
+    return MINIFIERS[ext](text)
+
+
+class MinifiedManifestStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            paths = dict(paths)
+            for name in paths:
+                if os.path.splitext(name)[1] in MINIFIERS:
+                    path = self.path(name)
+                    with open(path, encoding='utf-8') as f:
+                        text = f.read()
+                    minified = minify(name, text)
+                    if minified != text:
+                        with open(path, 'w', encoding='utf-8') as f:
+                            f.write(minified)
+                    # Hash the minified copy, not the source file collectstatic copied it from
+                    paths[name] = (self, name)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
@@ -0,0 +1,128 @@
+"""
+Synthetic catalogs for memory reports, benchmarks and load tests.
+
+Ingredient names and categories come from data/Complete_Ingredients_Global.csv
+when present; larger vocabularies add variants ("Smoked Onion", ...). Recipes
+draw their ingredients from a Zipf distribution over the vocabulary, so a few
+staples (onion, salt, oil...) appear in most recipes and the long tail rarely,
+like the real data.
+"""
+import csv
+import os
+import random
+from bisect import bisect_left
+from itertools import accumulate
+
+from django.conf import settings
+
+CATEGORIES  = ['Main Course', 'Snack', 'Dessert', 'Breakfast', 'Side Dish', 'Soup', 'Bread', 'Beverage']
+CUISINES    = ['Indian', 'Italian', 'Chinese', 'Mexican', 'Japanese', 'Thai', 'French', 'Korean',
+               'American', 'British', 'German', 'Spanish', 'Greek', 'Moroccan', 'Peruvian', 'Other']
+COUNTRIES   = ['India', 'Italy', 'China', 'Mexico', 'Japan', 'Thailand', 'France', 'Korea', 'USA', 'UK']
+DIFFICULTIES = ['Easy', 'Medium', 'Hard']
+VARIANTS    = ['Fresh', 'Dried', 'Smoked', 'Roasted', 'Pickled', 'Ground', 'Organic', 'Wild', 'Baby', 'Aged']
+UNITS       = ['g', 'ml', 'tbsp', 'tsp', 'cup', 'pcs']
+
+# Staples listed first get the highest Zipf ranks
+STAPLES = ['onion', 'salt', 'oil', 'garlic', 'tomato', 'ginger', 'water', 'sugar', 'cumin', 'turmeric',
+           'green chilli', 'butter', 'rice', 'coriander', 'milk', 'lemon', 'black pepper', 'flour']
+
+
+def csv_ingredients():
+    """(name, category) pairs from the bundled ingredient CSV, or a generic fallback."""
+    path = os.path.join(settings.BASE_DIR, 'data', 'Complete_Ingredients_Global.csv')
+    if not os.path.exists(path):
+        return [(f'Ingredient {i}', 'Other / Miscellaneous') for i in range(2000)]
+    with open(path, encoding='utf-8') as f:
+        return [(row['Ingredient_Name'].strip(), row['Category'].strip())
+                for row in csv.DictReader(f) if row['Ingredient_Name'].strip()]
+
+
+def ingredient_vocabulary(size=None, seed=0):
+    """
+    Return `size` unique (name, category) pairs ordered by Zipf rank
+    (most frequent first). Defaults to the CSV vocabulary.
+    """
+    rng = random.Random(seed)
+    # The CSV repeats some names with different casing; keep the first
+    base = list({name.lower(): (name, category) for name, category in reversed(csv_ingredients())}.values())
+    rank = {name: i for i, name in enumerate(STAPLES)}
+    rng.shuffle(base)
+    base.sort(key=lambda ing: rank.get(ing[0].lower(), len(STAPLES)))
+    size = size or len(base)
+
+    vocabulary = base[:size]
+    seen = {name.lower() for name, _ in vocabulary}
+    n = 0
+    while len(vocabulary) < size:
+        name, category = base[n % len(base)]
+        variant = VARIANTS[(n // len(base)) % len(VARIANTS)]
+        candidate = f'{variant} {name}'
+        if n >= len(base) * len(VARIANTS):
+            candidate = f'{candidate} {n // (len(base) * len(VARIANTS))}'
+        if candidate.lower() not in seen:
+            seen.add(candidate.lower())
+            vocabulary.append((candidate, category))
+        n += 1
+    return vocabulary
+
+
+class ZipfSampler:
+    """Draw distinct vocabulary indexes with P(rank k) proportional to 1 / k**s."""
+
+    def __init__(self, size, s=1.1, rng=None):
+        self.rng = rng or random.Random(0)
+        self.cum = list(accumulate(1.0 / (k ** s) for k in range(1, size + 1)))
+
+    def sample(self, k):
+        total = self.cum[-1]
+        picked = []
+        seen = set()
+        while len(picked) < k:
+            i = bisect_left(self.cum, self.rng.random() * total)
+            if i not in seen:
+                seen.add(i)
+                picked.append(i)
+        return picked
+
+
+def recipe_rows(count, seed=0, vocabulary=None, zipf_s=1.1, start=1):
+    """
+    Yield dicts with the Recipe fields the catalog, cards and views read.
+    Deterministic for a given seed. `vocabulary` is a list of names or
+    (name, category) pairs in Zipf rank order.
+    """
+    rng = random.Random(seed)
+    vocabulary = vocabulary or ingredient_vocabulary(seed=seed)
+    names = [v[0] if isinstance(v, tuple) else v for v in vocabulary]
+    sampler = ZipfSampler(len(names), zipf_s, rng)
+    for i in range(start, start + count):
+        ingredients = [names[j] for j in sampler.sample(min(rng.randint(6, 16), len(names)))]
+        category = rng.choice(CATEGORIES)
+        yield {
+            'id': i,
+            'recipe_id': f'SYN{i:07d}',
+            'name': f'{ingredients[-1]} {category} #{i}',
+            'ingredients_raw': ', '.join(f'{name} ({rng.randint(1, 500)} {rng.choice(UNITS)})' for name in ingredients),
+            'instructions': '. '.join(f'Step {n} with {name}' for n, name in enumerate(ingredients, 1)) + '.',
+            'category': category,
+            'cuisine_type': rng.choice(CUISINES),
+            'country': rng.choice(COUNTRIES),
+            'difficulty': rng.choice(DIFFICULTIES),
+            'is_vegetarian': rng.random() < 0.6,
+            'is_vegan': rng.random() < 0.2,
+            'is_gluten_free': rng.random() < 0.3,
+            'prep_time': rng.randint(5, 60),
+            'total_time': rng.randint(10, 180),
+            'calories': round(rng.uniform(80, 900), 1),
+            'protein': round(rng.uniform(1, 60), 1),
+            'carbohydrates': round(rng.uniform(5, 120), 1),
+            'fat': round(rng.uniform(1, 60), 1),
+            'fiber': round(rng.uniform(0, 20), 1),
+            'sodium': round(rng.uniform(50, 2500), 1),
+            'iron': round(rng.uniform(0, 15), 1),
+            'vitamin_c': round(rng.uniform(0, 90), 1),
+            'spice_level': rng.choice(['Mild', 'Medium', 'Hot']),
+            'meal_time': rng.choice(['Breakfast', 'Lunch', 'Dinner', 'Snack']),
+            'image_url': '',
+        }
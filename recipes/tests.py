@@ -1,6 +1,35 @@
-from django.test import TestCase, Client
-from django.urls import reverse
-from .models import Ingredient, Recipe
+import base64
+import csv
+import gzip
+import importlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import warnings
+from array import array
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.backends.base import CacheKeyWarning
+from django.core.management import call_command
+from django.core.servers.basehttp import ThreadedWSGIServer
+from django.db import OperationalError, connection, connections, transaction
+from django.test import Client, LiveServerTestCase, TestCase, override_settings
+from django.test.testcases import LiveServerThread
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, reverse
+from django.utils import timezone
+from . import admin as recipe_admin
+from . import (budgets, catalog, exports, jobs, planner, profiling, recommendations, responses, routers, singleflight,
+               storage, warmup)
+from .models import CatalogVersion, Ingredient, Job, Recipe, RecipeIngredient, RecipeNeighbor, SavedRecipe, UserPantry
+from .synthetic import ingredient_vocabulary, recipe_rows
 
 
 class IngredientModelTest(TestCase):
@@ -46,9 +75,524 @@ class RecipeModelTest(TestCase):
         m, t, pct = self.recipe.match_score({'tomato', 'onion', 'oil'})
         self.assertEqual(pct, 100)
 
+    def test_display_fields_precomputed_on_save(self):
+        import zlib
+        h = zlib.adler32(b'Test Curry') & 0xffffffff
+        self.assertEqual(self.recipe.visual_hue, h % 360)
+        self.assertEqual(self.recipe.visual_dna['duration'], 3.0 + ((h % 30) / 10.0))
+        self.assertEqual(self.recipe.ingredient_count, 3)
+        self.recipe.name = 'Renamed Curry'
+        self.recipe.instructions = 'Chop. Fry. Serve.'
+        self.recipe.save(update_fields=['name', 'instructions'])
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.visual_hue, (zlib.adler32(b'Renamed Curry') & 0xffffffff) % 360)
+        self.assertEqual(self.recipe.instructions_list, ['Chop', 'Fry', 'Serve'])
+
+    def test_backfill_display_fields(self):
+        from django.core.management import call_command
+        Recipe.objects.filter(pk=self.recipe.pk).update(visual_hue=0, ingredient_count=0, instructions_list=[])
+        version = catalog.current_version()
+        call_command('backfill_display_fields', stdout=io.StringIO())
+        self.assertEqual(catalog.current_version(), version + 1)   # cached cards are re-rendered
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.ingredient_count, 3)
+        expected = Recipe(name='Test Curry', instructions='', ingredients_raw='')
+        expected.compute_display_fields()
+        self.assertEqual(self.recipe.visual_dna, expected.visual_dna)
+
+
+class CatalogTest(TestCase):
+    def setUp(self):
+        catalog.invalidate()
+        self.curry = Recipe.objects.create(
+            recipe_id='C1', name='Test Curry', ingredients_raw='Tomato (2), Onion (1), Oil',
+            category='Main Course', cuisine_type='Indian', difficulty='Easy', is_vegetarian=True,
+        )
+        self.stew = Recipe.objects.create(
+            recipe_id='C2', name='Beef Stew', ingredients_raw="['Beef', 'Onion', 'Carrot']",
+            category='Main Course', cuisine_type='British', difficulty='Medium',
+        )
+
+    def test_match_agrees_with_model_score(self):
+        pantry = {'onion', 'tomato'}
+        cat = catalog.get_catalog()
+        scored = {cat.ids[pos]: (m, t, pct) for pos, m, t, pct in cat.match(pantry)}
+        self.assertEqual(scored[self.curry.id], self.curry.match_score(pantry))
+        self.assertEqual(scored[self.stew.id], self.stew.match_score(pantry))
+
+    def test_match_filters_and_order(self):
+        cat = catalog.get_catalog()
+        results = cat.match({'onion', 'tomato'}, diet='vegetarian')
+        self.assertEqual([cat.ids[pos] for pos, *_ in results], [self.curry.id])
+        results = cat.match({'onion', 'tomato'}, cuisine='Nowhere')
+        self.assertEqual(results, [])
+        results = cat.match({'onion', 'tomato'})
+        self.assertEqual(cat.recipe(results[0][0]).name, 'Test Curry')
+
+    def test_min_match_zero_includes_unmatched(self):
+        cat = catalog.get_catalog()
+        self.assertEqual(len(cat.match({'saffron'}, min_match=0)), 2)
+        self.assertEqual(cat.match({'saffron'}, min_match=10), [])
+
+    def test_compact_columns(self):
+        cat = catalog.get_catalog()
+        pos = cat.position(self.stew.id)
+        self.assertEqual(cat.ids[pos], self.stew.id)
+        self.assertIsNone(cat.position(-1))
+        stew = cat.recipe(pos)
+        self.assertEqual((stew.cuisine_type, stew.difficulty, stew.is_vegetarian), ('British', 'Medium', False))
+        # Shared labels are stored once as codes, not per recipe
+        self.assertEqual(cat.category[0], cat.category[1])
+        self.assertEqual(len(cat.terms), 5)
+
+    def test_save_bumps_version_and_rebuilds(self):
+        before = catalog.get_catalog()
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.create(recipe_id='C3', name='Dal', ingredients_raw='Lentils', category='Main Course')
+        after = catalog.get_catalog()
+        self.assertGreater(after.version, before.version)
+        self.assertEqual(after.stats['recipes'], 3)
+
+    def test_batch_update_bumps_once(self):
+        start = catalog.current_version()
+        with catalog.batch_update():
+            for i in range(3):
+                Recipe.objects.create(recipe_id=f'B{i}', name=f'Batch {i}', ingredients_raw='Salt', category='Snack')
+        self.assertEqual(catalog.current_version(), start + 1)
+
+    def test_facets(self):
+        cat = catalog.get_catalog()
+        self.assertEqual(cat.cuisines, ['British', 'Indian'])
+        self.assertEqual(cat.categories, ['Main Course'])
+
+
+class ReadinessTest(TestCase):
+    def test_not_ready_before_warmup(self):
+        with mock.patch.dict(warmup._status, ready=False):
+            r = self.client.get('/healthz/ready/')
+        self.assertEqual(r.status_code, 503)
+
+    def test_ready_after_warmup(self):
+        catalog.invalidate()
+        warmup.run()
+        r = self.client.get('/healthz/ready/')
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r.json()['ready'])
+
+
+class CardCacheTest(TestCase):
+    def setUp(self):
+        catalog.invalidate()
+        cache.clear()
+        self.recipe = Recipe.objects.create(
+            recipe_id='K1', name='Cached Curry', ingredients_raw='Onion, Tomato',
+            category='Main Course', cuisine_type='Indian', difficulty='Easy', is_vegetarian=True,
+        )
+
+    def card_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.get(url)
+        self.assertContains(r, 'Cached Curry')
+        return [q['sql'] for q in ctx.captured_queries if '"visual_hue"' in q['sql']]
+
+    def test_list_cards_cached_after_first_render(self):
+        self.assertEqual(len(self.card_queries('/recipes/')), 1)
+        self.assertEqual(self.card_queries('/recipes/'), [])
+
+    def test_match_badge_injected_outside_cached_card(self):
+        onion = Ingredient.objects.create(ingredient_id='K2', name='Onion', name_lower='onion', category='Vegetables')
+        self.client.post('/api/pantry/toggle/', {'ingredient_id': onion.id}, content_type='application/json')
+        self.assertContains(self.client.get('/match/'), '<span class="badge badge-match">100%</span>', html=False)
+        saffron = Ingredient.objects.create(ingredient_id='K3', name='Saffron', name_lower='saffron', category='Spices')
+        self.client.post('/api/pantry/toggle/', {'ingredient_id': saffron.id}, content_type='application/json')
+        r = self.client.get('/match/')
+        self.assertContains(r, '<span class="badge badge-match">50%</span>', html=False)
+        self.assertContains(r, '1 of 2 ingredients')
+
+
+class QueryBudgetTest(TestCase):
+    def setUp(self):
+        catalog.invalidate()
+        cache.clear()
+        self.ings = [
+            Ingredient.objects.create(ingredient_id=f'QB{i}', name=f'Spice {i}', name_lower=f'spice {i}',
+                                      category='Spices')
+            for i in range(budgets.PANTRY_ROWS)
+        ]
+        self.recipes = [
+            Recipe.objects.create(recipe_id=f'QBR{i}', name=f'Dish {i}', category='Snack',
+                                  ingredients_raw=', '.join(f'Spice {j}' for j in range(i % 8 + 1)))
+            for i in range(40)
+        ]
+        self.user = User.objects.create_user('cook', password='pw')
+        for recipe in self.recipes[:30]:
+            SavedRecipe.objects.create(user=self.user, recipe=recipe)
+
+    def requests(self):
+        pk = self.recipes[0].pk
+        return [
+            ('home', 'get', '/', None),
+            ('match', 'get', '/match/', None),
+            ('recipe_list', 'get', '/recipes/', None),
+            ('recipe_list', 'get', '/recipes/?q=dish&page=2', None),
+            ('recipe_detail', 'get', f'/recipes/{pk}/', None),
+            ('register', 'get', '/register/', None),
+            ('pantry_list', 'get', '/api/pantry/', None),
+            ('pantry_toggle', 'post', '/api/pantry/toggle/', {'ingredient_id': self.ings[0].id}),
+            ('ingredient_search', 'get', '/api/ingredients/search/?q=spice', None),
+            ('ingredients_by_cat', 'get', '/api/ingredients/Spices/', None),
+            ('api_match', 'get', '/api/match/', None),
+            ('nutrition_histograms', 'get', '/api/nutrition/', None),
+            ('meal_plan', 'get', '/api/plan/', None),
+            ('catalog_index', 'get', f'/api/catalog/index/?v={catalog.get_catalog().version}', None),
+            ('export_recipes', 'get', '/api/export/recipes.csv', None),
+            ('export_matches', 'get', '/api/export/matches.ndjson', None),
+            ('readiness', 'get', '/healthz/ready/', None),
+            ('pantry_clear', 'post', '/api/pantry/clear/', None),
+        ]
+
+    def replay(self, client, requests):
+        catalog.get_catalog()  # budgets cover steady state, not the one-off build
+        for name, method, url, body in requests:
+            with budgets.track() as usage:
+                if method == 'post':
+                    r = client.post(url, body or {}, content_type='application/json')
+                else:
+                    r = client.get(url)
+            self.assertIn(r.status_code, (200, 503), url)
+            self.assertEqual(r.resolver_match.url_name, name)
+            budgets.check(name, usage)
+
+    def fill_pantry(self, client):
+        for ing in self.ings:
+            client.post('/api/pantry/toggle/', {'ingredient_id': ing.id, 'action': 'add'},
+                        content_type='application/json')
+
+    def test_first_visit_within_budget(self):
+        catalog.get_catalog()
+        for name, method, url, body in self.requests():
+            if method == 'get':
+                with budgets.track() as usage:
+                    Client().get(url)
+                budgets.check(name, usage, new_session=True)
+
+    def test_every_endpoint_has_a_budget(self):
+        from .urls import urlpatterns
+        self.assertEqual({p.name for p in urlpatterns}, set(budgets.BUDGETS))
+
+    def test_anonymous_requests_within_budget(self):
+        self.fill_pantry(self.client)
+        self.replay(self.client, self.requests())
+        self.fill_pantry(self.client)
+        form = {'username': 'newcook', 'password1': 'Sup3r-secret!', 'password2': 'Sup3r-secret!'}
+        with budgets.track() as usage:
+            self.assertEqual(self.client.post('/register/', form).status_code, 302)
+        budgets.check('register', usage)
+        self.assertEqual(UserPantry.objects.get(user__username='newcook').ingredients.count(), budgets.PANTRY_ROWS)
+
+    def test_authenticated_requests_within_budget(self):
+        self.client.login(username='cook', password='pw')
+        self.fill_pantry(self.client)
+        pk = self.recipes[35].pk
+        self.replay(self.client, self.requests() + [
+            ('saved_recipes', 'get', '/saved/', None),
+            ('save_recipe', 'post', f'/api/recipes/{pk}/save/', None),
+        ])
+
+    def test_rows_are_counted(self):
+        with budgets.track() as usage:
+            list(Recipe.objects.values_list('id', flat=True))
+            Recipe.objects.first()
+        self.assertEqual((usage.queries, usage.rows), (2, 41))
+        with mock.patch.dict(budgets.BUDGETS, {'api_match': budgets.Budget(queries=2, rows=40)}):
+            with self.assertRaisesMessage(budgets.QueryBudgetExceeded, '41 rows (budget 40)'):
+                budgets.check('api_match', usage)
+
+    @override_settings(QUERY_BUDGET_ENFORCE=True)
+    def test_middleware_raises_over_budget(self):
+        catalog.get_catalog()
+        self.assertEqual(self.client.get('/recipes/').status_code, 200)
+        with mock.patch.dict(budgets.BUDGETS, {'recipe_list': budgets.Budget(queries=1, rows=0)}):
+            with self.assertRaises(budgets.QueryBudgetExceeded):
+                self.client.get('/recipes/')
+
+
+class SerialWSGIServer(ThreadedWSGIServer):
+    """
+    Serve one request at a time: under LiveServerTestCase every request shares
+    the single in-memory SQLite connection, and concurrent virtual users would
+    race on it ("cannot start a transaction within a transaction").
+    """
+
+    def process_request(self, request, client_address):
+        self.process_request_thread(request, client_address)
+
+
+class SerialLiveServerThread(LiveServerThread):
+    server_class = SerialWSGIServer
+
+
+class LoadTestCommandTest(LiveServerTestCase):
+    server_thread_class = SerialLiveServerThread
+
+    def test_pantry_flow_report(self):
+        for i in range(6):
+            Ingredient.objects.create(ingredient_id=f'LT{i}', name=f'Herb {i}', name_lower=f'herb {i}', category='Herbs')
+        for i in range(4):
+            Recipe.objects.create(recipe_id=f'LTR{i}', name=f'Herb Salad {i}', category='Side Dish',
+                                  ingredients_raw='Herb 0, Herb 1, Herb 2')
+        catalog.invalidate()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            record, report = os.path.join(tmp, 'flows.jsonl'), os.path.join(tmp, 'report.json')
+            call_command('loadtest', url=self.live_server_url, users=2, flows=1, toggles=3, register=True,
+                         record=record, output=report, stdout=open(os.devnull, 'w'))
+            with open(report) as f:
+                data = json.load(f)
+            self.assertEqual(data['errors'], 0, data['endpoints'])
+            self.assertEqual(data['endpoints']['pantry_toggle']['requests'], 6)
+            self.assertEqual(data['endpoints']['save_recipe']['requests'], 2)
+            self.assertEqual(SavedRecipe.objects.count(), 2)
+
+            call_command('loadtest', url=self.live_server_url, users=1, flows=1, replay=record,
+                         output=report, stdout=open(os.devnull, 'w'))
+            with open(report) as f:
+                replayed = json.load(f)
+        self.assertEqual(replayed['endpoints']['match']['requests'], 1)
+
+
+class SingleFlightTest(TestCase):
+    def test_concurrent_callers_share_one_computation(self):
+        group = singleflight.Group()
+        started, release = threading.Event(), threading.Event()
+        calls, results = [], []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return ['scored']
+
+        def caller():
+            results.append(group.do('pantry', compute))
+
+        leader = threading.Thread(target=caller)
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=caller) for _ in range(3)]
+        for t in followers:
+            t.start()
+        while len(group._calls['pantry'].done._cond._waiters) < 3:
+            threading.Event().wait(0.01)
+        release.set()
+        for t in [leader, *followers]:
+            t.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True, True])
+        self.assertTrue(all(r is results[0][0] for r, _ in results))
+        self.assertEqual(group._calls, {})
+
+    def test_errors_propagate_and_clear(self):
+        group = singleflight.Group()
+        with self.assertRaises(ZeroDivisionError):
+            group.do('k', lambda: 1 / 0)
+        self.assertEqual(group.do('k', lambda: 2), (2, False))
+
+    @override_settings(MATCH_MAX_CONCURRENT=1, MATCH_ADMISSION_TIMEOUT=0, MATCH_RETRY_AFTER=3)
+    def test_admission_limit_returns_503(self):
+        catalog.invalidate()
+        onion = Ingredient.objects.create(ingredient_id='SF1', name='Onion', name_lower='onion', category='Vegetables')
+        Recipe.objects.create(recipe_id='SFR1', name='Onion Soup', ingredients_raw='Onion', category='Soup')
+        self.client.post('/api/pantry/toggle/', {'ingredient_id': onion.id}, content_type='application/json')
+
+        with singleflight._admission.slot():
+            r = self.client.get('/api/match/')
+            self.assertEqual(r.status_code, 503)
+            self.assertEqual(r['Retry-After'], '3')
+            self.assertEqual(self.client.get('/match/').status_code, 503)
+        self.assertEqual(self.client.get('/api/match/').json()['count'], 1)
+
+
+class AsyncAPITest(TestCase):
+    """The JSON APIs as routed under ASGI (ASYNC_API=True)."""
+
+    def setUp(self):
+        catalog.invalidate()
+        self.routes(async_api=True)
+        self.addCleanup(self.routes, async_api=False)
+
+    def routes(self, async_api):
+        from recipematch import urls as root_urls
+        from . import urls
+        with override_settings(ASYNC_API=async_api):
+            importlib.reload(urls)
+            importlib.reload(root_urls)
+        clear_url_caches()
+
+    def test_async_views_are_routed(self):
+        r = self.client.get('/api/pantry/')
+        self.assertEqual(r.resolver_match.func.__name__, 'pantry_list_async')
+        self.assertEqual(r.json(), {'ingredients': [], 'count': 0, 'catalog_version': catalog.get_catalog().version})
+
+    def test_pantry_and_match_flow(self):
+        onion = Ingredient.objects.create(ingredient_id='AS1', name='Onion', name_lower='onion', category='Vegetables')
+        Recipe.objects.create(recipe_id='ASR1', name='Onion Soup', ingredients_raw='Onion, Stock', category='Soup')
+
+        r = self.client.post('/api/pantry/toggle/', {'ingredient_id': onion.id}, content_type='application/json')
+        self.assertEqual(r.json(), {'success': True, 'in_pantry': True, 'name': 'Onion'})
+        self.assertEqual(self.client.get('/api/pantry/').json()['count'], 1)
+        self.assertTrue(self.client.get('/api/ingredients/search/?q=oni').json()['ingredients'][0]['in_pantry'])
+        self.assertTrue(self.client.get('/api/ingredients/Vegetables/').json()['ingredients'][0]['in_pantry'])
+
+        data = self.client.get('/api/match/').json()
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['recipes'][0]['name'], 'Onion Soup')
+
+        self.assertEqual(self.client.get('/api/pantry/toggle/').status_code, 405)
+        self.client.post('/api/pantry/clear/')
+        self.assertEqual(self.client.get('/api/match/').json(), {'recipes': [], 'count': 0})
+
+    @override_settings(MATCH_MAX_CONCURRENT=1, MATCH_ADMISSION_TIMEOUT=0)
+    def test_concurrent_identical_matches_coalesce(self):
+        import asyncio
+        Recipe.objects.create(recipe_id='ASR2', name='Garlic Bread', ingredients_raw='Garlic, Bread', category='Bread')
+        snapshot = catalog.get_catalog()
+        calls = []
+        real_match = snapshot.match
+
+        def slow_match(*args, **kwargs):
+            calls.append(1)
+            threading.Event().wait(0.05)
+            return real_match(*args, **kwargs)
+
+        async def burst():
+            return await asyncio.gather(*(singleflight.amatch(snapshot, {'garlic'}) for _ in range(5)))
+
+        with mock.patch.object(snapshot, 'match', slow_match):
+            results = asyncio.run(burst())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results[0][0][1], 1)
+        self.assertTrue(all(r is results[0] for r in results))
+
+
+class CatalogRouterTest(TestCase):
+    def setUp(self):
+        self.router = routers.CatalogRouter()
+        self.recipe = Recipe.objects.create(recipe_id='RT1', name='Dal', ingredients_raw='Lentils')
+
+    def test_catalog_reads_use_catalog_alias(self):
+        with mock.patch.object(connection, 'in_atomic_block', False):
+            self.assertEqual(self.router.db_for_read(Recipe), 'catalog')
+            self.assertEqual(self.router.db_for_read(Ingredient), 'catalog')
+            self.assertEqual(self.router.db_for_read(RecipeIngredient), 'catalog')
+            self.assertEqual(self.router.db_for_read(CatalogVersion), 'catalog')   # same snapshot as the rows
+            self.assertIsNone(self.router.db_for_read(UserPantry))
+            self.assertIsNone(self.router.db_for_read(User))
+
+    def test_reads_stay_on_primary_in_transactions_and_relations(self):
+        with transaction.atomic():
+            self.assertIsNone(self.router.db_for_read(Recipe))
+        pantry = UserPantry.objects.create(session_key='rt')
+        with mock.patch.object(connection, 'in_atomic_block', False):
+            self.assertEqual(self.router.db_for_read(Ingredient, instance=pantry), 'default')
+
+    def test_writes_and_migrations_go_to_primary(self):
+        self.assertEqual(self.router.db_for_write(Recipe, instance=self.recipe), 'default')
+        self.assertTrue(self.router.allow_relation(self.recipe, UserPantry()))
+        self.assertTrue(self.router.allow_migrate('default', 'recipes'))
+        self.assertFalse(self.router.allow_migrate('catalog', 'recipes'))
+
+    def test_catalog_connection_is_query_only(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            default = connections['default']
+            wrapper = type(default)({**default.settings_dict, 'NAME': os.path.join(tmp, 'c.sqlite3')}, alias='catalog')
+            try:
+                with wrapper.cursor() as cursor:
+                    cursor.execute('PRAGMA query_only')
+                    self.assertEqual(cursor.fetchone(), (1,))
+                    with self.assertRaisesMessage(Exception, 'readonly'):
+                        cursor.execute('CREATE TABLE t (id integer)')
+            finally:
+                wrapper.close()
+
+
+class ProfilingMiddlewareTest(TestCase):
+    def setUp(self):
+        catalog.invalidate()
+        onion = Ingredient.objects.create(ingredient_id='P1', name='Onion', name_lower='onion', category='Vegetables')
+        Recipe.objects.create(recipe_id='P1', name='Onion Soup', ingredients_raw='Onion, Butter', category='Soup')
+        self.client.post('/api/pantry/toggle/', {'ingredient_id': onion.id}, content_type='application/json')
+
+    def test_disabled_by_default(self):
+        self.assertNotIn('Server-Timing', self.client.get('/api/match/'))
+
+    @override_settings(PROFILING_ENABLED=True)
+    def test_server_timing_and_log_line(self):
+        client = Client()
+        client.cookies = self.client.cookies
+        with self.assertLogs('recipes.profiling', 'INFO') as logs:
+            r = client.get('/match/')
+        timing = r['Server-Timing']
+        for metric in ('db;dur=', 'pantry;dur=', 'score;dur=', 'render;dur=', 'total;dur='):
+            self.assertIn(metric, timing)
+        entry = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(entry['view'], 'match')
+        self.assertEqual(entry['rows_scored'], 1)
+        self.assertGreater(entry['queries'], 0)
+
+    def test_sampled_requests_dump_profiles(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with override_settings(PROFILE_SAMPLE_RATE=1.0, PROFILE_DUMP_DIR=tmp):
+                r = Client().get('/api/match/')
+            self.assertEqual(r.status_code, 200)
+            self.assertTrue(any(name.endswith('.prof') for name in os.listdir(tmp)))
+
+    def test_dump_name_is_safe_and_bounded(self):
+        name = profiling.ProfilingMiddleware.dump_name('/recipes/../../etc/' + 'ä<>:*?' * 100 + '/')
+        self.assertRegex(name, r'^[\w-]+$')
+        self.assertLessEqual(len(name), 69)
+        self.assertTrue(profiling.ProfilingMiddleware.dump_name('/api/match/').startswith('api-match-'))
+        self.assertTrue(profiling.ProfilingMiddleware.dump_name('/').startswith('home-'))
+
+
+class SyntheticCatalogTest(TestCase):
+    def test_vocabulary_pads_unique_names(self):
+        vocabulary = ingredient_vocabulary(5000)
+        self.assertEqual(len(vocabulary), 5000)
+        self.assertEqual(len({name.lower() for name, _ in vocabulary}), 5000)
+
+    def test_ingredient_frequencies_are_skewed(self):
+        vocabulary = ingredient_vocabulary(500)
+        counts = {}
+        for row in recipe_rows(300, vocabulary=vocabulary):
+            for name in Recipe(ingredients_raw=row['ingredients_raw']).ingredient_names:
+                counts[name] = counts.get(name, 0) + 1
+        head = sum(counts.get(name, 0) for name, _ in vocabulary[:10])
+        tail = sum(counts.get(name, 0) for name, _ in vocabulary[-250:])
+        self.assertGreater(head, tail)
+
+    def test_generate_and_benchmark(self):
+        call_command('generate_catalog', recipes=60, ingredients=80, yes=True, stdout=open(os.devnull, 'w'))
+        self.assertEqual(Recipe.objects.count(), 60)
+        self.assertEqual(Ingredient.objects.count(), 80)
+        self.assertTrue(RecipeIngredient.objects.exists())
+        self.assertEqual(Recipe.objects.filter(ingredient_count=0).count(), 0)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            call_command('benchmark', iterations=2, only=['api_match', 'recipe_detail'], output=tmp,
+                         stdout=open(os.devnull, 'w'))
+            [name] = os.listdir(tmp)
+            with open(os.path.join(tmp, name)) as f:
+                run = json.load(f)
+        self.assertEqual(run['meta']['recipes'], 60)
+        self.assertEqual(set(run['results']), {'api_match', 'recipe_detail'})
+        self.assertGreater(run['results']['recipe_detail']['queries_per_request'], 0)
+
 
 class ViewTest(TestCase):
     def setUp(self):
+        catalog.invalidate()
+        cache.clear()
         self.client = Client()
 
     def test_home_loads(self):
@@ -75,3 +619,666 @@ class ViewTest(TestCase):
         self.assertEqual(r.status_code, 200)
         data = r.json()
         self.assertEqual(len(data['ingredients']), 1)
+
+    def test_match_page_scores_pantry(self):
+        onion = Ingredient.objects.create(ingredient_id='T2', name='Onion', name_lower='onion', category='Vegetables')
+        Recipe.objects.create(recipe_id='M1', name='Onion Bhaji', ingredients_raw='Onion, Gram Flour', category='Snack')
+        self.client.post('/api/pantry/toggle/', {'ingredient_id': onion.id}, content_type='application/json')
+        r = self.client.get('/match/')
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.context['total_matches'], 1)
+        self.assertEqual(r.context['page'].object_list[0]['pct'], 100)
+        data = self.client.get('/api/match/').json()
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['recipes'][0]['name'], 'Onion Bhaji')
+
+
+class AssetPipelineTest(TestCase):
+    def test_minify(self):
+        self.assertEqual(storage.minify('css/a.css', 'a {\n  color: red;  /* note */\n}\n'), 'a{color:red}')
+        self.assertEqual(storage.minify('js/a.js', 'let x = 1;  // one\n'), 'let x=1;')
+        self.assertEqual(storage.minify('js/a.min.js', 'let x = 1;'), 'let x = 1;')
+
+    def test_collectstatic_hashes_minified_precompressed_bundles(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(STATIC_ROOT=tmp):
+            call_command('collectstatic', interactive=False, verbosity=0, ignore_patterns=['admin'])
+            with open(os.path.join(tmp, 'staticfiles.json')) as f:
+                manifest = json.load(f)['paths']
+            for name in ('js/home.js', 'css/match.css'):
+                with open(os.path.join(settings.BASE_DIR, 'static', name)) as f:
+                    source = f.read()
+                hashed = os.path.join(tmp, manifest[name])
+                with open(hashed) as f:
+                    self.assertEqual(f.read(), storage.minify(name, source))
+                self.assertLess(os.path.getsize(hashed), len(source.encode()))
+                self.assertTrue(os.path.exists(hashed + '.gz'))
+                self.assertTrue(os.path.exists(hashed + '.br'))
+
+    def test_pages_load_deferred_bundles(self):
+        catalog.invalidate()
+        r = self.client.get('/')
+        self.assertNotContains(r, '<style>')
+        self.assertContains(r, 'id="active-category"')
+        self.assertContains(r, '<script defer src="/static/js/home.')
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        catalog.invalidate()
+        self.onion = Ingredient.objects.create(ingredient_id='EX1', name='Onion', name_lower='onion',
+                                               category='Vegetables')
+        Recipe.objects.create(recipe_id='EXR1', name='Onion Soup', ingredients_raw='Onion, Stock',
+                              category='Soup', is_vegetarian=True)
+        Recipe.objects.create(recipe_id='EXR2', name='Beef Stew, "Hearty"', ingredients_raw='Beef, Onion',
+                              category='Stew')
+        Recipe.objects.create(recipe_id='EXR3', name='Fruit Salad', ingredients_raw='Apple', category='Salad')
+
+    def body(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_recipes_ndjson_and_csv(self):
+        r = self.client.get('/api/export/recipes.ndjson?diet=vegetarian')
+        self.assertEqual(r['Content-Type'], 'application/x-ndjson')
+        self.assertIn('recipes.ndjson', r['Content-Disposition'])
+        rows = [json.loads(line) for line in self.body(r).splitlines()]
+        self.assertEqual([row['recipe_id'] for row in rows], ['EXR1'])
+
+        r = self.client.get('/api/export/recipes.csv')
+        rows = list(csv.DictReader(io.StringIO(self.body(r).decode())))
+        self.assertEqual([row['name'] for row in rows], ['Onion Soup', 'Beef Stew, "Hearty"', 'Fruit Salad'])
+        self.assertEqual(self.client.get('/api/export/recipes.xml').status_code, 404)
+
+    def test_matches_stream_full_result_gzipped(self):
+        self.client.post('/api/pantry/toggle/', {'ingredient_id': self.onion.id}, content_type='application/json')
+        r = self.client.get('/api/export/matches.ndjson?min_match=0&gzip=1')
+        self.assertEqual(r['Content-Type'], 'application/gzip')
+        self.assertIn('matches.ndjson.gz', r['Content-Disposition'])
+        rows = [json.loads(line) for line in gzip.decompress(self.body(r)).splitlines()]
+        self.assertEqual([(row['name'], row['pct']) for row in rows],
+                         [('Beef Stew, "Hearty"', 100), ('Onion Soup', 100), ('Fruit Salad', 0)])
+
+    def test_unparsable_match_params_fall_back(self):
+        self.client.post('/api/pantry/toggle/', {'ingredient_id': self.onion.id}, content_type='application/json')
+        rows = self.body(self.client.get('/api/export/matches.ndjson?min_match=abc')).splitlines()
+        self.assertEqual(len(rows), 2)   # the default 10% drops Fruit Salad
+        data = self.client.get('/api/match/?min_match=abc&limit=-5').json()
+        self.assertEqual((data['count'], len(data['recipes'])), (2, 1))
+        self.assertEqual(self.client.get('/api/match/?min_match=-5').json()['count'], 3)   # clamped to 0
+        self.assertEqual(self.client.get('/match/?min_match=abc').status_code, 200)
+
+    def test_chunks_stay_bounded(self):
+        rows = ((i, 'x' * 100) for i in range(5000))
+        chunks = list(exports.ndjson_chunks(rows, ('id', 'name')))
+        self.assertGreater(len(chunks), 5)
+        self.assertTrue(all(len(c) < exports.CHUNK_BYTES + 200 for c in chunks))
+
+
+class NutritionFilterTest(TestCase):
+    def setUp(self):
+        catalog.invalidate()
+        cache.clear()
+        self.onion = Ingredient.objects.create(ingredient_id='NU1', name='Onion', name_lower='onion',
+                                               category='Vegetables')
+        for i, (calories, protein) in enumerate([(200, 5), (450, 25), (700, 30), (900, 40)]):
+            Recipe.objects.create(recipe_id=f'NUR{i}', name=f'Onion Dish {i}', ingredients_raw='Onion',
+                                  category='Main', calories=calories, protein=protein)
+
+    def test_catalog_range_index(self):
+        snapshot = catalog.get_catalog()
+        names = lambda positions: sorted(snapshot.names[p] for p in positions)
+        self.assertEqual(names(snapshot.in_range('calories', None, 450)), ['Onion Dish 0', 'Onion Dish 1'])
+        self.assertEqual(names(snapshot.in_range('protein', 25)), ['Onion Dish 1', 'Onion Dish 2', 'Onion Dish 3'])
+        both = snapshot.filter(nutrition=(('calories', None, 700), ('protein', 20, None)))
+        self.assertEqual(names(both), ['Onion Dish 1', 'Onion Dish 2'])
+
+    def test_histograms_cover_every_recipe(self):
+        data = self.client.get('/api/nutrition/').json()
+        calories = data['nutrients']['calories']
+        self.assertEqual((calories['min'], calories['max'], calories['unit']), (200, 900, 'kcal'))
+        self.assertEqual(sum(b['count'] for b in calories['bins']), 4)
+        self.assertIsNone(calories['bins'][-1]['hi'])
+
+    def test_list_and_api_match_filters(self):
+        r = self.client.get('/recipes/?protein_min=20&calories_max=500&fat_max=oops')
+        self.assertEqual(r.context['total'], 1)
+        self.assertEqual(r.context['current_filters']['protein_min'], '20')
+        self.assertNotIn('fat_max', r.context['current_filters'])
+
+        self.client.post('/api/pantry/toggle/', {'ingredient_id': self.onion.id}, content_type='application/json')
+        data = self.client.get('/api/match/?protein_min=20&calories_max=800').json()
+        self.assertEqual(sorted(r['name'] for r in data['recipes']), ['Onion Dish 1', 'Onion Dish 2'])
+        self.assertEqual(self.client.get('/match/?calories_min=850').context['total_matches'], 1)
+
+    def test_filter_forms_carry_every_nutrient(self):
+        r = self.client.get('/recipes/?sodium_max=800')
+        for name in catalog.NUTRIENTS:
+            self.assertContains(r, f'name="{name}_min"')
+            self.assertContains(r, f'data-nutrient="{name}"')
+        self.assertEqual([n['hi'] for n in r.context['nutrition_filters'] if n['name'] == 'sodium'], [800])
+
+        self.client.post('/api/pantry/toggle/', {'ingredient_id': self.onion.id}, content_type='application/json')
+        r = self.client.get('/match/?calories_min=300&protein_max=35&category=Main')
+        self.assertContains(r, '<input type="hidden" name="calories_min" value="300">', html=True)
+        self.assertContains(r, '<input type="hidden" name="protein_max" value="35">', html=True)
+
+    def test_fractional_bounds_are_exact(self):
+        Recipe.objects.create(recipe_id='NUF', name='Onion Broth', ingredients_raw='Onion', category='Soup',
+                              calories=312.7, protein=20.3)
+        catalog.invalidate()
+        snapshot = catalog.get_catalog()
+        self.assertEqual([snapshot.names[p] for p in snapshot.in_range('protein', 20.3, 20.3)], ['Onion Broth'])
+        self.assertEqual(self.client.get('/recipes/?protein_min=20.3&protein_max=20.3').context['total'], 1)
+        self.client.post('/api/pantry/toggle/', {'ingredient_id': self.onion.id}, content_type='application/json')
+        data = self.client.get('/api/match/?protein_min=20.3&protein_max=20.3').json()
+        self.assertEqual([(r['name'], r['calories']) for r in data['recipes']], [('Onion Broth', 312.7)])
+
+
+class FacetCountTest(TestCase):
+    def setUp(self):
+        catalog.invalidate()
+        cache.clear()
+        self.garlic = Ingredient.objects.create(ingredient_id='FC1', name='Garlic', name_lower='garlic',
+                                                category='Vegetables')
+        for i, (category, cuisine, difficulty, vegan) in enumerate([
+            ('Main', 'Italian', 'Easy', True), ('Main', 'Indian', 'Hard', False),
+            ('Soup', 'Italian', 'Easy', True), ('Soup', 'Thai', 'Medium', False),
+        ]):
+            Recipe.objects.create(recipe_id=f'FCR{i}', name=f'Garlic Dish {i}', ingredients_raw='Garlic',
+                                  category=category, cuisine_type=cuisine, difficulty=difficulty,
+                                  is_vegan=vegan, is_vegetarian=vegan)
+        Recipe.objects.create(recipe_id='FCR9', name='Plain Rice', ingredients_raw='Rice', category='Main')
+
+    def test_counts_exclude_each_facets_own_filter(self):
+        snapshot = catalog.get_catalog()
+        scored = snapshot.match(['Garlic'], min_match=1, facets=True, category='Main', cuisine='Italian')
+        self.assertEqual([snapshot.names[s[0]] for s in scored], ['Garlic Dish 0'])
+        # category counts ignore category=Main but keep cuisine=Italian, and vice versa
+        self.assertEqual(scored.facets['category'], {'Main': 1, 'Soup': 1})
+        self.assertEqual(scored.facets['cuisine'], {'Indian': 1, 'Italian': 1})
+        self.assertEqual(scored.facets['difficulty'], {'Easy': 1})
+        self.assertEqual(scored.facets['diet'], {'vegan': 1, 'vegetarian': 1})
+
+    def test_facets_match_plain_scoring(self):
+        snapshot = catalog.get_catalog()
+        for filters in ({}, {'diet': 'vegan'}, {'category': 'Soup', 'difficulty': 'Medium'}):
+            plain = snapshot.match(['Garlic', 'Rice'], min_match=0, **filters)
+            faceted = snapshot.match(['Garlic', 'Rice'], min_match=0, facets=True, **filters)
+            self.assertEqual(list(plain), list(faceted))
+            self.assertIsNone(plain.facets)
+
+    def test_match_page_and_api_show_counts(self):
+        self.client.post('/api/pantry/toggle/', {'ingredient_id': self.garlic.id}, content_type='application/json')
+        r = self.client.get('/match/?min_match=1&category=Soup')
+        self.assertEqual(r.context['total_matches'], 2)
+        self.assertEqual(dict(r.context['categories']), {'Main': 2, 'Soup': 2})
+        self.assertEqual(dict(r.context['difficulties']), {'Easy': 1, 'Medium': 1, 'Hard': 0})
+        self.assertContains(r, 'Hard (0)')
+        data = self.client.get('/api/match/?min_match=1').json()
+        self.assertEqual(data['facets']['cuisine'], {'Italian': 2, 'Indian': 1, 'Thai': 1})
+
+
+class CatalogIndexTest(TestCase):
+    def setUp(self):
+        catalog.invalidate()
+        for i, (name, raw) in enumerate([('Pesto', "['Basil', 'Garlic']"), ('Garlic Bread', 'Garlic, Bread')]):
+            Recipe.objects.create(recipe_id=f'CI{i}', name=name, ingredients_raw=raw, category='Side',
+                                  is_vegetarian=True)
+
+    def fetch(self, **headers):
+        version = catalog.get_catalog().version
+        return self.client.get(f'/api/catalog/index/?v={version}', **headers)
+
+    def test_index_round_trips_catalog_columns(self):
+        snapshot = catalog.get_catalog()
+        r = self.fetch(HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(r['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', r['Cache-Control'])
+        data = json.loads(gzip.decompress(r.content))
+
+        def unpack(name):
+            kind, packed = data['arrays'][name]
+            return list(array({'Uint8': 'B', 'Uint16': 'H', 'Uint32': 'I'}[kind], base64.b64decode(packed)))
+
+        self.assertEqual(data['count'], len(snapshot))
+        self.assertEqual(unpack('ids'), list(snapshot.ids))
+        self.assertEqual(unpack('term_ids'), list(snapshot.term_ids))
+        self.assertEqual(unpack('flags'), list(snapshot.flags))
+        terms, start = [], 0
+        for count in unpack('term_counts'):
+            terms.append(sorted(data['terms'][t] for t in unpack('term_ids')[start:start + count]))
+            start += count
+        self.assertEqual(dict(zip(data['names'], terms)), {'Garlic Bread': ['bread', 'garlic'],
+                                                           'Pesto': ['basil', 'garlic']})
+
+    def test_versioned_caching(self):
+        r = self.fetch()
+        self.assertNotIn('Content-Encoding', r)
+        self.assertEqual(json.loads(r.content)['count'], 2)
+        self.assertNotIn('Content-Encoding', self.fetch(HTTP_ACCEPT_ENCODING='gzip;q=0, br'))
+        self.assertEqual(self.fetch(HTTP_IF_NONE_MATCH=r['ETag']).status_code, 304)
+
+        stale = self.client.get('/api/catalog/index/?v=stale')
+        self.assertEqual(stale.status_code, 302)
+        self.assertEqual(stale['Location'], f'/api/catalog/index/?v={catalog.get_catalog().version}')
+        self.assertEqual(self.client.get('/api/pantry/').json()['catalog_version'], catalog.get_catalog().version)
+
+
+class JSONResponseTest(TestCase):
+    def setUp(self):
+        catalog.invalidate()
+        cache.clear()
+        self.ings = [Ingredient.objects.create(ingredient_id=f'JR{i}', name=f'Chili {i:02}', name_lower=f'chili {i:02}',
+                                               category='Spices', is_vegetarian=True)
+                     for i in range(30)]
+        Recipe.objects.create(recipe_id='JR', name='Chili Oil', ingredients_raw='Chili 00, Oil', calories=500)
+
+    def category_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get('/api/ingredients/Spices/').json()
+        return data, [q['sql'] for q in ctx.captured_queries if '"category" =' in q['sql']]
+
+    def test_dumps_matches_stdlib(self):
+        data = {'name': 'Crème brûlée', 'pct': 62.5, 'tags': [1, None, True], 'facets': {'cuisine': {'': 2}}}
+        self.assertEqual(json.loads(responses.dumps(data)), data)
+        with mock.patch.object(responses, 'orjson', None):
+            self.assertEqual(json.loads(responses.dumps(data)), data)
+
+    def test_category_rows_serialized_once_per_version(self):
+        self.client.post('/api/pantry/toggle/', {'ingredient_id': self.ings[1].id}, content_type='application/json')
+        data, queries = self.category_queries()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual([row['in_pantry'] for row in data['ingredients'][:3]], [False, True, False])
+        self.assertEqual(data['ingredients'][0], {'id': self.ings[0].id, 'name': 'Chili 00', 'category': 'Spices',
+                                                  'in_pantry': False, 'is_veg': True, 'cuisine_origin': 'Indian'})
+
+        self.client.post('/api/pantry/toggle/', {'ingredient_id': self.ings[0].id}, content_type='application/json')
+        data, queries = self.category_queries()
+        self.assertEqual(queries, [])
+        self.assertEqual([row['in_pantry'] for row in data['ingredients'][:3]], [True, True, False])
+
+        Ingredient.objects.create(ingredient_id='JRX', name='Chili Flakes', name_lower='chili flakes', category='Spices')
+        catalog.invalidate()
+        data, queries = self.category_queries()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(len(data['ingredients']), 31)
+
+    def test_category_names_are_safe_cache_keys(self):
+        Ingredient.objects.create(ingredient_id='JRM', name='Chicken', name_lower='chicken', category='Meat & Poultry')
+        catalog.invalidate()
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)   # what memcached would reject
+            for _ in range(2):
+                data = self.client.get('/api/ingredients/Meat & Poultry/').json()
+                self.assertEqual([row['name'] for row in data['ingredients']], ['Chicken'])
+            self.assertEqual(self.client.get('/api/ingredients/' + 'x' * 300 + '/').json(), {'ingredients': []})
+        self.assertIsNone(cache.get(responses.category_key(catalog.get_catalog().version, 'x' * 300)))
+
+    def test_gzip_negotiation(self):
+        plain = self.client.get('/api/ingredients/Spices/')
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertIn('Accept-Encoding', plain['Vary'])
+        r = self.client.get('/api/ingredients/Spices/', HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(r['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(r.content), plain.content)
+
+        r = self.client.get('/api/nutrition/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(r['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(r.content))['recipes'], 1)
+
+        for header in ('gzip;q=0', 'br, *;q=0', 'identity', 'gzip;q=0, *'):
+            r = self.client.get('/api/ingredients/Spices/', HTTP_ACCEPT_ENCODING=header)
+            self.assertNotIn('Content-Encoding', r, header)
+        r = self.client.get('/api/ingredients/Spices/', HTTP_ACCEPT_ENCODING='br;q=1.0, *;q=0.5')
+        self.assertEqual(r['Content-Encoding'], 'gzip')
+
+        small = self.client.get('/api/pantry/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', small)
+        self.assertEqual(small.json()['count'], 0)
+
+
+class MealPlanTest(TestCase):
+    def setUp(self):
+        catalog.invalidate()
+        self.ings = {name: Ingredient.objects.create(ingredient_id=f'MP{i}', name=name, name_lower=name.lower(),
+                                                     category='Mixed')
+                     for i, name in enumerate(['Rice', 'Egg', 'Onion', 'Tomato', 'Basil', 'Lentils'])}
+        for i, (name, uses, time) in enumerate([
+            ('Fried Rice', ['Rice', 'Egg', 'Onion'], 20),
+            ('Egg Fried Onion', ['Egg', 'Onion'], 10),
+            ('Tomato Basil Soup', ['Tomato', 'Basil', 'Onion'], 90),
+            ('Tomato Salad', ['Tomato'], 5),
+            ('Dal', ['Lentils', 'Onion', 'Tomato'], 40),
+        ]):
+            recipe = Recipe.objects.create(recipe_id=f'MPR{i}', name=name, category='Main',
+                                           ingredients_raw=', '.join(uses), total_time=time)
+            for ing in uses:
+                RecipeIngredient.objects.create(recipe=recipe, ingredient=self.ings[ing])
+        for ing in self.ings.values():
+            self.client.post('/api/pantry/toggle/', {'ingredient_id': ing.id}, content_type='application/json')
+
+    def test_bit_sliced_greedy_matches_naive_greedy(self):
+        snapshot = catalog.get_catalog()
+        pantry = [ing.id for ing in self.ings.values()]
+        uses = {pos: {i for i in pantry if snapshot.ingredient_bits(i) >> pos & 1} for pos in range(len(snapshot))}
+        covered, expected = set(), []
+        for _ in range(3):
+            pos = max(uses, key=lambda p: (len(uses[p] - covered), -p))
+            expected.append(pos)
+            covered |= uses[pos]
+        self.assertEqual([s.pos for s in planner.plan(snapshot, pantry, size=3)], expected)
+        self.assertEqual(planner.best_position([0b0110, 0b0100, 0b1100, 0b0010]), 2)
+
+    def test_plan_endpoint(self):
+        data = self.client.get('/api/plan/?size=5').json()
+        # Three-way tie for the first pick goes to catalog (name) order
+        self.assertEqual([r['name'] for r in data['recipes']], ['Dal', 'Fried Rice', 'Tomato Basil Soup'])
+        self.assertEqual(data['recipes'][2]['new'], ['Basil'])
+        self.assertEqual((data['covered'], data['pantry'], data['unused']), (6, 6, []))
+
+        data = self.client.get('/api/plan/?size=2&max_time=30').json()
+        self.assertEqual([r['name'] for r in data['recipes']], ['Fried Rice', 'Tomato Salad'])
+        self.assertEqual(data['unused'], ['Basil', 'Lentils'])
+
+        # Unparsable params fall back to the defaults instead of a 500
+        data = self.client.get('/api/plan/?size=abc&max_time=soon').json()
+        self.assertEqual(len(data['recipes']), 3)
+
+
+class RecommendationTest(TestCase):
+    def setUp(self):
+        self.recipes = {name: Recipe.objects.create(recipe_id=f'RC{i}', name=name, ingredients_raw='Rice')
+                        for i, name in enumerate(['Dal', 'Rice', 'Naan', 'Salad', 'Soup'])}
+        self.users = [User.objects.create_user(f'saver{i}', password='pw') for i in range(4)]
+        for user, names in zip(self.users, [('Dal', 'Rice', 'Naan'), ('Dal', 'Rice', 'Naan'),
+                                            ('Dal', 'Rice', 'Salad'), ('Salad', 'Soup')]):
+            for name in names:
+                self.save(user, name)
+        SavedRecipe.objects.update(saved_at=timezone.now() - timedelta(days=1))   # equal decay
+
+    def save(self, user, name):
+        return SavedRecipe.objects.create(user=user, recipe=self.recipes[name])
+
+    def neighbors(self, name):
+        return {n.neighbor.name: n.co_saves for n in RecipeNeighbor.objects.filter(recipe=self.recipes[name])
+                .select_related('neighbor').order_by('-score', 'neighbor_id')}
+
+    def test_full_build_applies_threshold_and_ranks(self):
+        self.assertEqual(recommendations.build(full=True, min_co_saves=2), (5, 6))
+        self.assertEqual(self.neighbors('Dal'), {'Rice': 3, 'Naan': 2})
+        self.assertEqual(list(self.neighbors('Naan')), ['Dal', 'Rice'])
+        self.assertEqual(self.neighbors('Soup'), {})
+        self.assertEqual([r.name for r in recommendations.also_saved(self.recipes['Dal'].pk)], ['Rice', 'Naan'])
+
+    def test_incremental_build_only_touches_new_savers(self):
+        recommendations.build(full=True, min_co_saves=2)
+        self.save(self.users[3], 'Rice')
+        with CaptureQueriesContext(connection) as queries:
+            recipes, _ = recommendations.build(min_co_saves=2)
+        self.assertEqual(recipes, 3)   # Salad, Soup and Rice: user 3's saves
+        self.assertEqual(self.neighbors('Salad'), {'Rice': 2})
+        self.assertLess(len(queries), 15)
+        self.assertEqual(recommendations.build(min_co_saves=2), (0, 0))
+
+    def test_decay_prefers_recent_co_saves(self):
+        old = timezone.now() - timedelta(days=720)
+        SavedRecipe.objects.filter(user=self.users[2]).update(saved_at=old)
+        recommendations.build(full=True, min_co_saves=1, half_life_days=30)
+        self.assertEqual(list(self.neighbors('Salad'))[0], 'Soup')
+
+    def test_pages_show_recommendations(self):
+        recommendations.build(full=True, min_co_saves=2)
+        r = self.client.get(f'/recipes/{self.recipes["Naan"].pk}/')
+        self.assertEqual([s.name for s in r.context['also_saved']], ['Dal', 'Rice'])
+        self.client.force_login(self.users[2])
+        r = self.client.get('/saved/')
+        self.assertEqual([s.name for s in r.context['recommended']], ['Naan'])
+
+    @override_settings(RECOMMENDATION_RECENT_SAVES=3)
+    def test_user_recommendations_read_only_recent_saves(self):
+        # 30 saves, each with its own neighbor; the oldest saves' neighbors score highest
+        user = User.objects.create_user('hoarder', password='pw')
+        saved = [Recipe.objects.create(recipe_id=f'RH{i}', name=f'Saved {i}', ingredients_raw='Rice')
+                 for i in range(30)]
+        for i, recipe in enumerate(saved):
+            SavedRecipe.objects.create(user=user, recipe=recipe, saved_at=timezone.now() - timedelta(days=30 - i))
+            neighbor = Recipe.objects.create(recipe_id=f'RN{i}', name=f'Neighbor {i}', ingredients_raw='Rice')
+            RecipeNeighbor.objects.create(recipe=recipe, neighbor=neighbor, score=1 - i / 100, co_saves=2)
+        with CaptureQueriesContext(connection) as queries:
+            recommended = recommendations.for_user(user)
+        self.assertEqual([r.name for r in recommended], ['Neighbor 27', 'Neighbor 28', 'Neighbor 29'])
+        self.assertEqual(len(queries), 3)
+        # the aggregate is seeded with the three latest saves, not all thirty
+        aggregate = next(q['sql'] for q in queries if 'SUM(' in q['sql'])
+        seeds = aggregate.split('IN (', 1)[1].split(')', 1)[0].split(',')
+        self.assertEqual(sorted(int(pk) for pk in seeds), [r.pk for r in saved[-3:]])
+
+
+@override_settings(JOB_HEARTBEAT_INTERVAL=0.02, JOB_RETRY_DELAY=30, JOB_LEASE_SECONDS=60)
+class JobTest(TestCase):
+    def setUp(self):
+        self.worker = jobs.Worker('test-worker')
+        self.enterContext(mock.patch.object(jobs.logger, 'disabled', True))
+
+    def counting(self, progress, n=3):
+        for i in range(n):
+            progress(i + 1, n, f'item {i}')
+        return {'counted': n}
+
+    def test_enqueue_and_run(self):
+        with mock.patch.dict(jobs.TASKS, {'count': self.counting}):
+            job = jobs.enqueue('count', n=4)
+            self.assertEqual(self.worker.work(once=True), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.attempts), (Job.SUCCEEDED, {'counted': 4}, 1))
+        self.assertEqual((job.done, job.total, job.percent, job.message), (4, 4, 100, 'item 3'))
+        self.assertIsNotNone(job.rate)
+        with self.assertRaises(ValueError):
+            jobs.enqueue('nope')
+
+    def test_claim_is_exclusive(self):
+        with mock.patch.dict(jobs.TASKS, {'count': self.counting}):
+            job = jobs.enqueue('count')
+            jobs.enqueue('count', run_after=timezone.now() + timedelta(hours=1))
+        self.assertEqual(self.worker.claim().pk, job.pk)
+        self.assertIsNone(jobs.Worker('other').claim())
+        # The loser of a claim race matches no row and moves on
+        self.assertEqual(Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(status=Job.RUNNING), 0)
+
+    def test_failures_retry_with_backoff_then_fail(self):
+        def broken(progress):
+            raise RuntimeError('boom')
+
+        with mock.patch.dict(jobs.TASKS, {'broken': broken}):
+            job = jobs.enqueue('broken', max_attempts=2)
+            self.worker.work(once=True)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+            self.assertIn('RuntimeError: boom', job.error)
+            self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=25))
+
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            self.worker.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertTrue(jobs.retry(job.pk))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.error), (Job.QUEUED, 0, ''))
+
+    def test_cancel(self):
+        def endless(progress):
+            while True:
+                progress(progress.done + 1)
+                time.sleep(0.005)
+
+        with mock.patch.dict(jobs.TASKS, {'endless': endless}):
+            queued = jobs.enqueue('endless')
+            self.assertTrue(jobs.cancel(queued.pk))
+            queued.refresh_from_db()
+            self.assertEqual(queued.status, Job.CANCELLED)
+
+            running = jobs.enqueue('endless')
+            job = self.worker.claim()
+            self.assertTrue(jobs.cancel(running.pk))
+            self.assertEqual(self.worker.run(job), Job.CANCELLED)
+        running.refresh_from_db()
+        self.assertEqual(running.status, Job.CANCELLED)
+        self.assertGreater(running.done, 0)
+
+    def test_expired_lease_is_requeued(self):
+        job = Job.objects.create(kind='count', status=Job.RUNNING, worker='dead', attempts=1,
+                                 heartbeat_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(jobs.reap(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker), (Job.QUEUED, ''))
+        # The dead worker's late report no longer matches its lease
+        self.assertIsNone(self.worker.finish(job, jobs.Progress(), time.monotonic(), {}))
+
+    def test_locked_database_does_not_stop_the_worker(self):
+        with mock.patch.object(self.worker, 'claim', side_effect=[OperationalError('database is locked'), None]):
+            self.assertEqual(self.worker.work(once=True, poll=0), 0)
+
+    @override_settings(JOB_HEARTBEAT_INTERVAL=0)
+    def test_lease_renewed_inside_task_transaction(self):
+        with mock.patch.dict(jobs.TASKS, {'count': self.counting}):
+            jobs.enqueue('count')
+        job = self.worker.claim()
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=10))
+        progress = jobs.Progress(renew=lambda p: self.worker.renew_in_task(job, p, time.monotonic()))
+        with transaction.atomic():   # like import_data's import transaction
+            progress(3, 10, 'rows')
+        job.refresh_from_db()
+        self.assertEqual((job.done, job.total), (3, 10))
+        self.assertEqual(jobs.reap(), 0)
+
+    def test_build_recommendations_task_reports_progress(self):
+        progress = jobs.Progress()
+        self.assertEqual(jobs.TASKS['build_recommendations'](progress, full=True), {'recipes': 0, 'neighbors': 0})
+        progress.cancelled.set()
+        with self.assertRaises(jobs.Cancelled):
+            progress(1)
+
+    def test_catalog_keeps_serving_during_rebuild(self):
+        catalog.invalidate()
+        current = catalog.get_catalog()
+        with mock.patch.object(catalog, '_checked_at', 0.0), catalog._lock:
+            # Another thread holds the lock to rebuild: this one gets the previous catalog
+            self.assertIs(catalog.get_catalog(), current)
+
+
+class RecipeAdminTest(TestCase):
+    def setUp(self):
+        catalog.invalidate()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        self.onion = Ingredient.objects.create(ingredient_id='AD1', name='Onion', name_lower='onion', category='Veg')
+        Ingredient.objects.create(ingredient_id='AD2', name='Spring Onion', name_lower='spring onion', category='Veg')
+        for i, name in enumerate(['Chicken Curry', 'chickpea salad', 'Butter Chicken']):
+            recipe = Recipe.objects.create(recipe_id=f'AD{i}', name=name, ingredients_raw='Onion', category='Main')
+            RecipeIngredient.objects.create(recipe=recipe, ingredient=self.onion)
+
+    def test_catalog_name_prefix_index(self):
+        snapshot = catalog.get_catalog()
+        names = lambda positions: [snapshot.names[p] for p in positions]
+        self.assertEqual(names(snapshot.names_starting('CHICK')), ['Chicken Curry', 'chickpea salad'])
+        self.assertEqual(names(snapshot.names_starting('chick', limit=1)), ['Chicken Curry'])
+        self.assertEqual(len(snapshot.names_starting('zz')), 0)
+
+    def test_search_is_a_prefix_lookup(self):
+        r = self.client.get('/admin/recipes/recipe/?q=chick')
+        self.assertEqual(sorted(o.name for o in r.context['cl'].result_list), ['Chicken Curry', 'chickpea salad'])
+        self.assertEqual(r.context['cl'].result_count, 2)
+        r = self.client.get('/admin/recipes/recipe/?q=AD2')
+        self.assertEqual([o.name for o in r.context['cl'].result_list], ['Butter Chicken'])
+        r = self.client.get('/admin/recipes/ingredient/?q=ONI')
+        self.assertEqual([o.name for o in r.context['cl'].result_list], ['Onion'])
+        r = self.client.get('/admin/recipes/recipeingredient/?q=butter')
+        self.assertEqual([str(o.recipe) for o in r.context['cl'].result_list], ['Butter Chicken'])
+
+    def test_link_forms_use_autocomplete(self):
+        r = self.client.get('/admin/recipes/recipeingredient/add/')
+        self.assertNotContains(r, '>Chicken Curry<')
+        self.assertContains(r, 'admin-autocomplete')
+        r = self.client.get('/admin/autocomplete/', {'app_label': 'recipes', 'model_name': 'recipeingredient',
+                                                     'field_name': 'ingredient', 'term': 'spr'})
+        self.assertEqual([row['text'] for row in r.json()['results']], ['Spring Onion'])
+        recipe = Recipe.objects.get(recipe_id='AD0')
+        self.assertContains(self.client.get(f'/admin/recipes/recipe/{recipe.pk}/change/'), 'recipeingredient_set')
+
+    def test_unfiltered_changelist_uses_estimated_count(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')   # as import_data does
+        with mock.patch.object(recipe_admin, 'EXACT_COUNT_BELOW', 1), \
+                CaptureQueriesContext(connection) as queries:
+            r = self.client.get('/admin/recipes/recipeingredient/')
+        self.assertEqual(r.context['cl'].result_count, 3)
+        self.assertFalse([q for q in queries.captured_queries if 'COUNT(' in q['sql']])
+        self.assertEqual(recipe_admin.estimated_count(Recipe), 3)
+        Recipe.objects.filter(recipe_id='AD1').update(cuisine_type='Mediterranean')
+        catalog.invalidate()
+        r = self.client.get('/admin/recipes/recipe/?cuisine_type=Mediterranean')
+        self.assertEqual([o.name for o in r.context['cl'].result_list], ['chickpea salad'])
+
+    def test_truncated_search_is_flagged(self):
+        with mock.patch.object(recipe_admin, 'SEARCH_LIMIT', 1):
+            r = self.client.get('/admin/recipes/recipe/?q=chick')
+            self.assertEqual([o.name for o in r.context['cl'].result_list], ['Chicken Curry'])
+            self.assertContains(r, 'Only the first 1 recipes whose name starts with')
+            r = self.client.get('/admin/recipes/recipe/?q=butter')
+            self.assertNotContains(r, 'Only the first')
+            r = self.client.get('/admin/autocomplete/', {'app_label': 'recipes', 'model_name': 'recipeingredient',
+                                                         'field_name': 'recipe', 'term': 'chick'})
+        self.assertEqual(len(r.json()['results']), 1)
+        self.assertNotContains(self.client.get('/admin/recipes/recipe/'), 'Only the first')
+
+    def test_sparse_tables_are_not_estimated_from_rowids(self):
+        user = User.objects.create_user('saver')
+        saves = [SavedRecipe.objects.create(user=user, recipe=recipe) for recipe in Recipe.objects.all()]
+        saves[0].delete()   # an unsave leaves a rowid gap
+        Recipe.objects.get(recipe_id='AD1').delete()   # so does an admin delete
+        self.assertIsNone(recipe_admin.estimated_count(SavedRecipe))
+        self.assertIsNone(recipe_admin.estimated_count(Recipe))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.assertEqual(recipe_admin.estimated_count(SavedRecipe), 1)
+        self.assertEqual(recipe_admin.estimated_count(Recipe), 2)
+
+
+class SavedPageTest(TestCase):
+    def setUp(self):
+        catalog.invalidate()
+        cache.clear()
+        self.onion = Ingredient.objects.create(ingredient_id='SV1', name='Onion', name_lower='onion',
+                                               category='Vegetables')
+        self.user = User.objects.create_user('saver', password='pw')
+        self.recipes = [
+            Recipe.objects.create(recipe_id=f'SVR{i}', name=f'Dish {i:02d}', category='Main',
+                                  ingredients_raw='Onion, Rice' if i % 2 else 'Rice')
+            for i in range(30)
+        ]
+        for recipe in self.recipes:
+            SavedRecipe.objects.create(user=self.user, recipe=recipe)
+        self.client.force_login(self.user)
+        self.client.post('/api/pantry/toggle/', {'ingredient_id': self.onion.id}, content_type='application/json')
+
+    def test_paginated_with_match_overlay(self):
+        r = self.client.get('/saved/')
+        self.assertEqual(len(r.context['saved']), 24)
+        self.assertEqual(r.context['page'].paginator.count, 30)
+        matches = {s.recipe.name: s.match for s in r.context['saved']}
+        self.assertEqual(matches['Dish 29'], (1, 1, 100))
+        self.assertEqual(matches['Dish 28'], (0, 1, 0))
+        self.assertContains(r, '100%')
+        self.assertEqual(len(self.client.get('/saved/?page=2').context['saved']), 6)
+
+    def test_page_cost_does_not_grow_with_saves(self):
+        def queries():
+            with CaptureQueriesContext(connection) as captured:
+                self.client.get('/saved/')
+            return len(captured)
+        catalog.get_catalog()
+        before = queries()
+        more = [Recipe(recipe_id=f'SVX{i}', name=f'Extra {i}', ingredients_raw='Onion') for i in range(200)]
+        Recipe.objects.bulk_create(more)
+        SavedRecipe.objects.bulk_create(SavedRecipe(user=self.user, recipe=r)
+                                        for r in Recipe.objects.filter(recipe_id__startswith='SVX'))
+        self.assertEqual(queries(), before)
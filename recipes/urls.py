@@ -1,6 +1,13 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+
+def api(view):
+    """The async variant of a JSON API view when ASYNC_API is on (ASGI deployments)."""
+    return getattr(views, f'{view.__name__}_async') if settings.ASYNC_API else view
+
+
 urlpatterns = [
     # Pages
     path('',                         views.home,           name='home'),
@@ -11,17 +18,28 @@ urlpatterns = [
     path('register/',                views.register,       name='register'),
 
     # Pantry API
-    path('api/pantry/',              views.pantry_list,    name='pantry_list'),
-    path('api/pantry/toggle/',       views.pantry_toggle,  name='pantry_toggle'),
-    path('api/pantry/clear/',        views.pantry_clear,   name='pantry_clear'),
+    path('api/pantry/',              api(views.pantry_list),    name='pantry_list'),
+    path('api/pantry/toggle/',       api(views.pantry_toggle),  name='pantry_toggle'),
+    path('api/pantry/clear/',        api(views.pantry_clear),   name='pantry_clear'),
 
     # Ingredient API
-    path('api/ingredients/<path:category>/', views.ingredients_by_category, name='ingredients_by_cat'),
-    path('api/ingredients/search/',  views.ingredient_search, name='ingredient_search'),
+    # search/ must precede the catch-all <path:category>/ route
+    path('api/ingredients/search/',  api(views.ingredient_search), name='ingredient_search'),
+    path('api/ingredients/<path:category>/', api(views.ingredients_by_category), name='ingredients_by_cat'),
 
     # Match API
-    path('api/match/',               views.api_match,      name='api_match'),
+    path('api/match/',               api(views.api_match),      name='api_match'),
+    path('api/nutrition/',           views.nutrition_histograms, name='nutrition_histograms'),
+    path('api/plan/',                views.meal_plan,           name='meal_plan'),
+    path('api/catalog/index/',       views.catalog_index,       name='catalog_index'),
+
+    # Exports (streamed; <fmt> is ndjson or csv)
+    path('api/export/recipes.<str:fmt>', views.export_recipes, name='export_recipes'),
+    path('api/export/matches.<str:fmt>', views.export_matches, name='export_matches'),
 
     # Save
     path('api/recipes/<int:pk>/save/', views.save_recipe,  name='save_recipe'),
+
+    # Health
+    path('healthz/ready/',           views.readiness,      name='readiness'),
 ]
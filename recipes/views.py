@@ -1,14 +1,23 @@
 import re
+import gzip
 import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed, JsonResponse
 from django.views.decorators.http import require_POST, require_GET
 from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
+from django.middleware.csrf import get_token
 from django.contrib.auth.decorators import login_required
 from django.db.models import Q, Count
 from django.core.paginator import Paginator
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.forms import UserCreationForm
+from django.conf import settings
+from . import client_index, exports, planner, profiling, recommendations, responses, singleflight, warmup
+from .cards import CARD_FIELDS, card_fragments
+from .catalog import NUTRIENTS, get_catalog
 from .models import Ingredient, Recipe, UserPantry, SavedRecipe
 
 
@@ -17,18 +26,36 @@ from .models import Ingredient, Recipe, UserPantry, SavedRecipe
 # ─────────────────────────────────────────────────────────────────────────────
 def get_pantry(request):
     """Return pantry ingredient IDs for current user/session."""
-    if request.user.is_authenticated:
-        pantry, _ = UserPantry.objects.get_or_create(user=request.user)
-    else:
-        if not request.session.session_key:
-            request.session.create()
-        pantry, _ = UserPantry.objects.get_or_create(session_key=request.session.session_key)
+    with profiling.timer('pantry'):
+        if request.user.is_authenticated:
+            pantry, _ = UserPantry.objects.get_or_create(user=request.user)
+        else:
+            if not request.session.session_key:
+                request.session.create()
+            pantry, _ = UserPantry.objects.get_or_create(session_key=request.session.session_key)
     return pantry
 
 
-def get_pantry_ingredients(request):
-    pantry = get_pantry(request)
-    return list(pantry.ingredients.values('id', 'name', 'category', 'name_lower'))
+def get_pantry_ingredients(request, pantry=None):
+    pantry = pantry or get_pantry(request)
+    with profiling.timer('pantry'):
+        return list(pantry.ingredients.values('id', 'name', 'category', 'name_lower'))
+
+
+def load_card_recipes(ids):
+    """Fetch the rows needed to render recipe cards missing from the fragment cache."""
+    return Recipe.objects.only(*CARD_FIELDS).filter(id__in=ids)
+
+
+def overloaded(api=False):
+    """503 for requests turned away by the scoring admission limit."""
+    if api:
+        response = JsonResponse({'error': 'Too many match requests, retry shortly'}, status=503)
+    else:
+        response = HttpResponse('Too many match requests, please retry in a moment.', status=503,
+                                content_type='text/plain')
+    response['Retry-After'] = str(settings.MATCH_RETRY_AFTER)
+    return response
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -90,41 +117,20 @@ def home(request):
         'Other': '🌍',
     }
 
-    categories = (
-        Ingredient.objects
-        .values('category')
-        .annotate(count=Count('id'))
-        .order_by('-count')
-    )
+    catalog = get_catalog()
     cats_with_icons = [
-        {'name': c['category'], 'count': c['count'], 'icon': cat_icons.get(c['category'], '🥘')}
-        for c in categories
+        {'name': name, 'count': count, 'icon': cat_icons.get(name, '🥘')}
+        for name, count in catalog.ingredient_categories
     ]
 
     # Top Cuisines for Browse Section
-    top_cuisines_qs = (
-        Recipe.objects.exclude(cuisine_type='')
-        .values('cuisine_type')
-        .annotate(count=Count('id'))
-        .order_by('-count')[:10]
-    )
-    
     top_cuisines = [
-        {
-            'name': c['cuisine_type'],
-            'count': c['count'],
-            'flag': cuisine_flags.get(c['cuisine_type'], '🌍')
-        }
-        for c in top_cuisines_qs
+        {'name': name, 'count': count, 'flag': cuisine_flags.get(name, '🌍')}
+        for name, count in catalog.top_cuisines
     ]
 
     # Quick stats
-    stats = {
-        'recipes': Recipe.objects.count(),
-        'ingredients': Ingredient.objects.count(),
-        'cuisines': Recipe.objects.values('cuisine_type').distinct().count(),
-        'countries': Recipe.objects.values('country').distinct().count(),
-    }
+    stats = catalog.stats
 
     context = {
         'categories': cats_with_icons,
@@ -134,18 +140,15 @@ def home(request):
         'stats': stats,
     }
 
-    return render(request, 'recipes/home.html', context)
+    with profiling.timer('render'):
+        return render(request, 'recipes/home.html', context)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # INGREDIENTS API
 # ─────────────────────────────────────────────────────────────────────────────
-@require_GET
-def ingredients_by_category(request, category):
-    qs = Ingredient.objects.filter(category=category).order_by('name')
-    pantry = get_pantry(request)
-    pantry_ids = set(pantry.ingredients.values_list('id', flat=True))
-    data = [
+def category_rows(ingredients, pantry_ids):
+    return [
         {
             'id': i.id,
             'name': i.name,
@@ -154,9 +157,35 @@ def ingredients_by_category(request, category):
             'is_veg': i.is_vegetarian,
             'cuisine_origin': i.cuisine_origin,
         }
-        for i in qs
+        for i in ingredients
+    ]
+
+
+def search_queryset(q):
+    # Use 'contains' on the pre-lowercased field.
+    # This avoids 'icontains' issues in some SQLite environments.
+    return Ingredient.objects.filter(
+        Q(name_lower__contains=q) | Q(name__icontains=q)
+    ).order_by('name')[:40]
+
+
+def search_rows(ingredients, pantry_ids):
+    return [
+        {'id': i.id, 'name': i.name, 'category': i.category, 'in_pantry': i.id in pantry_ids}
+        for i in ingredients
     ]
-    return JsonResponse({'ingredients': data})
+
+
+@require_GET
+def ingredients_by_category(request, category):
+    """A category's ingredients; the rows are serialized once per catalog version (see responses.py)."""
+    pantry = get_pantry(request)
+    pantry_ids = set(pantry.ingredients.values_list('id', flat=True))
+    body = responses.category_payload(
+        get_catalog().version, category, pantry_ids,
+        lambda: category_rows(Ingredient.objects.filter(category=category).order_by('name'), ()),
+    )
+    return responses.json_response(request, body)
 
 
 @require_GET
@@ -165,19 +194,10 @@ def ingredient_search(request):
     if len(q) < 2:
         return JsonResponse({'ingredients': []})
 
-    # Use 'contains' on the pre-lowercased field. 
-    # This avoids 'icontains' issues in some SQLite environments.
-    qs = Ingredient.objects.filter(
-        Q(name_lower__contains=q) | Q(name__icontains=q)
-    ).order_by('name')[:40]
-    
+    qs = search_queryset(q)
     pantry = get_pantry(request)
     pantry_ids = set(pantry.ingredients.values_list('id', flat=True))
-    data = [
-        {'id': i.id, 'name': i.name, 'category': i.category, 'in_pantry': i.id in pantry_ids}
-        for i in qs
-    ]
-    return JsonResponse({'ingredients': data})
+    return JsonResponse({'ingredients': search_rows(qs, pantry_ids)})
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -212,62 +232,59 @@ def pantry_clear(request):
 
 def pantry_list(request):
     items = get_pantry_ingredients(request)
-    return JsonResponse({'ingredients': items, 'count': len(items)})
+    return responses.json_response(
+        request, {'ingredients': items, 'count': len(items), 'catalog_version': get_catalog().version})
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # RECIPE MATCHING
 # ─────────────────────────────────────────────────────────────────────────────
+DIETS = (('vegetarian', 'Vegetarian'), ('vegan', 'Vegan'), ('gluten_free', 'Gluten-Free'))
+
+
 def match_recipes(request):
-    pantry = get_pantry(request)
-    pantry_ings = list(pantry.ingredients.values_list('name_lower', flat=True))
+    pantry_items = get_pantry_ingredients(request)
 
-    if not pantry_ings:
+    if not pantry_items:
         return render(request, 'recipes/match.html', {
             'recipes': [], 'pantry_count': 0, 'pantry_items': []
         })
 
-    pantry_set = set(pantry_ings)
-    pantry_items = get_pantry_ingredients(request)
+    pantry_set = {p['name_lower'] for p in pantry_items}
 
     # Filters
     category   = request.GET.get('category', '')
     cuisine    = request.GET.get('cuisine', '')
     difficulty = request.GET.get('difficulty', '')
     diet       = request.GET.get('diet', '')
-    min_match  = int(request.GET.get('min_match', 10))
-
-    qs = Recipe.objects.all()
-    if category:   qs = qs.filter(category=category)
-    if cuisine:    qs = qs.filter(cuisine_type=cuisine)
-    if difficulty: qs = qs.filter(difficulty=difficulty)
-    if diet == 'vegetarian': qs = qs.filter(is_vegetarian=True)
-    if diet == 'vegan':      qs = qs.filter(is_vegan=True)
-    if diet == 'gluten_free': qs = qs.filter(is_gluten_free=True)
+    min_match  = int_param(request.GET, 'min_match', 10, 0, 100)
+    nutrition  = nutrition_ranges(request.GET)
 
-    # Score all recipes
-    scored = []
-    for recipe in qs.only('id','name','category','cuisine_type','difficulty','total_time',
-                           'is_vegetarian','spice_level','calories','ingredients_raw','image_url'):
-        matched, total, pct = recipe.match_score(pantry_set)
-        if pct >= min_match and total > 0:
-            scored.append({
-                'recipe': recipe,
-                'matched': matched,
-                'total': total,
-                'pct': pct,
-                'missing': total - matched,
-            })
-
-    scored.sort(key=lambda x: (-x['pct'], -x['matched']))
+    # Score against the in-memory catalog; only the visible page hits the DB
+    catalog = get_catalog()
+    try:
+        scored = singleflight.match(catalog, pantry_set, min_match=min_match, facets=True, category=category,
+                                    cuisine=cuisine, difficulty=difficulty, diet=diet, nutrition=nutrition)
+    except singleflight.Overloaded:
+        return overloaded()
 
     # Pagination
     paginator = Paginator(scored, 24)
     page = paginator.get_page(request.GET.get('page', 1))
+    ids = [catalog.ids[pos] for pos, *_ in page.object_list]
+    cards = card_fragments('match', ids, catalog.version, load_card_recipes)
+    page.object_list = [
+        {'id': catalog.ids[pos], 'card': cards[catalog.ids[pos]], 'matched': matched,
+         'total': total, 'pct': pct, 'missing': total - matched}
+        for pos, matched, total, pct in page.object_list if catalog.ids[pos] in cards
+    ]
 
-    categories  = Recipe.objects.values_list('category', flat=True).distinct().order_by('category')
-    cuisines    = Recipe.objects.values_list('cuisine_type', flat=True).distinct().order_by('cuisine_type')
-    difficulties = ['Easy', 'Medium', 'Hard']
+    # Dropdown options with how many matches each would leave (0 = disabled)
+    facets = scored.facets
+    categories   = [(c, facets['category'].get(c, 0)) for c in catalog.categories]
+    cuisines     = [(c, facets['cuisine'].get(c, 0)) for c in catalog.cuisines if c]
+    difficulties = [(d, facets['difficulty'].get(d, 0)) for d in ('Easy', 'Medium', 'Hard')]
+    diets        = [(d, label, facets['diet'].get(d, 0)) for d, label in DIETS]
 
     context = {
         'page': page,
@@ -277,12 +294,16 @@ def match_recipes(request):
         'categories': categories,
         'cuisines': cuisines,
         'difficulties': difficulties,
+        'diets': diets,
+        'nutrition_params': nutrition_params(nutrition),   # no inputs on this page; kept across Apply
         'current_filters': {
             'category': category, 'cuisine': cuisine,
             'difficulty': difficulty, 'diet': diet, 'min_match': min_match,
+            **nutrition_params(nutrition),
         },
     }
-    return render(request, 'recipes/match.html', context)
+    with profiling.timer('render'):
+        return render(request, 'recipes/match.html', context)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -290,8 +311,8 @@ def match_recipes(request):
 # ─────────────────────────────────────────────────────────────────────────────
 def recipe_detail(request, pk):
     recipe = get_object_or_404(Recipe, pk=pk)
-    pantry = get_pantry(request)
-    pantry_names = set(pantry.ingredients.values_list('name_lower', flat=True))
+    pantry_items = get_pantry_ingredients(request)
+    pantry_names = {p['name_lower'] for p in pantry_items}
 
     # Parse ingredients with match status
     ingredient_list = []
@@ -304,7 +325,7 @@ def recipe_detail(request, pk):
             ingredient_list.append({'name': raw_name, 'qty': qty, 'in_pantry': in_pantry})
 
     # Similar recipes
-    similar = Recipe.objects.filter(
+    similar = Recipe.objects.only(*CARD_FIELDS).filter(
         Q(cuisine_type=recipe.cuisine_type) | Q(category=recipe.category)
     ).exclude(pk=recipe.pk).order_by('?')[:6]
 
@@ -312,32 +333,71 @@ def recipe_detail(request, pk):
     if request.user.is_authenticated:
         is_saved = SavedRecipe.objects.filter(user=request.user, recipe=recipe).exists()
 
-    # Parse instructions
-    instructions_list = [s.strip() for s in recipe.instructions.split('.') if s.strip()]
-
     context = {
         'recipe': recipe,
         'ingredient_list': ingredient_list,
-        'instructions_list': instructions_list,
+        'instructions_list': recipe.instructions_list,
         'similar': similar,
+        'also_saved': recommendations.also_saved(recipe.pk),
         'is_saved': is_saved,
-        'pantry_items': get_pantry_ingredients(request),
+        'pantry_items': pantry_items,
     }
-    return render(request, 'recipes/detail.html', context)
+    with profiling.timer('render'):
+        return render(request, 'recipes/detail.html', context)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # BROWSE / SEARCH
 # ─────────────────────────────────────────────────────────────────────────────
-def recipe_list(request):
-    q          = request.GET.get('q', '').strip()
-    category   = request.GET.get('category', '')
-    cuisine    = request.GET.get('cuisine', '')
-    difficulty = request.GET.get('difficulty', '')
-    diet       = request.GET.get('diet', '')
-    sort       = request.GET.get('sort', 'name')
-
-    qs = Recipe.objects.all()
+def nutrition_ranges(params):
+    """
+    Parse `<nutrient>_min` / `<nutrient>_max` query params into a hashable
+    tuple of (nutrient, lo, hi) ranges; unparsable bounds are ignored.
+    """
+    ranges = []
+    for name in NUTRIENTS:
+        bounds = []
+        for suffix in ('min', 'max'):
+            try:
+                bounds.append(float(params.get(f'{name}_{suffix}', '')))
+            except ValueError:
+                bounds.append(None)
+        if bounds != [None, None]:
+            ranges.append((name, *bounds))
+    return tuple(ranges)
+
+
+def int_param(params, name, default, lo=None, hi=None):
+    """`params[name]` as an int clamped to [lo, hi], or `default` when missing or unparsable."""
+    try:
+        value = int(params.get(name, ''))
+    except ValueError:
+        return default
+    if lo is not None:
+        value = max(value, lo)
+    return value if hi is None else min(value, hi)
+
+
+def nutrition_params(ranges):
+    """The query params for `ranges`, for current_filters and pagination links."""
+    params = {}
+    for name, lo, hi in ranges:
+        if lo is not None: params[f'{name}_min'] = f'{lo:g}'
+        if hi is not None: params[f'{name}_max'] = f'{hi:g}'
+    return params
+
+
+def nutrition_filters(catalog, ranges):
+    """Min/max inputs for the browse page, with the catalog's value range as placeholders."""
+    current = {name: (lo, hi) for name, lo, hi in ranges}
+    return [{'name': name, 'label': name.replace('_', ' ').title(), 'unit': unit,
+             'min': catalog.histograms[name]['min'], 'max': catalog.histograms[name]['max'],
+             'lo': current.get(name, (None, None))[0], 'hi': current.get(name, (None, None))[1]}
+            for name, unit in NUTRIENTS.items()]
+
+
+def filter_recipes(qs, q='', category='', cuisine='', difficulty='', diet='', nutrition=()):
+    """Apply the browse-page filters (shared by recipe_list and export_recipes)."""
     if q:
         qs = qs.filter(Q(name__icontains=q) | Q(ingredients_raw__icontains=q) | Q(cuisine_type__icontains=q))
     if category:   qs = qs.filter(category=category)
@@ -346,26 +406,48 @@ def recipe_list(request):
     if diet == 'vegetarian': qs = qs.filter(is_vegetarian=True)
     if diet == 'vegan':      qs = qs.filter(is_vegan=True)
     if diet == 'gluten_free': qs = qs.filter(is_gluten_free=True)
+    for name, lo, hi in nutrition:
+        if lo is not None: qs = qs.filter(**{f'{name}__gte': lo})
+        if hi is not None: qs = qs.filter(**{f'{name}__lte': hi})
+    return qs
+
 
+def recipe_list(request):
+    q          = request.GET.get('q', '').strip()
+    category   = request.GET.get('category', '')
+    cuisine    = request.GET.get('cuisine', '')
+    difficulty = request.GET.get('difficulty', '')
+    diet       = request.GET.get('diet', '')
+    sort       = request.GET.get('sort', 'name')
+    nutrition  = nutrition_ranges(request.GET)
+
+    qs = filter_recipes(Recipe.objects.all(), q, category, cuisine, difficulty, diet, nutrition)
     sort_map = {'name': 'name', 'time': 'total_time', 'calories': 'calories', '-calories': '-calories'}
     qs = qs.order_by(sort_map.get(sort, 'name'))
 
-    paginator = Paginator(qs, 24)
+    paginator = Paginator(qs.values_list('id', flat=True), 24)
     page = paginator.get_page(request.GET.get('page', 1))
 
-    categories  = Recipe.objects.values_list('category', flat=True).distinct().order_by('category')
-    cuisines    = Recipe.objects.values_list('cuisine_type', flat=True).distinct().order_by('cuisine_type')
+    catalog     = get_catalog()
+    ids         = list(page.object_list)
+    cards       = card_fragments('list', ids, catalog.version, load_card_recipes)
+    categories  = catalog.categories
+    cuisines    = catalog.cuisines
 
     context = {
         'page': page,
-        'total': qs.count(),
+        'cards': [cards[pk] for pk in ids if pk in cards],
+        'total': paginator.count,
         'categories': categories,
         'cuisines': cuisines,
         'difficulties': ['Easy', 'Medium', 'Hard'],
-        'current_filters': {'q': q, 'category': category, 'cuisine': cuisine, 'difficulty': difficulty, 'diet': diet, 'sort': sort},
+        'current_filters': {'q': q, 'category': category, 'cuisine': cuisine, 'difficulty': difficulty, 'diet': diet, 'sort': sort,
+                            **nutrition_params(nutrition)},
+        'nutrition_filters': nutrition_filters(catalog, nutrition),
         'pantry_items': get_pantry_ingredients(request),
     }
-    return render(request, 'recipes/list.html', context)
+    with profiling.timer('render'):
+        return render(request, 'recipes/list.html', context)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -376,24 +458,238 @@ def api_match(request):
     pantry = get_pantry(request)
     pantry_ings = list(pantry.ingredients.values_list('name_lower', flat=True))
     if not pantry_ings:
-        return JsonResponse({'recipes': [], 'count': 0})
+        return responses.json_response(request, {'recipes': [], 'count': 0})
 
     pantry_set = set(pantry_ings)
-    min_match = int(request.GET.get('min_match', 10))
-    limit = int(request.GET.get('limit', 12))
+    min_match = int_param(request.GET, 'min_match', 10, 0, 100)
+    limit = int_param(request.GET, 'limit', 12, 1, 100)
+
+    catalog = get_catalog()
+    try:
+        scored = singleflight.match(catalog, pantry_set, min_match=min_match, facets=True,
+                                    nutrition=nutrition_ranges(request.GET))
+    except singleflight.Overloaded:
+        return overloaded(api=True)
+    return responses.json_response(request, match_payload(catalog, scored, limit))
+
+
+def match_payload(catalog, scored, limit):
+    recipes = []
+    for pos, matched, total, pct in scored[:limit]:
+        r = catalog.recipe(pos)
+        recipes.append({'id': r.id, 'name': r.name, 'pct': pct,
+                        'matched': matched, 'total': total, 'category': r.category,
+                        'cuisine': r.cuisine_type, 'difficulty': r.difficulty,
+                        'time': r.total_time, 'calories': r.calories})
+    payload = {'recipes': recipes, 'count': len(scored)}
+    if scored.facets is not None:
+        payload['facets'] = scored.facets
+    return payload
+
+
+@require_GET
+def nutrition_histograms(request):
+    """Precomputed per-nutrient histograms, drawn next to the browse page's range inputs (list.js)."""
+    body, gzipped = responses.catalog_payload(get_catalog(), 'nutrition', lambda catalog: {
+        'version': catalog.version, 'recipes': len(catalog), 'nutrients': catalog.histograms,
+    })
+    return responses.json_response(request, body, gzipped=gzipped)
+
+
+@require_GET
+def catalog_index(request):
+    """
+    The client-side scoring index (see client_index.py). `?v=` pins a catalog
+    version, so the response can be cached forever; any other version is
+    redirected to the current one.
+    """
+    catalog = get_catalog()
+    if request.GET.get('v') != str(catalog.version):
+        response = redirect(f'{request.path}?v={catalog.version}')
+        response['Cache-Control'] = 'no-cache'
+        return response
+    etag = f'"catalog-{catalog.version}"'
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponse(status=304)
+    else:
+        body = client_index.get_index(catalog)
+        if responses.accepts_gzip(request):
+            response = HttpResponse(body, content_type='application/json')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(gzip.decompress(body), content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response['Vary'] = 'Accept-Encoding'
+    return response
 
-    scored = []
-    for recipe in Recipe.objects.only('id','name','category','cuisine_type','difficulty',
-                                      'total_time','is_vegetarian','calories','ingredients_raw'):
-        matched, total, pct = recipe.match_score(pantry_set)
-        if pct >= min_match and total > 0:
-            scored.append({'id': recipe.id, 'name': recipe.name, 'pct': pct,
-                           'matched': matched, 'total': total, 'category': recipe.category,
-                           'cuisine': recipe.cuisine_type, 'difficulty': recipe.difficulty,
-                           'time': recipe.total_time, 'calories': recipe.calories})
 
-    scored.sort(key=lambda x: (-x['pct'], -x['matched']))
-    return JsonResponse({'recipes': scored[:limit], 'count': len(scored)})
+@require_GET
+def meal_plan(request):
+    """The `size` recipes that together use up the most pantry items (see planner.py)."""
+    pantry_items = get_pantry_ingredients(request)
+    names = {p['id']: p['name'] for p in pantry_items}
+    size = int_param(request.GET, 'size', 5, 1, 10)
+    max_time = int_param(request.GET, 'max_time', 0) or None
+    filters = {f: request.GET.get(f, '') for f in ('category', 'cuisine', 'difficulty', 'diet')}
+
+    catalog = get_catalog()
+    steps = planner.plan(catalog, names, size, max_time=max_time,
+                         nutrition=nutrition_ranges(request.GET), **filters)
+    recipes, covered = [], set()
+    for step in steps:
+        r = catalog.recipe(step.pos)
+        covered.update(step.new)
+        recipes.append({'id': r.id, 'name': r.name, 'category': r.category, 'cuisine': r.cuisine_type,
+                        'difficulty': r.difficulty, 'time': r.total_time, 'calories': r.calories,
+                        'uses': [names[i] for i in step.uses], 'new': [names[i] for i in step.new]})
+    return JsonResponse({
+        'recipes': recipes,
+        'covered': len(covered),
+        'pantry': len(names),
+        'unused': sorted(name for pk, name in names.items() if pk not in covered),
+    })
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# EXPORTS (streamed NDJSON / CSV)
+# ─────────────────────────────────────────────────────────────────────────────
+EXPORT_FILTERS = ('category', 'cuisine', 'difficulty', 'diet')
+
+
+def export_options(request, fmt):
+    """Validate the format; returns whether to gzip, or raises Http404."""
+    if fmt not in exports.FORMATS:
+        raise Http404(f'Unknown export format {fmt!r}')
+    return request.GET.get('gzip', '') in ('1', 'true', 'yes')
+
+
+@require_GET
+def export_recipes(request, fmt):
+    compress = export_options(request, fmt)
+    qs = filter_recipes(Recipe.objects.all(), request.GET.get('q', '').strip(),
+                        nutrition=nutrition_ranges(request.GET),
+                        **{f: request.GET.get(f, '') for f in EXPORT_FILTERS})
+    rows = qs.order_by('id').values_list(*exports.RECIPE_FIELDS).iterator(chunk_size=exports.QUERY_CHUNK_SIZE)
+    return exports.stream(rows, exports.RECIPE_FIELDS, fmt, 'recipes', compress)
+
+
+@require_GET
+def export_matches(request, fmt):
+    compress = export_options(request, fmt)
+    pantry_set = set(get_pantry(request).ingredients.values_list('name_lower', flat=True))
+    min_match = int_param(request.GET, 'min_match', 10, 0, 100)
+    filters = {f: request.GET[f] for f in EXPORT_FILTERS if request.GET.get(f)}
+    filters['nutrition'] = nutrition_ranges(request.GET)
+
+    catalog = get_catalog()
+    try:
+        scored = singleflight.match(catalog, pantry_set, min_match=min_match, **filters) if pantry_set else []
+    except singleflight.Overloaded:
+        return overloaded(api=True)
+    return exports.stream(exports.match_rows(catalog, scored), exports.MATCH_FIELDS, fmt, 'matches', compress)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# ASYNC JSON API
+# Served instead of the sync views above when ASYNC_API is on (recipematch/asgi.py
+# sets it). Session and auth are still sync-only in Django 4.2, so the pantry
+# lookup runs through sync_to_async; scoring runs on singleflight's executor.
+# ─────────────────────────────────────────────────────────────────────────────
+def async_require_methods(*methods):
+    """require_http_methods for async views (Django 4.2's decorators are sync-only)."""
+    def decorator(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            if request.method not in methods:
+                return HttpResponseNotAllowed(methods)
+            return await view(request, *args, **kwargs)
+        return inner
+    return decorator
+
+
+async def aget_pantry(request):
+    return await sync_to_async(get_pantry)(request)
+
+
+async def apantry_ids(pantry):
+    return {pk async for pk in pantry.ingredients.values_list('id', flat=True)}
+
+
+@async_require_methods('GET')
+async def ingredients_by_category_async(request, category):
+    pantry_ids = await apantry_ids(await aget_pantry(request))
+    catalog = await sync_to_async(get_catalog)()
+
+    async def load():
+        return category_rows([i async for i in Ingredient.objects.filter(category=category).order_by('name')], ())
+
+    body = await responses.acategory_payload(catalog.version, category, pantry_ids, load)
+    return responses.json_response(request, body)
+
+
+@async_require_methods('GET')
+async def ingredient_search_async(request):
+    q = request.GET.get('q', '').strip().lower()
+    if len(q) < 2:
+        return JsonResponse({'ingredients': []})
+    pantry_ids = await apantry_ids(await aget_pantry(request))
+    ingredients = [i async for i in search_queryset(q)]
+    return JsonResponse({'ingredients': search_rows(ingredients, pantry_ids)})
+
+
+@async_require_methods('POST')
+async def pantry_toggle_async(request):
+    get_token(request)  # what @ensure_csrf_cookie does for the sync view
+    data = json.loads(request.body)
+    ing_id = data.get('ingredient_id')
+    action = data.get('action', 'toggle')
+    try:
+        ing = await Ingredient.objects.aget(id=ing_id)
+    except Ingredient.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Not found'}, status=404)
+    pantry = await aget_pantry(request)
+    if action == 'add' or (action == 'toggle' and not await pantry.ingredients.filter(id=ing_id).aexists()):
+        await pantry.ingredients.aadd(ing)
+        in_pantry = True
+    else:
+        await pantry.ingredients.aremove(ing)
+        in_pantry = False
+    return JsonResponse({'success': True, 'in_pantry': in_pantry, 'name': ing.name})
+
+
+@async_require_methods('POST')
+async def pantry_clear_async(request):
+    pantry = await aget_pantry(request)
+    await pantry.ingredients.aclear()
+    return JsonResponse({'success': True, 'count': 0})
+
+
+async def pantry_list_async(request):
+    pantry = await aget_pantry(request)
+    items = [i async for i in pantry.ingredients.values('id', 'name', 'category', 'name_lower')]
+    catalog = await sync_to_async(get_catalog)()
+    return responses.json_response(
+        request, {'ingredients': items, 'count': len(items), 'catalog_version': catalog.version})
+
+
+@async_require_methods('GET')
+async def api_match_async(request):
+    pantry = await aget_pantry(request)
+    pantry_set = {n async for n in pantry.ingredients.values_list('name_lower', flat=True)}
+    if not pantry_set:
+        return responses.json_response(request, {'recipes': [], 'count': 0})
+
+    min_match = int_param(request.GET, 'min_match', 10, 0, 100)
+    limit = int_param(request.GET, 'limit', 12, 1, 100)
+
+    catalog = await sync_to_async(get_catalog)()
+    try:
+        scored = await singleflight.amatch(catalog, pantry_set, min_match=min_match, facets=True,
+                                           nutrition=nutrition_ranges(request.GET))
+    except singleflight.Overloaded:
+        return overloaded(api=True)
+    return responses.json_response(request, match_payload(catalog, scored, limit))
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -414,13 +710,40 @@ def save_recipe(request, pk):
 
 @login_required
 def saved_recipes(request):
-    saved = SavedRecipe.objects.filter(user=request.user).select_related('recipe').order_by('-saved_at')
+    saved = (SavedRecipe.objects.filter(user=request.user).select_related('recipe')
+             .only('saved_at', 'recipe', *(f'recipe__{f}' for f in CARD_FIELDS)).order_by('-saved_at', '-id'))
+    paginator = Paginator(saved, 24)
+    page = paginator.get_page(request.GET.get('page', 1))
+    page.object_list = list(page.object_list)
+    pantry_items = get_pantry_ingredients(request)
+
+    # Pantry match for this page only, in one pass over the catalog's term lists
+    if pantry_items:
+        catalog = get_catalog()
+        positions = {s.recipe_id: catalog.position(s.recipe_id) for s in page.object_list}
+        scores = catalog.score({p['name_lower'] for p in pantry_items},
+                               [pos for pos in positions.values() if pos is not None])
+        for s in page.object_list:
+            s.match = scores.get(positions[s.recipe_id])
+
     return render(request, 'recipes/saved.html', {
-        'saved': saved,
-        'pantry_items': get_pantry_ingredients(request),
+        'page': page,
+        'saved': page.object_list,
+        'recommended': recommendations.for_user(request.user),
+        'pantry_items': pantry_items,
     })
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# HEALTH
+# ─────────────────────────────────────────────────────────────────────────────
+@require_GET
+def readiness(request):
+    """200 once the warmup hook has built the catalog, 503 until then."""
+    status = warmup.status()
+    return JsonResponse(status, status=200 if status['ready'] else 503)
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # AUTH
 # ─────────────────────────────────────────────────────────────────────────────
@@ -434,8 +757,7 @@ def register(request):
                 try:
                     session_pantry = UserPantry.objects.get(session_key=request.session.session_key)
                     user_pantry, _ = UserPantry.objects.get_or_create(user=user)
-                    for ing in session_pantry.ingredients.all():
-                        user_pantry.ingredients.add(ing)
+                    user_pantry.ingredients.add(*session_pantry.ingredients.values_list('id', flat=True))
                 except UserPantry.DoesNotExist:
                     pass
             login(request, user)
@@ -0,0 +1,53 @@
+"""
+Process warmup: build everything the first requests would otherwise build
+lazily. Called from recipematch.wsgi.warmup() (or asgi.warmup()) in the
+gunicorn master.
+"""
+import logging
+import time
+
+from django.db import connections
+from django.template import engines
+from django.template.loader import get_template
+from django.utils import timezone
+
+from .catalog import get_catalog
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES = [
+    'base.html',
+    'recipes/home.html',
+    'recipes/match.html',
+    'recipes/list.html',
+    'recipes/detail.html',
+    'recipes/saved.html',
+    'registration/login.html',
+    'registration/register.html',
+]
+
+_status = {'ready': False, 'catalog_version': None, 'warmed_at': None, 'duration_ms': None}
+
+
+def run():
+    """Build the catalog, its facet metadata and the compiled templates."""
+    started = time.perf_counter()
+    catalog = get_catalog()
+    engines.all()
+    for name in TEMPLATES:
+        get_template(name)
+    # Never hand an open DB connection to forked workers
+    connections.close_all()
+
+    _status.update(
+        ready=True,
+        catalog_version=catalog.version,
+        recipes=len(catalog),
+        warmed_at=timezone.now().isoformat(),
+        duration_ms=round((time.perf_counter() - started) * 1000),
+    )
+    logger.info('warmup complete: %(recipes)s recipes, catalog v%(catalog_version)s in %(duration_ms)sms', _status)
+
+
+def status():
+    return dict(_status)
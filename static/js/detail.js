@@ -0,0 +1,23 @@
+function toggleDetailed(btn) {
+  const block = document.getElementById('detailed-block');
+  block.classList.toggle('open');
+  btn.textContent = block.classList.contains('open') ? '📕 Hide Chef\'s Guide' : '📖 Show Detailed Chef\'s Guide';
+}
+
+// Init saved state from server-rendered data attribute
+document.addEventListener('DOMContentLoaded', () => {
+  const btn = document.getElementById('save-btn');
+  if (btn && btn.dataset.saved === '1') btn.classList.add('saved');
+});
+
+async function toggleSave(pk) {
+  const r = await fetch(`/api/recipes/${pk}/save/`, {
+    method: 'POST', headers: { 'X-CSRFToken': getCsrf() }
+  });
+  const d = await r.json();
+  const btn = document.getElementById('save-btn');
+  btn.classList.toggle('saved', d.saved);
+  btn.dataset.saved = d.saved ? '1' : '0';
+  btn.textContent = d.saved ? '❤️ Saved' : '🤍 Save Recipe';
+  showToast(d.saved ? '❤️ Recipe saved!' : 'Removed from saved', d.saved ? 'success' : '');
+}
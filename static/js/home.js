@@ -0,0 +1,107 @@
+let activeCat = JSON.parse(document.getElementById('active-category').textContent);
+let ingSearchTimeout;
+
+// ─── Load ingredients for a category ────────────────────────────────────────
+async function loadCategory(cat) {
+  const list = document.getElementById('ing-list');
+  list.innerHTML = '<div class="ing-spinner">Loading…</div>';
+  const r = await fetch(`/api/ingredients/${encodeURIComponent(cat)}/`);
+  const d = await r.json();
+  renderIngList(d.ingredients);
+}
+
+function renderIngList(ings) {
+  const list = document.getElementById('ing-list');
+  if (!ings.length) {
+    list.innerHTML = '<div class="ing-spinner" style="color:var(--muted)">No ingredients found</div>';
+    return;
+  }
+  list.innerHTML = ings.map(ing => `
+  <button class="ing-chip ${ing.in_pantry ? 'in-pantry' : ''}"
+          data-ing-id="${ing.id}"
+          onclick="togglePantry(${ing.id})"
+          title="${ing.in_pantry ? 'Remove from pantry' : 'Add to pantry'}">
+    ${ing.in_pantry ? '✓ ' : '+ '}${ing.name}
+  </button>
+`).join('');
+}
+
+function switchCat(cat, el) {
+  activeCat = cat;
+  document.querySelectorAll('.cat-tab').forEach(t => t.classList.remove('active'));
+  el.classList.add('active');
+  loadCategory(cat);
+}
+
+function scrollToCategory(cat) {
+  // Switch panel to that category
+  const tab = document.querySelector(`.cat-tab[data-cat="${cat}"]`);
+  if (tab) { tab.click(); tab.scrollIntoView({ behavior: 'smooth', block: 'nearest', inline: 'center' }); }
+  document.querySelector('.ing-panel').scrollIntoView({ behavior: 'smooth', block: 'start' });
+}
+
+// ─── Ingredient Quick Search ─────────────────────────────────────────────────
+document.getElementById('ing-quick-search').addEventListener('input', function () {
+  clearTimeout(ingSearchTimeout);
+  const q = this.value.trim();
+  const results = document.getElementById('ing-search-results');
+  if (q.length < 2) { results.style.display = 'none'; return; }
+  ingSearchTimeout = setTimeout(async () => {
+    console.log(`Searching for: ${q}`);
+    const r = await fetch(`/api/ingredients/search/?q=${encodeURIComponent(q)}`);
+    const d = await r.json();
+    console.log('Search results:', d);
+    if (!d.ingredients.length) { results.style.display = 'none'; return; }
+    results.innerHTML = d.ingredients.map(i => `
+    <div class="search-result-item ${i.in_pantry ? 'in-pantry' : ''}"
+         onclick="togglePantry(${i.id}); document.getElementById('ing-quick-search').value=''; document.getElementById('ing-search-results').style.display='none';">
+      <span>${i.in_pantry ? '✓ ' : ''}${i.name}</span>
+      <span class="sri-cat">${i.category}</span>
+    </div>
+  `).join('');
+    results.style.display = 'block';
+  }, 250);
+});
+
+document.addEventListener('click', e => {
+  if (!e.target.closest('.ing-search')) {
+    document.getElementById('ing-search-results').style.display = 'none';
+  }
+});
+
+// ─── Override togglePantry to update chip UI instantly ───────────────────────
+const _originalToggle = togglePantry;
+window.togglePantry = async function (ingId, action = 'toggle') {
+  const r = await fetch('/api/pantry/toggle/', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', 'X-CSRFToken': getCsrf() },
+    body: JSON.stringify({ ingredient_id: ingId, action })
+  });
+  const d = await r.json();
+  if (d.success) {
+    await loadPantry();
+    // Update chips on current page
+    document.querySelectorAll(`[data-ing-id="${ingId}"]`).forEach(chip => {
+      chip.classList.toggle('in-pantry', d.in_pantry);
+      chip.innerHTML = `${d.in_pantry ? '✓ ' : '+ '}${d.name}`;
+    });
+    updateMatchBtn();
+    showToast(d.in_pantry ? `✅ ${d.name} added` : `Removed ${d.name}`, d.in_pantry ? 'success' : '');
+  }
+};
+
+function updateMatchBtn() {
+  const count = pantryItems.length;
+  document.getElementById('pantry-selected-count').textContent = count;
+  document.getElementById('find-match-btn').disabled = count === 0;
+}
+
+// Hook into loadPantry to also update match btn
+const _origLoad = loadPantry;
+window.loadPantry = async function () {
+  await _origLoad();
+  updateMatchBtn();
+};
+
+// Initial load
+loadCategory(activeCat);
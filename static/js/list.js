@@ -0,0 +1,46 @@
+document.addEventListener('DOMContentLoaded', () => {
+  document.querySelectorAll('.dynamic-visual').forEach(el => {
+    if (el.dataset.hue) el.style.setProperty('--hue', el.dataset.hue + 'deg');
+    if (el.dataset.sat) el.style.setProperty('--sat', el.dataset.sat + '%');
+    if (el.dataset.dur) el.style.setProperty('--dur', el.dataset.dur + 's');
+    if (el.dataset.del) el.style.setProperty('--del', el.dataset.del + 's');
+  });
+  loadNutritionHistograms();
+});
+
+// ── Nutrition histograms: the catalog's distribution behind each min/max pair ──
+async function loadNutritionHistograms() {
+  const ranges = document.querySelectorAll('.nutrition-range[data-nutrient]');
+  if (!ranges.length) return;
+  const r = await fetch('/api/nutrition/');
+  if (!r.ok) return;
+  const { nutrients } = await r.json();
+  ranges.forEach(label => {
+    const hist = nutrients[label.dataset.nutrient];
+    if (hist && hist.bins.length) renderHistogram(label, hist);
+  });
+}
+
+function renderHistogram(label, hist) {
+  const chart = label.querySelector('.nutrition-hist');
+  const [minInput, maxInput] = label.querySelectorAll('input');
+  const tallest = Math.max(...hist.bins.map(b => b.count), 1);
+  const bars = hist.bins.map(bin => {
+    const bar = document.createElement('span');
+    bar.style.height = Math.max(2, Math.round(100 * bin.count / tallest)) + '%';
+    bar.title = `${bin.lo}–${bin.hi === null ? '' : bin.hi} ${hist.unit}: ${bin.count}`;
+    chart.appendChild(bar);
+    return bar;
+  });
+  const highlight = () => {
+    const lo = minInput.value === '' ? -Infinity : Number(minInput.value);
+    const hi = maxInput.value === '' ? Infinity : Number(maxInput.value);
+    hist.bins.forEach((bin, i) => {
+      const top = bin.hi === null ? Infinity : bin.hi;
+      bars[i].classList.toggle('in-range', bin.lo <= hi && top >= lo);
+    });
+  };
+  minInput.addEventListener('input', highlight);
+  maxInput.addEventListener('input', highlight);
+  highlight();
+}
@@ -1,10 +1,12 @@
 // ═══ PANTRY STATE ══════════════════════════════════════════════════════════
 let pantryItems = [];
+let catalogVersion = null;
 
 async function loadPantry() {
   const r = await fetch('/api/pantry/');
   const d = await r.json();
   pantryItems = d.ingredients;
+  catalogVersion = d.catalog_version;
   updatePantryUI();
 }
 
@@ -14,6 +16,8 @@ function updatePantryUI() {
   const container = document.getElementById('pantry-items-container');
   const findBtn = document.getElementById('find-recipes-btn');
 
+  renderMatchPreview();
+
   if (!count) {
     container.innerHTML = `<div class="empty-pantry"><div class="big-icon">🧺</div><p>Your pantry is empty.<br>Add ingredients from the home page.</p></div>`;
     findBtn.style.display = 'none';
@@ -69,6 +73,7 @@ async function clearPantry() {
 }
 
 function openDrawer() {
+  renderMatchPreview(true);
   document.getElementById('pantry-drawer').classList.add('open');
   document.getElementById('drawer-overlay').classList.add('open');
   document.body.style.overflow = 'hidden';
@@ -80,6 +85,105 @@ function closeDrawer() {
 }
 document.addEventListener('keydown', e => { if (e.key === 'Escape') closeDrawer(); });
 
+// ═══ LIVE MATCH PREVIEW ════════════════════════════════════════════════════
+// Scores the pantry against /api/catalog/index/ (see recipes/client_index.py)
+// in the browser, with Catalog.match()'s rules, so toggling an item updates
+// the drawer without a server round trip. /match/ remains the full result.
+const PREVIEW_MIN_MATCH = 10;   // /match/'s default threshold
+const PREVIEW_SIZE = 10;
+let catalogIndex = null;        // {version, ...} once decoded
+let catalogIndexLoading = null;
+
+function decodeTypedArray([type, b64]) {
+  const bin = atob(b64);
+  const bytes = new Uint8Array(bin.length);
+  for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+  return new globalThis[`${type}Array`](bytes.buffer);
+}
+
+function loadCatalogIndex() {
+  if (catalogIndex && catalogIndex.version === catalogVersion) return Promise.resolve(catalogIndex);
+  if (!catalogIndexLoading) {
+    // Versioned URL: the browser cache serves repeat loads until the catalog changes
+    catalogIndexLoading = fetch(`/api/catalog/index/?v=${catalogVersion}`)
+      .then(r => r.json())
+      .then(d => {
+        const a = Object.fromEntries(Object.entries(d.arrays).map(([k, v]) => [k, decodeTypedArray(v)]));
+        // Inverted index, term -> recipe positions, in CSR form like the server's postings
+        const starts = new Uint32Array(d.terms.length + 1);
+        for (const t of a.term_ids) starts[t + 1]++;
+        for (let t = 0; t < d.terms.length; t++) starts[t + 1] += starts[t];
+        const postings = new Uint32Array(a.term_ids.length);
+        const fill = starts.slice(0, -1);
+        for (let pos = 0, j = 0; pos < d.count; pos++) {
+          for (const end = j + a.term_counts[pos]; j < end; j++) postings[fill[a.term_ids[j]]++] = pos;
+        }
+        catalogIndex = { version: d.version, count: d.count, terms: d.terms, names: d.names, ids: a.ids, starts, postings };
+        return catalogIndex;
+      })
+      .finally(() => { catalogIndexLoading = null; });
+  }
+  return catalogIndexLoading;
+}
+
+function scorePantry(index, pantryNames) {
+  // Each pantry item counts once per recipe, matching terms by substring either way
+  const total = pantryNames.length;
+  const counts = new Uint16Array(index.count);
+  const seen = new Int32Array(index.count).fill(-1);
+  pantryNames.forEach((name, item) => {
+    index.terms.forEach((term, t) => {
+      if (!name.includes(term) && !term.includes(name)) return;
+      for (let j = index.starts[t]; j < index.starts[t + 1]; j++) {
+        const pos = index.postings[j];
+        if (seen[pos] !== item) { seen[pos] = item; counts[pos]++; }
+      }
+    });
+  });
+  const scored = [];
+  for (let pos = 0; pos < index.count; pos++) {
+    const pct = Math.round(counts[pos] / total * 100);
+    if (counts[pos] && pct >= PREVIEW_MIN_MATCH) scored.push([pos, counts[pos], pct]);
+  }
+  scored.sort((x, y) => y[2] - x[2] || y[1] - x[1] || x[0] - y[0]);
+  return scored;
+}
+
+async function renderMatchPreview(load = false) {
+  const preview = document.getElementById('match-preview');
+  if (!preview) return;
+  const names = [...new Set(pantryItems.map(p => p.name_lower.trim()))];
+  if (!names.length || catalogVersion === null || (!load && !catalogIndex)) {
+    preview.hidden = true;
+    return;
+  }
+  let index;
+  try {
+    index = await loadCatalogIndex();
+  } catch (e) {
+    preview.hidden = true;   // the preview is optional; /match/ still works
+    return;
+  }
+  const scored = scorePantry(index, names);
+  // Built with textContent: recipe names come from imported data and the admin
+  const element = (tag, className, text) => {
+    const el = document.createElement(tag);
+    el.className = className;
+    el.textContent = text;
+    return el;
+  };
+  const top = scored.slice(0, PREVIEW_SIZE).map(([pos, matched, pct]) => {
+    const item = element('a', 'preview-item', '');
+    item.href = `/recipes/${index.ids[pos]}/`;
+    item.append(element('span', '', index.names[pos]), element('span', 'preview-pct', `${pct}%`));
+    return item;
+  });
+  preview.replaceChildren(
+    element('div', 'preview-count', `${scored.length.toLocaleString()} recipe${scored.length === 1 ? '' : 's'} match`),
+    ...top);
+  preview.hidden = false;
+}
+
 // ─── Toast ──────────────────────────────────────────────────────────────
 function showToast(msg, type = '') {
   const container = document.getElementById('toast-container');
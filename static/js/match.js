@@ -0,0 +1,26 @@
+// Set match bar widths from data-pct (avoids Django template in style attribute)
+document.querySelectorAll('[data-pct]').forEach(function (el) {
+  el.style.width = el.dataset.pct + '%';
+});
+
+// Event delegation for pantry remove buttons (avoids Django template in onclick)
+var miniTags = document.getElementById('pantry-mini-tags');
+if (miniTags) {
+  miniTags.addEventListener('click', function (e) {
+    var btn = e.target.closest('.rm-pantry-btn');
+    if (btn) removeFromPantry(parseInt(btn.dataset.id), btn.dataset.name);
+  });
+}
+
+// Live pantry reload in sidebar
+var _origLoad2 = loadPantry;
+window.loadPantry = async function () {
+  await _origLoad2();
+  var container = document.getElementById('pantry-mini-tags');
+  if (!container) return;
+  container.innerHTML = pantryItems.map(function (i) {
+    return '<span class="pantry-mini-tag">' + i.name +
+      '<button type="button" class="rm-pantry-btn" data-id="' + i.id + '" data-name="' + i.name + '">×</button>' +
+      '</span>';
+  }).join('');
+};